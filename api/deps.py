@@ -1,4 +1,6 @@
-from fastapi import Depends, HTTPException, status
+import hmac
+from fastapi import Depends, HTTPException, Request, status
+from core.config import settings
 from models.models import User
 from core.security import get_current_user
 
@@ -8,4 +10,14 @@ def admin_required(current_user: User = Depends(get_current_user)):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Stop There, What you are doing is illegal and can lead to permanent ban"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+def metrics_token_required(request: Request):
+    """GET /metrics: the scraper's static METRICS_TOKEN, kept apart from user JWTs."""
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
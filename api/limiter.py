@@ -1,4 +1,142 @@
+"""
+The application's one rate limiter.
+
+Counters live in RATELIMIT_STORAGE_URI: memory:// keeps them per process
+(so every uvicorn worker grants its own allowance), redis://host:6379/1
+shares them between all workers. RATELIMIT_STRATEGY picks the algorithm;
+the default sliding-window-counter smooths the burst a fixed window allows
+at each boundary, at two counters per key.
+
+Public routes (login) are keyed by client address with @limiter.limit.
+Authenticated routes take user_limit() as a dependency instead: it runs
+after get_current_user, so the key is the user id and students behind one
+NAT address don't share an allowance; its counters (UserLimiter) come from
+the limits package directly, in the same store. RATELIMIT_DEFAULT, if set,
+applies to every other route by client address through SlowAPIMiddleware.
+
+When a shared store becomes unreachable, both kinds of limit count in
+process until it answers again.
+"""
+import logging
+import math
+import time
+from functools import lru_cache
+from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from limits import parse_many
+from limits.storage import MemoryStorage, storage_from_string
+from limits.strategies import STRATEGIES
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from core.config import settings
+from core.security import get_current_user
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit"
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=[settings.RATELIMIT_DEFAULT] if settings.RATELIMIT_DEFAULT else [],
+    strategy=settings.RATELIMIT_STRATEGY,
+    storage_uri=settings.RATELIMIT_STORAGE_URI,
+    key_prefix=KEY_PREFIX,
+    enabled=settings.RATELIMIT_ENABLED,
+    # A shared store that goes away lets requests through on per-process counters
+    swallow_errors=True,
+    in_memory_fallback_enabled=True,
+)
+
+_IN_PROCESS = settings.RATELIMIT_STORAGE_URI.startswith("memory://")
+STORAGE_RECHECK_SECONDS = 30
+
+
+class UserLimiter:
+    """
+    The counters behind user_limit, built on the limits package directly: the
+    RATELIMIT_STORAGE_URI store, and per-process counters of its own while that
+    store is unreachable. Like slowapi does for @limiter.limit routes, it
+    switches back once the store answers a probe, sent at most every
+    STORAGE_RECHECK_SECONDS.
+    """
+
+    def __init__(self, storage_uri: str, strategy: str):
+        strategy_class = STRATEGIES[strategy]
+        self.storage = storage_from_string(storage_uri)
+        self.fallback_storage = MemoryStorage()
+        self.shared = strategy_class(self.storage)
+        self.fallback = strategy_class(self.fallback_storage)
+        self.storage_dead = False
+        self._recheck_at = 0.0
+
+    def counters(self):
+        """The RateLimiter to count with now: the shared store's, or the fallback."""
+        if self.storage_dead and time.monotonic() >= self._recheck_at:
+            self._recheck_at = time.monotonic() + STORAGE_RECHECK_SECONDS
+            try:
+                recovered = self.storage.check()
+            except Exception:
+                recovered = False
+            if recovered:
+                logger.info("Rate limit storage recovered")
+                self.storage_dead = False
+        return self.fallback if self.storage_dead else self.shared
+
+    def hit(self, item, key: str):
+        """Counts one hit; returns (allowed, the RateLimiter that counted it)."""
+        counters = self.counters()
+        try:
+            return counters.hit(item, key), counters
+        except Exception:
+            if counters is self.fallback:
+                raise
+            self.storage_failed()
+            return self.fallback.hit(item, key), self.fallback
+
+    def storage_failed(self):
+        if not self.storage_dead:
+            # Logged once per outage rather than on every request
+            logger.warning("Rate limit storage unreachable; using per-process counters", exc_info=True)
+            self.storage_dead = True
+            self._recheck_at = time.monotonic() + STORAGE_RECHECK_SECONDS
+
+    def reset(self):
+        self.storage.reset()
+        self.fallback_storage.reset()
+
+
+user_limiter = UserLimiter(settings.RATELIMIT_STORAGE_URI, settings.RATELIMIT_STRATEGY)
+
+@lru_cache(maxsize=None)
+def _limits(spec: str):
+    return parse_many(spec) if spec else []
+
+def user_limit(scope: str, setting: str):
+    """
+    A dependency enforcing settings.<setting> (e.g. "30/minute;500/hour") per
+    user, across every route that shares scope. Over the limit it raises 429
+    with Retry-After.
+    """
+    def hit(user_id):
+        key = f"{KEY_PREFIX}/{scope}/user:{user_id}"
+        for item in _limits(getattr(settings, setting)):
+            allowed, counters = user_limiter.hit(item, key)
+            if not allowed:
+                reset_at = counters.get_window_stats(item, key).reset_time
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=f"Rate limit exceeded: {item}",
+                    headers={"Retry-After": str(max(math.ceil(reset_at - time.time()), 1))}
+                )
+
+    async def check(current_user=Depends(get_current_user)):
+        if not limiter.enabled:
+            return
+        if _IN_PROCESS:
+            hit(current_user.id) # Microseconds; not worth a threadpool hop
+        else:
+            await run_in_threadpool(hit, current_user.id) # A network round trip
+    return Depends(check)
 
-limiter = Limiter(key_func=get_remote_address, enabled=True)
\ No newline at end of file
+# Student writes on /enrollments (enroll, drop, waitlist, admission intents)
+enrollment_limit = user_limit("enrollments", "RATELIMIT_ENROLLMENTS")
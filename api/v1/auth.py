@@ -1,33 +1,54 @@
 from fastapi import APIRouter, Depends, HTTPException, Request 
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from database import get_db
 from core import security
+from core.config import settings
 import crud
 from schemas import user
 from api.limiter import limiter # Import the limiter instance from limiter file
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# These handlers are async so bcrypt runs on the dedicated password-hashing pool
+# (core.security) instead of holding a shared worker thread; the short database
+# calls still go through the threadpool.
+
+def _find_user(db: Session, email: str):
+    db_user = crud.get_user_by_email(db, email=email)
+    # Give the connection back to the pool while we hash; otherwise a login burst
+    # parks every pooled connection behind bcrypt. Loaded attributes stay readable.
+    db.close()
+    return db_user
+
 @router.post("/register", response_model=user.UserOut)
-def register(user_in: user.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user_in.email)
+async def register(user_in: user.UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(_find_user, db, user_in.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db, user_in)
+    hashed_password = await security.hash_password_async(user_in.password)
+    return await run_in_threadpool(crud.create_user, db, user_in, hashed_password)
 
 @router.post("/login")
-@limiter.limit("5/minute")
-def login(
+@limiter.limit(settings.RATELIMIT_LOGIN)
+async def login(
     request: Request, # Requirement for slowapi
     db: Session = Depends(get_db), 
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
+    user = await run_in_threadpool(_find_user, db, form_data.username)
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    valid, new_hash = await security.verify_password_async(form_data.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    if new_hash:
+        # Transparent upgrade to the current BCRYPT_ROUNDS
+        await run_in_threadpool(crud.update_password_hash, db, user.id, new_hash)
     
-    access_token = security.create_access_token(data={"sub": user.email})
+    # id lets get_current_user load the user by primary key; role is informational
+    access_token = security.create_access_token(data={"sub": user.email, "id": user.id, "role": user.role})
     return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
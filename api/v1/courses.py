@@ -1,26 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_read_db, replica_lag
 from api.deps import admin_required
+from core.config import settings
+from core.pagination import clamp_limit
 import crud
 from schemas import course
+from services import course_cache, seat_events
 from models import models
 router = APIRouter(prefix="/courses", tags=["Courses"])
 
 @router.get("/", response_model=list[course.CourseOut])
 def list_courses(
-    skip: int = 0, # How many Courses to skip before starting to dispay
-    limit: int = 10, # Courses to show per page
+    request: Request,
+    skip: Optional[int] = None, # Legacy offset paging: how many Courses to skip before starting to display
+    limit: int = 10, # Courses to show per page (capped at MAX_PAGE_SIZE)
     search: str = None, # Search with keyword in Course title (Not case sensitive)
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None, # Opaque token from the X-Next-Cursor header of the previous page
+    sort: Literal["id", "title"] = "id",
+    db: Session = Depends(get_read_db)
 ):
-    return crud.get_courses(db, skip=skip, limit=limit, search=search)
+    limit = clamp_limit(limit)
+    # Served from course_cache when this exact page was rendered since the last write
+    key = course_cache.listing_key(skip, limit, search, cursor, sort)
+    version = course_cache.catalog_version()
+    entry = course_cache.lookup(request, key, version)
+    if entry is None:
+        if skip is not None:
+            courses = crud.get_courses(db, skip=skip, limit=limit, search=search)
+            next_cursor = None
+        else:
+            courses, next_cursor = crud.get_courses_page(db, limit=limit, cursor=cursor, sort=sort, search=search)
+        entry = course_cache.store_listing(key, version, courses, next_cursor, ttl=replica_lag(db))
+    return course_cache.respond(request, entry, settings.COURSE_LIST_CACHE_CONTROL)
+
+@router.get("/cache/stats")
+def course_cache_stats(admin=Depends(admin_required)):
+    """Hit ratio and size of the catalog response cache, for sizing COURSE_CACHE_MAX_ENTRIES."""
+    return course_cache.stats()
 
 @router.get("/{id}", response_model=course.CourseOut)
-def get_course(id: int, db: Session = Depends(get_db)):
-    course = db.query(models.Course).filter(models.Course.id == id).first()
-    if not course: raise HTTPException(status_code=404, detail="Ooh no! Course not found")
-    return course
+def get_course(request: Request, id: int, db: Session = Depends(get_read_db)):
+    version = course_cache.course_version(id)
+    entry = course_cache.lookup(request, course_cache.course_key(id), version)
+    if entry is None:
+        course = db.query(models.Course).filter(models.Course.id == id).first()
+        if not course: raise HTTPException(status_code=404, detail="Ooh no! Course not found")
+        entry = course_cache.store_course(id, version, course, ttl=replica_lag(db))
+    return course_cache.respond(request, entry, settings.COURSE_DETAIL_CACHE_CONTROL)
+
+@router.get("/{id}/seats/stream")
+async def stream_seats(id: int, db: Session = Depends(get_db)):
+    """Server-sent events with the course's seat counts, pushed as enrollments commit."""
+    # Subscribe before reading, so a change committed in between is not missed
+    subscription = seat_events.broker.subscribe(id)
+    try:
+        course = await run_in_threadpool(db.get, models.Course, id)
+        if not course: raise HTTPException(status_code=404, detail="Ooh no! Course not found")
+        subscription.offer(seat_events.seat_state(course))
+    except BaseException:
+        subscription.close()
+        raise
+    finally:
+        db.close() # Streams stay open for minutes; don't hold a pooled connection meanwhile
+    return seat_events.event_stream(subscription)
 
 @router.post("/", response_model=course.CourseOut)
 def create_course(course_in: course.CourseCreate, admin=Depends(admin_required), db: Session = Depends(get_db)):
@@ -28,13 +73,10 @@ def create_course(course_in: course.CourseCreate, admin=Depends(admin_required),
 
 @router.patch("/{id}", response_model=course.CourseOut)
 def update_course(id: int, course_in: course.CourseUpdate, db: Session = Depends(get_db), admin=Depends(admin_required)):
-
-    db_course = db.query(models.Course).filter(models.Course.id == id).first()
-    
+    db_course = crud.update_course(db, id, course_in)
     if not db_course:
         raise HTTPException(status_code=404, detail="Ooh no! Course not found")
-        
-    return crud.update_course(db, id, course_in)
+    return db_course
         
 @router.patch("/{id}/status", response_model=course.CourseOut)
 def toggle_course_status(id: int, admin=Depends(admin_required), db: Session = Depends(get_db)):
@@ -0,0 +1,82 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, get_async_read_db, replica_lag
+from api.deps import admin_required
+from core.config import settings
+from core.pagination import clamp_limit
+import crud_async
+from schemas import course
+from services import course_cache, seat_events
+
+# Same routes as api/v1/courses.py, served from AsyncSession (settings.DB_ASYNC)
+router = APIRouter(prefix="/courses", tags=["Courses"])
+
+@router.get("/", response_model=list[course.CourseOut])
+async def list_courses(
+    request: Request,
+    skip: Optional[int] = None, # Legacy offset paging: how many Courses to skip before starting to display
+    limit: int = 10, # Courses to show per page (capped at MAX_PAGE_SIZE)
+    search: str = None, # Search with keyword in Course title (Not case sensitive)
+    cursor: Optional[str] = None, # Opaque token from the X-Next-Cursor header of the previous page
+    sort: Literal["id", "title"] = "id",
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    limit = clamp_limit(limit)
+    key = course_cache.listing_key(skip, limit, search, cursor, sort)
+    version = course_cache.catalog_version()
+    entry = course_cache.lookup(request, key, version)
+    if entry is None:
+        if skip is not None:
+            courses = await crud_async.get_courses(db, skip=skip, limit=limit, search=search)
+            next_cursor = None
+        else:
+            courses, next_cursor = await crud_async.get_courses_page(db, limit=limit, cursor=cursor, sort=sort, search=search)
+        entry = course_cache.store_listing(key, version, courses, next_cursor, ttl=replica_lag(db))
+    return course_cache.respond(request, entry, settings.COURSE_LIST_CACHE_CONTROL)
+
+@router.get("/cache/stats")
+async def course_cache_stats(admin=Depends(admin_required)):
+    return course_cache.stats()
+
+@router.get("/{id}", response_model=course.CourseOut)
+async def get_course(request: Request, id: int, db: AsyncSession = Depends(get_async_read_db)):
+    version = course_cache.course_version(id)
+    entry = course_cache.lookup(request, course_cache.course_key(id), version)
+    if entry is None:
+        course = await crud_async.get_course(db, id)
+        if not course: raise HTTPException(status_code=404, detail="Ooh no! Course not found")
+        entry = course_cache.store_course(id, version, course, ttl=replica_lag(db))
+    return course_cache.respond(request, entry, settings.COURSE_DETAIL_CACHE_CONTROL)
+
+@router.get("/{id}/seats/stream")
+async def stream_seats(id: int, db: AsyncSession = Depends(get_async_db)):
+    subscription = seat_events.broker.subscribe(id)
+    try:
+        course = await crud_async.get_course(db, id)
+        if not course: raise HTTPException(status_code=404, detail="Ooh no! Course not found")
+        subscription.offer(seat_events.seat_state(course))
+    except BaseException:
+        subscription.close()
+        raise
+    finally:
+        await db.close()
+    return seat_events.event_stream(subscription)
+
+@router.post("/", response_model=course.CourseOut)
+async def create_course(course_in: course.CourseCreate, admin=Depends(admin_required), db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.create_course(db, course_in)
+
+@router.patch("/{id}", response_model=course.CourseOut)
+async def update_course(id: int, course_in: course.CourseUpdate, db: AsyncSession = Depends(get_async_db), admin=Depends(admin_required)):
+    db_course = await crud_async.update_course(db, id, course_in)
+    if not db_course:
+        raise HTTPException(status_code=404, detail="Ooh no! Course not found")
+    return db_course
+
+@router.patch("/{id}/status", response_model=course.CourseOut)
+async def toggle_course_status(id: int, admin=Depends(admin_required), db: AsyncSession = Depends(get_async_db)):
+    db_course = await crud_async.toggle_course(db, id)
+    if not db_course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return db_course
@@ -1,15 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_read_db
+from core.config import settings
+from core.pagination import clamp_limit
+from core.serialization import ModelList
 from api.deps import get_current_user, admin_required
+from api.limiter import enrollment_limit
 from schemas import enrollment
+from services import admission, bulk_enrollment, write_pipeline
 import crud
 from models import models
 
 router = APIRouter(tags=["Enrollments"])
 
+_enrollment_list = ModelList(enrollment.EnrollmentOut)
+
 # --- Student Endpoints ---
-@router.post("/enrollments", response_model=enrollment.EnrollmentOut)
+@router.post("/enrollments", response_model=enrollment.EnrollmentOut, dependencies=[enrollment_limit])
 def enroll(
     data: enrollment.EnrollmentCreate, 
     db: Session = Depends(get_db), 
@@ -19,25 +28,126 @@ def enroll(
         raise HTTPException(status_code=403, detail="Only students can enroll")
         
     # Pass the ID from the token
+    if settings.WRITE_PIPELINE_ENABLED:
+        return write_pipeline.pipeline.call(write_pipeline.enroll, data.course_id, current_user.id)
     return crud.enroll_student(db, data.course_id, current_user.id)
 
-@router.delete("/enrollments/{course_id}")
+@router.delete("/enrollments/{course_id}", dependencies=[enrollment_limit])
 def drop_course(course_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    if settings.WRITE_PIPELINE_ENABLED:
+        return write_pipeline.pipeline.call(write_pipeline.drop, course_id, current_user.id)
     return crud.delete_own_enrollment(db, course_id, current_user.id)
 
+@router.post("/enrollments/waitlist", response_model=enrollment.WaitlistOut, dependencies=[enrollment_limit])
+def join_waitlist(
+    data: enrollment.EnrollmentCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Only students can enroll")
+
+    # Drops promote the oldest entry automatically (see crud.fill_from_waitlist)
+    return crud.join_waitlist(db, data.course_id, current_user.id)
+
+@router.delete("/enrollments/waitlist/{course_id}", dependencies=[enrollment_limit])
+def leave_waitlist(course_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+    return crud.leave_waitlist(db, course_id, current_user.id)
+
+# --- Admission queue (settings.ADMISSION_QUEUE_ENABLED) ---
+@router.post(
+    "/enrollments/intents", response_model=enrollment.EnrollmentIntentOut,
+    status_code=status.HTTP_202_ACCEPTED, dependencies=[enrollment_limit]
+)
+def request_enrollment(
+    data: enrollment.EnrollmentCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if not settings.ADMISSION_QUEUE_ENABLED:
+        raise HTTPException(status_code=404, detail="The admission queue is not enabled")
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Only students can enroll")
+
+    intent = crud.create_enrollment_intent(db, data.course_id, current_user.id)
+    admission.worker.notify()
+    return intent
+
+@router.get("/enrollments/intents/{id}", response_model=enrollment.EnrollmentIntentOut)
+async def get_enrollment_request(
+    id: int,
+    wait: float = Query(0, ge=0), # Seconds to wait for a pending request's outcome
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    wait = min(wait, settings.ADMISSION_QUEUE_MAX_WAIT_SECONDS)
+    # Subscribe before reading, so an outcome published in between is not missed
+    subscription = admission.outcomes.subscribe(id) if wait else None
+    try:
+        intent = await run_in_threadpool(crud.get_enrollment_intent, db, id, current_user.id)
+        if intent.status == "pending" and subscription is not None:
+            db.close() # Don't hold a pooled connection while waiting
+            if await subscription.next(wait):
+                intent = await run_in_threadpool(crud.get_enrollment_intent, db, id, current_user.id)
+        return intent
+    finally:
+        if subscription is not None:
+            subscription.close()
+
 # --- Admin Endpoints ---
+def _enrollment_listing(db: Session, response: Response, skip, limit, cursor, course_id=None):
+    limit = clamp_limit(limit)
+    if skip is not None:
+        enrollments = crud.get_enrollments(db, skip=skip, limit=limit, course_id=course_id)
+        next_cursor = None
+    else:
+        enrollments, next_cursor = crud.get_enrollments_page(db, limit=limit, cursor=cursor, course_id=course_id)
+    if settings.FAST_JSON:
+        # Rows to JSON bytes in one pass; a returned Response skips response_model
+        return _enrollment_list.response(enrollments, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return enrollments
+
 @router.get("/admin/enrollments", response_model=list[enrollment.EnrollmentOut])
-def view_all_enrollments(admin=Depends(admin_required), db: Session = Depends(get_db)):
-    return db.query(models.Enrollment).all()
+def view_all_enrollments(
+    response: Response,
+    skip: Optional[int] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    admin=Depends(admin_required),
+    db: Session = Depends(get_read_db)
+):
+    return _enrollment_listing(db, response, skip, limit, cursor)
 
 @router.get("/admin/courses/{id}/enrollments", response_model=list[enrollment.EnrollmentOut])
-def view_course_enrollments(id: int, admin=Depends(admin_required), db: Session = Depends(get_db)):
+def view_course_enrollments(
+    id: int,
+    response: Response,
+    skip: Optional[int] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    admin=Depends(admin_required),
+    db: Session = Depends(get_read_db)
+):
     # Check to see if the course exists
     course = db.query(models.Course).filter(models.Course.id == id).first()
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
         
-    return db.query(models.Enrollment).filter(models.Enrollment.course_id == id).all()
+    return _enrollment_listing(db, response, skip, limit, cursor, course_id=id)
+
+@router.post(
+    "/admin/enrollments/bulk",
+    response_model=enrollment.BulkEnrollmentOut,
+    openapi_extra=bulk_enrollment.OPENAPI_REQUEST_BODY
+)
+async def bulk_enroll(request: Request, admin=Depends(admin_required), db: Session = Depends(get_db)):
+    # JSON {"items": [...]} or a text/csv upload; one transaction per chunk
+    results = []
+    async for chunk in bulk_enrollment.chunks(request):
+        results += await run_in_threadpool(crud.bulk_enroll_chunk, db, chunk)
+    return bulk_enrollment.summary(results)
 
 @router.delete("/admin/enrollments/{id}", status_code=status.HTTP_204_NO_CONTENT)
 def admin_remove_student(
@@ -45,7 +155,10 @@ def admin_remove_student(
     db: Session = Depends(get_db), 
     admin=Depends(admin_required) # Security layer
 ):
-    deleted_record = crud.admin_delete_enrollment(db, id)
+    if settings.WRITE_PIPELINE_ENABLED:
+        deleted_record = write_pipeline.pipeline.call(write_pipeline.admin_remove, id)
+    else:
+        deleted_record = crud.admin_delete_enrollment(db, id)
     if not deleted_record:
         raise HTTPException(status_code=404, detail="Enrollment record not found")
     
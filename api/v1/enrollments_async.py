@@ -0,0 +1,160 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, get_async_read_db
+from core.config import settings
+from core.pagination import clamp_limit
+from core.serialization import ModelList
+from api.deps import get_current_user, admin_required
+from api.limiter import enrollment_limit
+from schemas import enrollment
+from services import admission, bulk_enrollment, write_pipeline
+import crud
+import crud_async
+from models import models
+
+# Same routes as api/v1/enrollments.py, served from AsyncSession (settings.DB_ASYNC)
+router = APIRouter(tags=["Enrollments"])
+
+_enrollment_list = ModelList(enrollment.EnrollmentOut)
+
+# --- Student Endpoints ---
+@router.post("/enrollments", response_model=enrollment.EnrollmentOut, dependencies=[enrollment_limit])
+async def enroll(
+    data: enrollment.EnrollmentCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Only students can enroll")
+
+    if settings.WRITE_PIPELINE_ENABLED:
+        return await write_pipeline.pipeline.run(write_pipeline.enroll, data.course_id, current_user.id)
+    return await crud_async.enroll_student(db, data.course_id, current_user.id)
+
+@router.delete("/enrollments/{course_id}", dependencies=[enrollment_limit])
+async def drop_course(course_id: int, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_user)):
+    if settings.WRITE_PIPELINE_ENABLED:
+        return await write_pipeline.pipeline.run(write_pipeline.drop, course_id, current_user.id)
+    return await crud_async.delete_own_enrollment(db, course_id, current_user.id)
+
+@router.post("/enrollments/waitlist", response_model=enrollment.WaitlistOut, dependencies=[enrollment_limit])
+async def join_waitlist(
+    data: enrollment.EnrollmentCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Only students can enroll")
+
+    return await crud_async.join_waitlist(db, data.course_id, current_user.id)
+
+@router.delete("/enrollments/waitlist/{course_id}", dependencies=[enrollment_limit])
+async def leave_waitlist(course_id: int, db: AsyncSession = Depends(get_async_db), current_user: models.User = Depends(get_current_user)):
+    return await crud_async.leave_waitlist(db, course_id, current_user.id)
+
+# --- Admission queue (settings.ADMISSION_QUEUE_ENABLED) ---
+@router.post(
+    "/enrollments/intents", response_model=enrollment.EnrollmentIntentOut,
+    status_code=status.HTTP_202_ACCEPTED, dependencies=[enrollment_limit]
+)
+async def request_enrollment(
+    data: enrollment.EnrollmentCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if not settings.ADMISSION_QUEUE_ENABLED:
+        raise HTTPException(status_code=404, detail="The admission queue is not enabled")
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Only students can enroll")
+
+    intent = await crud_async.create_enrollment_intent(db, data.course_id, current_user.id)
+    admission.worker.notify()
+    return intent
+
+@router.get("/enrollments/intents/{id}", response_model=enrollment.EnrollmentIntentOut)
+async def get_enrollment_request(
+    id: int,
+    wait: float = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    wait = min(wait, settings.ADMISSION_QUEUE_MAX_WAIT_SECONDS)
+    subscription = admission.outcomes.subscribe(id) if wait else None
+    try:
+        intent = await crud_async.get_enrollment_intent(db, id, current_user.id)
+        if intent.status == "pending" and subscription is not None:
+            await db.close()
+            if await subscription.next(wait):
+                intent = await crud_async.get_enrollment_intent(db, id, current_user.id)
+        return intent
+    finally:
+        if subscription is not None:
+            subscription.close()
+
+# --- Admin Endpoints ---
+async def _enrollment_listing(db: AsyncSession, response: Response, skip, limit, cursor, course_id=None):
+    limit = clamp_limit(limit)
+    if skip is not None:
+        enrollments = await crud_async.get_enrollments(db, skip=skip, limit=limit, course_id=course_id)
+        next_cursor = None
+    else:
+        enrollments, next_cursor = await crud_async.get_enrollments_page(db, limit=limit, cursor=cursor, course_id=course_id)
+    if settings.FAST_JSON:
+        # Rows to JSON bytes in one pass; a returned Response skips response_model
+        return _enrollment_list.response(enrollments, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return enrollments
+
+@router.get("/admin/enrollments", response_model=list[enrollment.EnrollmentOut])
+async def view_all_enrollments(
+    response: Response,
+    skip: Optional[int] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    admin=Depends(admin_required),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await _enrollment_listing(db, response, skip, limit, cursor)
+
+@router.get("/admin/courses/{id}/enrollments", response_model=list[enrollment.EnrollmentOut])
+async def view_course_enrollments(
+    id: int,
+    response: Response,
+    skip: Optional[int] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    admin=Depends(admin_required),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    if not await crud_async.get_course(db, id):
+        raise HTTPException(status_code=404, detail="Course not found")
+
+    return await _enrollment_listing(db, response, skip, limit, cursor, course_id=id)
+
+@router.post(
+    "/admin/enrollments/bulk",
+    response_model=enrollment.BulkEnrollmentOut,
+    openapi_extra=bulk_enrollment.OPENAPI_REQUEST_BODY
+)
+async def bulk_enroll(request: Request, admin=Depends(admin_required), db: AsyncSession = Depends(get_async_db)):
+    results = []
+    async for chunk in bulk_enrollment.chunks(request):
+        results += await db.run_sync(crud.bulk_enroll_chunk, chunk)
+    return bulk_enrollment.summary(results)
+
+@router.delete("/admin/enrollments/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def admin_remove_student(
+    id: int,
+    db: AsyncSession = Depends(get_async_db),
+    admin=Depends(admin_required)
+):
+    if settings.WRITE_PIPELINE_ENABLED:
+        deleted_record = await write_pipeline.pipeline.run(write_pipeline.admin_remove, id)
+    else:
+        deleted_record = await crud_async.admin_delete_enrollment(db, id)
+    if not deleted_record:
+        raise HTTPException(status_code=404, detail="Enrollment record not found")
+
+    return None
@@ -0,0 +1,88 @@
+import csv
+import io
+from datetime import datetime
+from typing import Literal, Optional
+import orjson
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from database import get_db
+from api.deps import admin_required
+import crud
+
+router = APIRouter(prefix="/admin/exports", tags=["Exports"])
+
+ExportFormat = Literal["ndjson", "csv"]
+
+# --- Streaming writers ---
+# Each chunk is one cursor batch, so only EXPORT_BATCH_SIZE rows are ever in memory.
+
+def _ndjson_chunks(result):
+    keys = list(result.keys())
+    try:
+        for batch in result.partitions():
+            yield b"".join(orjson.dumps(dict(zip(keys, row))) + b"\n" for row in batch)
+    finally:
+        result.close()
+
+def _csv_chunks(result):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.keys())
+    try:
+        for batch in result.partitions():
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    finally:
+        result.close()
+    if buffer.tell():
+        yield buffer.getvalue() # Header only: nothing matched the filters
+
+def _stream(result, format: ExportFormat, name: str):
+    if format == "csv":
+        body, media_type = _csv_chunks(result), "text/csv"
+    else:
+        body, media_type = _ndjson_chunks(result), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'}
+    )
+
+# --- Admin Endpoints ---
+@router.get("/enrollments")
+def export_enrollments(
+    format: ExportFormat = "ndjson",
+    course_id: Optional[int] = None,
+    since: Optional[datetime] = None, # Enrolled at or after
+    until: Optional[datetime] = None, # Enrolled before
+    include_user: bool = False, # Adds user_name and user_email columns
+    include_course: bool = False, # Adds course_code and course_title columns
+    admin=Depends(admin_required),
+    db: Session = Depends(get_db)
+):
+    result = crud.export_enrollments(
+        db,
+        course_id=course_id,
+        since=since,
+        until=until,
+        include_user=include_user,
+        include_course=include_course
+    )
+    return _stream(result, format, "enrollments")
+
+@router.get("/audit")
+def export_audit_log(
+    format: ExportFormat = "ndjson",
+    action: Optional[Literal["ENROLLED", "DROPPED", "ADMIN_REMOVED"]] = None,
+    user_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    admin=Depends(admin_required),
+    db: Session = Depends(get_db)
+):
+    result = crud.export_audit_log(db, action=action, user_id=user_id, course_id=course_id, since=since, until=until)
+    return _stream(result, format, "enrollment_audit")
@@ -1,32 +1,88 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
 from database import engine, Base
-from api.v1 import auth, users, courses, enrollments
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from api.v1 import auth, users, courses, enrollments, exports
+from api.v1 import courses_async, enrollments_async
+from core import load_shedding, metrics, read_your_writes
+from core.config import settings
+from services import admission, audit, idempotency, write_pipeline
+from api.deps import metrics_token_required
+from api.limiter import limiter
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
+if settings.SENTRY_DSN:
+    import sentry_sdk
+    # The FastAPI, Starlette and SQLAlchemy integrations switch on by themselves
+    sentry_sdk.init(dsn=settings.SENTRY_DSN, traces_sample_rate=settings.SENTRY_TRACES_SAMPLE_RATE)
+
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.ADMISSION_QUEUE_ENABLED:
+        admission.worker.start()
+    if settings.AUDIT_RELAY_ENABLED:
+        audit.relay.start()
+    if settings.WRITE_PIPELINE_ENABLED:
+        write_pipeline.pipeline.start()
+    yield
+    await write_pipeline.pipeline.stop()
+    await admission.worker.stop()
+    await audit.relay.stop()
+
 app = FastAPI(
     title="Course Enrollment API",
     description="A secure, role-based platform for university enrollments.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse if settings.FAST_JSON else JSONResponse
 )
 
 # handle rate limmiting
-limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+if settings.RATELIMIT_DEFAULT:
+    # Only default limits need the middleware; decorated and user_limit routes check themselves
+    app.add_middleware(SlowAPIMiddleware)
+
+if settings.DATABASE_REPLICA_URLS:
+    # Reads after a client's own writes go to the primary (see database.ReadRouting)
+    app.add_middleware(read_your_writes.ReadYourWritesMiddleware)
+
+if settings.LOAD_SHEDDING_ENABLED:
+    # Inside the idempotency layer, so replays are never shed and 503s are never stored
+    app.add_middleware(load_shedding.LoadSheddingMiddleware)
+
+if settings.IDEMPOTENCY_ENABLED:
+    # Retried POST /enrollments and POST /auth/register with an Idempotency-Key get the original response
+    app.add_middleware(idempotency.IdempotencyMiddleware)
+
+# Added last so it is outermost and times the whole stack
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 # Include Routers
 app.include_router(auth.router)
 app.include_router(users.router)
-app.include_router(courses.router)
-app.include_router(enrollments.router)
+if settings.DB_ASYNC:
+    app.include_router(courses_async.router)
+    app.include_router(enrollments_async.router)
+else:
+    app.include_router(courses.router)
+    app.include_router(enrollments.router)
+app.include_router(exports.router)
 
 @app.get("/")
 def General():
-    return {"message": "Welcome to the Course Enrollment API. Visit /docs for Swagger UI."}
\ No newline at end of file
+    return {"message": "Welcome to the Course Enrollment API. Visit /docs for Swagger UI."}
+
+if settings.METRICS_ENABLED:
+    # Route names, latencies and pool sizes are for operators only: the scraper
+    # sends METRICS_TOKEN as its bearer token
+    @app.get("/metrics", include_in_schema=False, dependencies=[Depends(metrics_token_required)])
+    def prometheus_metrics():
+        return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
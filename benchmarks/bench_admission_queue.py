@@ -0,0 +1,125 @@
+"""
+Registration-day burst: POST /enrollments vs the admission queue.
+
+    python -m benchmarks.bench_admission_queue
+    python -m benchmarks.bench_admission_queue --students 5000 --capacity 200
+
+Runs the app in-process over ASGI against a temporary SQLite file. --students
+students (each with their own JWT, --concurrency in flight) all try to enroll
+in one course with --capacity seats. The direct path sends POST /enrollments;
+the queued path sends POST /enrollments/intents and then drains the queue
+with the admission worker, which enrolls the first --capacity intents and
+waitlists the rest. Reported: request latency percentiles, and the time
+until every student had their outcome.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import httpx
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import sessionmaker
+from api.limiter import limiter
+from app import app
+from core.config import settings
+from core.security import create_access_token
+from database import Base, create_db_engine, get_db
+from models import models
+from services.admission import AdmissionWorker
+
+
+async def burst(client, path, students, course_id, concurrency):
+    queue = iter(range(1, students + 1))
+    latencies, statuses = [], []
+
+    async def worker():
+        for user_id in queue:
+            token = create_access_token({"sub": f"student{user_id}@bench.test", "id": user_id, "role": "student"})
+            start = time.perf_counter()
+            response = await client.post(path, json={"course_id": course_id}, headers={"Authorization": f"Bearer {token}"})
+            latencies.append(time.perf_counter() - start)
+            statuses.append(response.status_code)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, latencies, statuses
+
+
+def percentile(values, pct):
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--capacity", type=int, default=100, help="seats in the contested course")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight")
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    settings.ADMISSION_QUEUE_ENABLED = True
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(models.User), [
+                {"id": i, "name": f"Student {i}", "email": f"student{i}@bench.test",
+                 "hashed_password": "unused", "role": "student", "is_active": True}
+                for i in range(1, args.students + 1)
+            ])
+            conn.execute(insert(models.Course), [
+                {"id": i, "title": f"Popular {i}", "code": f"POP{i}", "capacity": args.capacity, "is_active": True}
+                for i in (1, 2)
+            ])
+        BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def bench_db():
+            db = BenchSession()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = bench_db
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                direct = await burst(client, "/enrollments", args.students, 1, args.concurrency)
+                queued = await burst(client, "/enrollments/intents", args.students, 2, args.concurrency)
+                start = time.perf_counter()
+                applied = await AdmissionWorker(BenchSession).drain()
+                drain_time = time.perf_counter() - start
+            assert applied == args.students, applied
+            return direct, queued, drain_time
+
+        direct, queued, drain_time = asyncio.run(run())
+        app.dependency_overrides.clear()
+        with BenchSession() as db:
+            seats = dict(db.execute(select(models.Course.id, models.Course.enrolled_count)).all())
+            waitlisted = db.scalar(select(func.count()).select_from(models.Waitlist))
+        engine.dispose()
+
+    direct_time, direct_latencies, direct_statuses = direct
+    queued_time, queued_latencies, queued_statuses = queued
+    assert seats == {1: args.capacity, 2: args.capacity}, seats
+    assert set(queued_statuses) == {202}, set(queued_statuses)
+
+    print(f"{args.students} students, {args.capacity} seats, {args.concurrency} in flight")
+    print(f"{'path':<22} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'all outcomes':>13}")
+    for label, elapsed, latencies, total in (
+        ("POST /enrollments", direct_time, direct_latencies, direct_time),
+        ("POST /intents + drain", queued_time, queued_latencies, queued_time + drain_time),
+    ):
+        print(
+            f"{label:<22} {args.students / elapsed:>8.0f} {percentile(latencies, 50):>8.1f} "
+            f"{percentile(latencies, 95):>8.1f} {percentile(latencies, 99):>8.1f} {total:>12.2f}s"
+        )
+    print(f"direct: {direct_statuses.count(200)} enrolled, {direct_statuses.count(400)} turned away")
+    print(f"queued: {args.capacity} enrolled, {waitlisted} waitlisted in arrival order (drain {drain_time * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
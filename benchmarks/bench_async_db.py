@@ -0,0 +1,170 @@
+"""
+Sync vs async database path under 1k concurrent requests.
+
+    python -m benchmarks.bench_async_db
+    python -m benchmarks.bench_async_db --concurrency 1000 --rounds 3
+
+Builds two in-process apps over the same temporary SQLite file: one with the
+sync routers (sessions in the AnyIO threadpool) and one with the AsyncSession
+routers that DB_ASYNC switches on. Each scenario fires --concurrency requests
+at once over ASGI and reports requests/s and latency percentiles.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import httpx
+from fastapi import FastAPI, Request
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from api.deps import get_current_user
+from api.v1 import courses, courses_async, enrollments, enrollments_async
+from database import Base, get_async_db, get_async_read_db, get_db, get_read_db, to_async_url
+from models import models
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def bench_user(request: Request):
+    # Each request names its student, so enrollments never collide
+    return SimpleNamespace(id=int(request.headers["X-Bench-User"]), role="student")
+
+
+def build_app(routers, overrides):
+    app = FastAPI()
+    for router in routers:
+        app.include_router(router)
+    app.dependency_overrides.update(overrides)
+    app.dependency_overrides[get_current_user] = bench_user
+    return app
+
+
+async def timed(client, method, path, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, path, **kwargs)
+    assert response.status_code == 200, response.text
+    return (time.perf_counter() - start) * 1000
+
+
+async def scenario(app, requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(timed(client, method, path, **kwargs) for method, path, kwargs in requests))
+        return samples, time.perf_counter() - start
+
+
+def workloads(concurrency, course_ids, first_user):
+    return {
+        "GET /courses/": [("GET", "/courses/", {"params": {"limit": 20}})] * concurrency,
+        "GET /courses/{id}": [("GET", f"/courses/{course_ids[i % len(course_ids)]}", {}) for i in range(concurrency)],
+        "POST /enrollments": [
+            ("POST", "/enrollments", {
+                "json": {"course_id": course_ids[i % len(course_ids)]},
+                "headers": {"X-Bench-User": str(first_user + i)},
+            })
+            for i in range(concurrency)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=1000, help="requests in flight at once")
+    # A sync handler returns while its session still holds a connection, and FastAPI
+    # then validates the response on a worker thread. Once every worker thread is
+    # blocked on pool checkout, the requests holding the connections can never
+    # finish, so any sync pool smaller than the concurrency stalls until pool_timeout.
+    parser.add_argument("--sync-pool-size", type=int, default=0, help="sync connections (default: --concurrency)")
+    parser.add_argument("--async-pool-size", type=int, default=40, help="async connections")
+    parser.add_argument("--rounds", type=int, default=3, help="repetitions per scenario (best round is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        # The sync path needs a connection per in-flight request (see --sync-pool-size)
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False, "timeout": 30},
+            pool_size=args.sync_pool_size or args.concurrency,
+            max_overflow=0
+        )
+        Base.metadata.create_all(bind=engine)
+        BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with BenchSession() as db:
+            db.add_all(
+                models.Course(title=f"Course {i}", code=f"B{i}", capacity=1_000_000, is_active=True)
+                for i in range(200)
+            )
+            db.commit()
+            course_ids = [c.id for c in db.query(models.Course.id)]
+
+        async_engine = create_async_engine(
+            to_async_url(url),
+            connect_args={"timeout": 30},
+            pool_size=args.async_pool_size,
+            max_overflow=0,
+            pool_timeout=300
+        )
+        AsyncBenchSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        def bench_db():
+            db = BenchSession()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        async def bench_async_db():
+            async with AsyncBenchSession() as db:
+                yield db
+
+        apps = {
+            "sync": build_app(
+                [courses.router, enrollments.router], {get_db: bench_db, get_read_db: bench_db}
+            ),
+            "async": build_app(
+                [courses_async.router, enrollments_async.router],
+                {get_async_db: bench_async_db, get_async_read_db: bench_async_db}
+            ),
+        }
+
+        async def run():
+            rows = []
+            next_user = 1
+            for round_ in range(args.rounds):
+                for mode, app in apps.items():
+                    for label, requests in workloads(args.concurrency, course_ids, next_user).items():
+                        samples, elapsed = await scenario(app, requests)
+                        rows.append((label, mode, samples, elapsed))
+                        print(f"round {round_ + 1}: {label} ({mode}) {elapsed:.2f}s", flush=True)
+                    next_user += args.concurrency
+            return rows
+
+        rows = asyncio.run(run())
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+
+    best = {}
+    for label, mode, samples, elapsed in rows:
+        if (label, mode) not in best or elapsed < best[label, mode][1]:
+            best[label, mode] = (samples, elapsed)
+
+    print(f"{args.concurrency} concurrent requests, best of {args.rounds} rounds")
+    print(f"{'scenario':<20} {'mode':<6} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for (label, mode), (samples, elapsed) in best.items():
+        print(
+            f"{label:<20} {mode:<6} {len(samples) / elapsed:>8.0f} {statistics.median(samples):>7.1f}ms "
+            f"{percentile(samples, 95):>7.1f}ms {percentile(samples, 99):>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Audit cost on the enrollment hot path: outbox vs writing enrollment_audit directly.
+
+    python -m benchmarks.bench_audit_outbox
+    python -m benchmarks.bench_audit_outbox --enrollments 5000 --history 500000
+
+Calls crud.enroll_student / crud.delete_own_enrollment back to back against a
+temporary SQLite file whose enrollment_audit already holds --history events.
+"direct" inserts each event into the indexed enrollment_audit table inside
+the request transaction (how audit rows were written before the outbox);
+"outbox" is the current path. Also reports how fast AuditRelay moves the
+queued events into enrollment_audit.
+"""
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from database import Base, create_db_engine
+from models import models
+from services import audit
+import crud
+
+
+def churn(Session, students, course_ids):
+    """One enrollment and one drop per student; returns the seconds per operation."""
+    start = time.perf_counter()
+    with Session() as db:
+        for user_id in students:
+            course_id = course_ids[user_id % len(course_ids)]
+            crud.enroll_student(db, course_id, user_id)
+            crud.delete_own_enrollment(db, course_id, user_id)
+    return (time.perf_counter() - start) / (2 * len(students))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--enrollments", type=int, default=3000, help="enroll/drop pairs per mode")
+    parser.add_argument("--history", type=int, default=300_000, help="events already in enrollment_audit")
+    parser.add_argument("--courses", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        rng = random.Random(42)
+        now = datetime.now(timezone.utc)
+        with engine.begin() as conn:
+            conn.execute(insert(models.Course), [
+                {"id": i, "title": f"Course {i}", "code": f"A{i}", "capacity": 10**6, "is_active": True}
+                for i in range(1, args.courses + 1)
+            ])
+            conn.execute(insert(models.EnrollmentAudit), [
+                {"enrollment_id": i, "action": rng.choice(audit.ACTIONS), "user_id": rng.randrange(10**6),
+                 "course_id": rng.randrange(1, args.courses + 1), "timestamp": now}
+                for i in range(1, args.history + 1)
+            ])
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        course_ids = list(range(1, args.courses + 1))
+
+        # Baseline: point the commit-time writer at enrollment_audit itself
+        outbox_models = audit.models
+        audit.models = SimpleNamespace(AuditOutbox=models.EnrollmentAudit)
+        direct = churn(Session, range(1, args.enrollments + 1), course_ids)
+        audit.models = outbox_models
+        outbox = churn(Session, range(args.enrollments + 1, 2 * args.enrollments + 1), course_ids)
+
+        start = time.perf_counter()
+        relayed = audit.AuditRelay(Session)._relay_all()
+        relay_time = time.perf_counter() - start
+        engine.dispose()
+
+    print(f"{2 * args.enrollments} enroll/drop operations per mode, {args.history} events of history")
+    print(f"{'audit write':<12} {'ms/op':>8} {'ops/s':>8}")
+    for label, seconds in (("direct", direct), ("outbox", outbox)):
+        print(f"{label:<12} {seconds * 1000:>8.3f} {1 / seconds:>8.0f}")
+    print(f"relay: {relayed} events in {relay_time * 1000:.0f} ms ({relayed / relay_time:.0f} events/s)")
+
+
+if __name__ == "__main__":
+    main()
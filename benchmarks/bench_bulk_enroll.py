@@ -0,0 +1,124 @@
+"""
+Bulk enrollment vs one POST /enrollments per student.
+
+    python -m benchmarks.bench_bulk_enroll
+    python -m benchmarks.bench_bulk_enroll --rows 50000 --singles 2000
+
+Runs the app in-process over ASGI against a temporary SQLite file. The
+single-item path is measured with --singles real requests (each with its own
+student's JWT, --concurrency in flight) and its rate is extrapolated to
+--rows. The bulk path loads --rows fresh (user_id, course_id) pairs through
+POST /admin/enrollments/bulk, once as JSON and once as a CSV upload.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from api.deps import admin_required
+from api.limiter import limiter
+from app import app
+from core.security import create_access_token
+from database import Base, create_db_engine, get_db
+from models import models
+
+
+async def singles(client, pairs, concurrency):
+    queue = iter(pairs)
+
+    async def worker():
+        for user_id, course_id in queue:
+            token = create_access_token({"sub": f"student{user_id}@bench.test", "id": user_id, "role": "student"})
+            response = await client.post(
+                "/enrollments",
+                json={"course_id": course_id},
+                headers={"Authorization": f"Bearer {token}"}
+            )
+            assert response.status_code == 200, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def bulk(client, pairs, as_csv):
+    start = time.perf_counter()
+    if as_csv:
+        body = "user_id,course_id\n" + "".join(f"{u},{c}\n" for u, c in pairs)
+        response = await client.post("/admin/enrollments/bulk", content=body.encode(), headers={"Content-Type": "text/csv"})
+    else:
+        items = [{"user_id": u, "course_id": c} for u, c in pairs]
+        response = await client.post("/admin/enrollments/bulk", json={"items": items})
+    assert response.status_code == 200, response.text
+    assert response.json()["enrolled"] == len(pairs), response.json()["failed"]
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50_000, help="pairs per bulk load")
+    parser.add_argument("--singles", type=int, default=2000, help="single-item requests to time")
+    parser.add_argument("--concurrency", type=int, default=16, help="single-item requests in flight")
+    parser.add_argument("--courses", type=int, default=500)
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    students = args.singles + 2 * args.rows
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(models.User), [
+                {"id": i, "name": f"Student {i}", "email": f"student{i}@bench.test",
+                 "hashed_password": "unused", "role": "student", "is_active": True}
+                for i in range(1, students + 1)
+            ])
+            conn.execute(insert(models.Course), [
+                {"id": i, "title": f"Course {i}", "code": f"B{i}", "capacity": students, "is_active": True}
+                for i in range(1, args.courses + 1)
+            ])
+        BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def bench_db():
+            db = BenchSession()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = bench_db
+
+        def course_for(user_id):
+            return user_id % args.courses + 1
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                single_pairs = [(u, course_for(u)) for u in range(1, args.singles + 1)]
+                single_time = await singles(client, single_pairs, args.concurrency)
+
+                app.dependency_overrides[admin_required] = lambda: {"id": 0, "role": "admin"}
+                first = args.singles + 1
+                json_pairs = [(u, course_for(u)) for u in range(first, first + args.rows)]
+                csv_pairs = [(u, course_for(u)) for u in range(first + args.rows, first + 2 * args.rows)]
+                json_time = await bulk(client, json_pairs, as_csv=False)
+                csv_time = await bulk(client, csv_pairs, as_csv=True)
+            return single_time, json_time, csv_time
+
+        single_time, json_time, csv_time = asyncio.run(run())
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+    single_rate = args.singles / single_time
+    print(f"{'path':<34} {'rows/s':>10} {f'time for {args.rows} rows':>22} {'speedup':>8}")
+    print(f"{'POST /enrollments (extrapolated)':<34} {single_rate:>10.0f} {args.rows / single_rate:>21.1f}s {'1x':>8}")
+    for label, elapsed in (("bulk JSON", json_time), ("bulk CSV", csv_time)):
+        rate = args.rows / elapsed
+        print(f"{label:<34} {rate:>10.0f} {elapsed:>21.1f}s {rate / single_rate:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Course catalog reads with and without the response cache.
+
+    python -m benchmarks.bench_course_cache
+    python -m benchmarks.bench_course_cache --requests 5000 --courses 2000 --shared
+
+Runs the app in-process over ASGI against a temporary SQLite file seeded with
+--courses courses. Each scenario sends --requests reads (--concurrency in
+flight) spread over the first --pages listing pages or over every course
+detail, once with COURSE_CACHE_MAX_ENTRIES=0 and once with the cache on, and
+reports requests/s, latency percentiles and the cache's hit ratio. A third
+run repeats the cached one with each response's ETag in If-None-Match, as a
+polling client would, and expects 304s. --shared puts the memory:// stand-in
+behind the in-process LRU.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from api.limiter import limiter
+from app import app
+from core.cache import LocalStore, VersionedCache
+from core.config import settings
+from database import Base, create_db_engine, get_db, get_read_db
+from models import models
+from services import course_cache
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def timed(client, semaphore, path, params, etags):
+    async with semaphore:
+        headers = {"If-None-Match": etags[path, str(params)]} if etags is not None else {}
+        start = time.perf_counter()
+        response = await client.get(path, params=params, headers=headers)
+        assert response.status_code == (304 if etags is not None else 200), response.text
+        elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, (path, str(params)), response.headers["ETag"]
+
+
+async def scenario(requests, concurrency, etags=None):
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(timed(client, semaphore, path, params, etags) for path, params in requests))
+        elapsed = time.perf_counter() - start
+    return [sample for sample, _, _ in results], elapsed, {key: etag for _, key, etag in results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000, help="reads per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight")
+    parser.add_argument("--courses", type=int, default=2000)
+    parser.add_argument("--pages", type=int, default=20, help="distinct listing pages requested")
+    parser.add_argument("--shared", action="store_true", help="add the memory:// shared tier")
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(models.Course), [
+                {"id": i, "title": f"Course {i}", "code": f"B{i}", "capacity": 100, "is_active": True}
+                for i in range(1, args.courses + 1)
+            ])
+        BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def bench_db():
+            db = BenchSession()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = app.dependency_overrides[get_read_db] = bench_db
+        workloads = {
+            "GET /courses/": [
+                ("/courses/", {"skip": (i % args.pages) * 20, "limit": 20}) for i in range(args.requests)
+            ],
+            "GET /courses/{id}": [
+                (f"/courses/{i % args.courses + 1}", {}) for i in range(args.requests)
+            ],
+        }
+
+        rows = []
+        for label, requests in workloads.items():
+            for mode in ("off", "on", "304"):
+                if mode != "304":
+                    course_cache.cache = VersionedCache(
+                        "courses",
+                        maxsize=settings.COURSE_CACHE_MAX_ENTRIES if mode == "on" else 0,
+                        ttl=settings.COURSE_CACHE_TTL_SECONDS,
+                        shared=LocalStore() if args.shared else None
+                    )
+                samples, elapsed, etags = asyncio.run(
+                    scenario(requests, args.concurrency, etags if mode == "304" else None)
+                )
+                rows.append((label, mode, samples, elapsed, course_cache.stats()["hit_ratio"]))
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+    print(f"{args.requests} requests per scenario, {args.concurrency} in flight, {args.courses} courses")
+    print(f"{'scenario':<20} {'cache':<6} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'hit ratio':>10}")
+    for label, mode, samples, elapsed, hit_ratio in rows:
+        print(
+            f"{label:<20} {mode:<6} {len(samples) / elapsed:>8.0f} "
+            f"{statistics.median(samples):>7.1f}ms {percentile(samples, 95):>7.1f}ms "
+            f"{percentile(samples, 99):>7.1f}ms {hit_ratio:>10.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
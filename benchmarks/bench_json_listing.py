@@ -0,0 +1,117 @@
+"""
+CPU per 1,000-item listing page: default JSON path vs FAST_JSON.
+
+    python -m benchmarks.bench_json_listing
+    python -m benchmarks.bench_json_listing --items 1000 --requests 300
+
+Serves GET /admin/enrollments?skip=0&limit=--items in-process over ASGI from a
+temporary SQLite file, in three configurations:
+
+  default     response_model validation of the page's rows, JSONResponse
+  orjson      the same, with ORJSONResponse as the default response class
+  fast_json   FAST_JSON=1: the rows go to bytes in one TypeAdapter pass
+
+The default response class is fixed when the app is imported, so each
+FAST_JSON value runs in its own subprocess. CPU is process time per request
+(the client's share included, which is the same in every configuration).
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CONFIGS = (("default", "false", False), ("orjson", "true", False), ("fast_json", "true", True))
+
+
+def worker(items, requests, fast_json):
+    import httpx
+    from sqlalchemy import insert
+    from sqlalchemy.orm import sessionmaker
+    from api.deps import admin_required
+    from app import app
+    from core.config import settings
+    from database import Base, create_db_engine, get_db, get_read_db
+    from models import models
+
+    settings.MAX_PAGE_SIZE = items
+    settings.FAST_JSON = fast_json
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(models.User), [
+                {"id": i, "name": f"Student {i}", "email": f"student{i}@bench.test",
+                 "hashed_password": "unused", "role": "student", "is_active": True}
+                for i in range(1, items + 1)
+            ])
+            conn.execute(insert(models.Course), [{"id": 1, "title": "Course", "code": "B1", "capacity": items, "is_active": True}])
+            conn.execute(insert(models.Enrollment), [{"user_id": i, "course_id": 1} for i in range(1, items + 1)])
+        BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def bench_db():
+            db = BenchSession()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = app.dependency_overrides[get_read_db] = bench_db
+        app.dependency_overrides[admin_required] = lambda: {"id": 0, "role": "admin"}
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                params = {"skip": 0, "limit": items}
+                body = None
+                for _ in range(20): # Warm-up
+                    response = await client.get("/admin/enrollments", params=params)
+                    assert response.status_code == 200 and len(response.json()) == items, response.text
+                    body = response.content
+                cpu, wall = time.process_time(), time.perf_counter()
+                for _ in range(requests):
+                    await client.get("/admin/enrollments", params=params)
+                return time.process_time() - cpu, time.perf_counter() - wall, len(body)
+
+        cpu, wall, size = asyncio.run(run())
+        app.dependency_overrides.clear()
+        engine.dispose()
+    return {"cpu_ms": cpu / requests * 1000, "wall_ms": wall / requests * 1000, "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=1000, help="rows per page")
+    parser.add_argument("--requests", type=int, default=300, help="timed requests per configuration")
+    parser.add_argument("--worker", choices=[name for name, _, _ in CONFIGS], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        fast_json = dict((name, fast_json) for name, _, fast_json in CONFIGS)[args.worker]
+        print(json.dumps(worker(args.items, args.requests, fast_json)))
+        return
+
+    results = {}
+    for name, env_fast_json, _ in CONFIGS:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_json_listing", "--worker", name,
+             "--items", str(args.items), "--requests", str(args.requests)],
+            env={**os.environ, "FAST_JSON": env_fast_json, "AUDIT_RELAY_ENABLED": "false"},
+            capture_output=True, text=True, check=True
+        )
+        results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    base = results["default"]["cpu_ms"]
+    print(f"GET /admin/enrollments, {args.items} items per page, {args.requests} requests")
+    print(f"{'configuration':<12} {'cpu ms/req':>11} {'wall ms/req':>12} {'bytes':>8} {'cpu saved':>10}")
+    for name, result in results.items():
+        saved = 1 - result["cpu_ms"] / base
+        print(f"{name:<12} {result['cpu_ms']:>11.2f} {result['wall_ms']:>12.2f} {result['bytes']:>8} {saved:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Enrollment latency while a catalog browsing flood saturates the server, with and without load shedding.
+
+    python -m benchmarks.bench_load_shedding
+    python -m benchmarks.bench_load_shedding --browsers 400 --students 40 --seconds 15
+
+Runs the app in-process over ASGI against a temporary SQLite file (a fresh
+one per mode). For --seconds, --browsers clients page through GET /courses/
+back to back while --students clients enroll into one course after another.
+Browsers that get a 503 wait out its Retry-After, as a well-behaved client
+would. Without shedding every request competes for the same worker threads,
+so enrollments wait behind the whole browsing backlog. With
+LoadSheddingMiddleware (the LOAD_SHEDDING_* settings), browsing is held to
+its budget and enrollments are admitted first.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import httpx
+from sqlalchemy.orm import sessionmaker
+from api.limiter import limiter
+from app import app
+from benchmarks.bench_write_pipeline import prepare
+from core import load_shedding
+from core.config import settings
+from core.security import create_access_token
+from database import get_db, get_read_db
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def browser(client, until, courses, stats):
+    rng = random.Random()
+    while time.perf_counter() < until:
+        response = await client.get("/courses/", params={"skip": rng.randrange(courses), "limit": 20})
+        if response.status_code == 503:
+            stats["shed"] += 1
+            await asyncio.sleep(int(response.headers["Retry-After"]))
+        else:
+            stats["served"] += 1
+
+
+async def student(client, user_id, until, courses, latencies, stats):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': f'student{user_id}@bench.test', 'id': user_id, 'role': 'student'})}"}
+    course_id = 0
+    while time.perf_counter() < until and course_id < courses:
+        course_id += 1
+        start = time.perf_counter()
+        response = await client.post("/enrollments", json={"course_id": course_id}, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        stats[response.status_code] = stats.get(response.status_code, 0) + 1
+
+
+async def run(asgi_app, args):
+    browsing = {"served": 0, "shed": 0}
+    enrolling, latencies = {}, []
+    until = time.perf_counter() + args.seconds
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await asyncio.gather(
+            *(browser(client, until, args.courses, browsing) for _ in range(args.browsers)),
+            *(student(client, user_id, until, args.courses, latencies, enrolling) for user_id in range(1, args.students + 1)),
+        )
+    return browsing, enrolling, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--browsers", type=int, default=200)
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--courses", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n, label in enumerate(("unlimited", "load shedding")):
+            engine = prepare(f"sqlite:///{Path(tmp) / f'bench{n}.db'}", args.students, args.courses)
+            BenchSession = sessionmaker(autoflush=False, bind=engine)
+
+            def bench_db():
+                with BenchSession() as db:
+                    yield db
+
+            app.dependency_overrides[get_db] = bench_db
+            app.dependency_overrides[get_read_db] = bench_db
+            load_shedding.shedder = load_shedding.LoadShedder.from_settings()
+            asgi_app = load_shedding.LoadSheddingMiddleware(app) if n else app
+            rows.append((label, *asyncio.run(run(asgi_app, args))))
+            engine.dispose()
+
+    print(f"{args.browsers} browsers, {args.students} students, {args.seconds:.0f}s, "
+          f"LOAD_SHEDDING_BROWSE_CONCURRENCY={settings.LOAD_SHEDDING_BROWSE_CONCURRENCY}")
+    print(f"{'mode':<14} {'enroll/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'browse/s':>9} {'browse 503':>11}")
+    for label, browsing, enrolling, latencies in rows:
+        print(
+            f"{label:<14} {len(latencies) / args.seconds:>9.1f} {statistics.median(latencies):>7.1f}ms "
+            f"{percentile(latencies, 95):>7.1f}ms {percentile(latencies, 99):>7.1f}ms "
+            f"{browsing['served'] / args.seconds:>9.1f} {browsing['shed']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Catalog latency during a login storm.
+
+    python -m benchmarks.bench_login_storm
+    python -m benchmarks.bench_login_storm --logins 400 --probes 200
+
+Runs the app in-process over ASGI against a temporary SQLite file. While a
+burst of concurrent logins hits the server, a probe client keeps calling
+GET /courses/ and records its latency. The storm is run twice: once against
+/auth/login (bcrypt on the dedicated hashing pool) and once against a sync
+handler that hashes inline the way /auth/login used to, holding one of the
+shared AnyIO worker threads for the whole bcrypt call.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import httpx
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from api.limiter import limiter
+from app import app
+from database import Base, get_db
+from models import models
+from schemas import course as course_schema
+from schemas import user as user_schema
+import crud
+
+LEGACY_LOGIN = "/bench/legacy-login"
+
+
+@app.post(LEGACY_LOGIN, include_in_schema=False)
+def legacy_login(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+    # The pre-executor /auth/login: a sync handler running bcrypt inline
+    if not crud.authenticate_user(db, form_data.username, form_data.password):
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    return {"ok": True}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def probe(client, count, samples):
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get("/courses/", params={"limit": 20})
+        response.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+
+
+async def storm(client, path, logins):
+    form = {"username": "storm@example.com", "password": "storm-password"}
+    responses = await asyncio.gather(*(client.post(path, data=form) for _ in range(logins)))
+    assert all(r.status_code == 200 for r in responses), {r.status_code for r in responses}
+
+
+async def run(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        idle = []
+        await probe(client, args.probes, idle)
+        rows = [("idle", idle, None)]
+        for label, path in (("login storm (hash pool)", "/auth/login"), ("login storm (inline bcrypt)", LEGACY_LOGIN)):
+            samples = []
+            start = time.perf_counter()
+            await asyncio.gather(storm(client, path, args.logins), probe(client, args.probes, samples))
+            rows.append((label, samples, time.perf_counter() - start))
+
+    print(f"{'scenario':<30} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'storm':>8}")
+    for label, samples, elapsed in rows:
+        print(
+            f"{label:<30} {statistics.median(samples):>7.2f}ms {percentile(samples, 95):>7.2f}ms "
+            f"{percentile(samples, 99):>7.2f}ms {max(samples):>7.2f}ms "
+            f"{(f'{elapsed:.1f}s' if elapsed else '-'):>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200, help="concurrent login attempts per storm")
+    parser.add_argument("--probes", type=int, default=100, help="sequential GET /courses/ calls per scenario")
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with BenchSession() as db:
+            crud.create_user(db, user_schema.UserCreate(
+                name="Storm", email="storm@example.com", password="storm-password", role="student"
+            ))
+            for i in range(50):
+                crud.create_course(db, course_schema.CourseCreate(title=f"Course {i}", code=f"B{i}", capacity=30))
+
+        def bench_db():
+            db = BenchSession()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = bench_db
+        asyncio.run(run(args))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Rate limiter overhead, per check and per request.
+
+    python -m benchmarks.bench_rate_limit
+    python -m benchmarks.bench_rate_limit --storage redis://localhost:6379/15
+
+First times limiter hits alone for each strategy against --storage (memory://
+by default; a Redis URL shows the round trip every worker would pay). Then
+runs --requests enroll/drop requests in-process over ASGI against a
+temporary SQLite file, alternating rounds with the limiter off and on (with
+a limit too high to trip), and reports the added latency per request.
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import httpx
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from api.deps import get_current_user
+from api.limiter import limiter
+from app import app
+from core.config import settings
+from core.security import Principal
+from database import Base, create_db_engine, get_db
+from models import models
+
+
+def time_hits(storage_uri, hits):
+    rows = []
+    item = parse("1000000000/minute")
+    for name, strategy in STRATEGIES.items():
+        storage = storage_from_string(storage_uri)
+        storage.reset()
+        rate_limiter = strategy(storage)
+        start = time.perf_counter()
+        for i in range(hits):
+            rate_limiter.hit(item, f"bench/user:{i % 1000}")
+        rows.append((name, (time.perf_counter() - start) / hits * 1e6))
+        storage.reset()
+    return rows
+
+
+async def enroll_drop(client, requests):
+    start = time.perf_counter()
+    for _ in range(requests // 2):
+        response = await client.post("/enrollments", json={"course_id": 1})
+        assert response.status_code == 200, response.text
+        response = await client.delete("/enrollments/1")
+        assert response.status_code == 200, response.text
+    return (time.perf_counter() - start) / (requests // 2 * 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--storage", default="memory://", help="limits storage URI for the per-check timings")
+    parser.add_argument("--hits", type=int, default=50_000, help="limiter hits per strategy")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per round")
+    parser.add_argument("--rounds", type=int, default=3, help="rounds with the limiter off and on each")
+    args = parser.parse_args()
+
+    print(f"{'strategy':<24} {'us/hit':>8}   ({args.storage})")
+    for name, micros in time_hits(args.storage, args.hits):
+        print(f"{name:<24} {micros:>8.1f}")
+
+    settings.RATELIMIT_ENROLLMENTS = "1000000000/minute"
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(models.User), [{
+                "id": 1, "name": "Student", "email": "student@bench.test",
+                "hashed_password": "unused", "role": "student", "is_active": True
+            }])
+            conn.execute(insert(models.Course), [{"id": 1, "title": "Course", "code": "B1", "capacity": 10, "is_active": True}])
+        BenchSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def bench_db():
+            db = BenchSession()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        student = Principal(id=1, email="student@bench.test", name="Student", role="student", is_active=True)
+        app.dependency_overrides[get_db] = bench_db
+        app.dependency_overrides[get_current_user] = lambda: student
+
+        async def run():
+            timings = {False: [], True: []}
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                limiter.enabled = False
+                await enroll_drop(client, 200) # Warm-up
+                for _ in range(args.rounds):
+                    for enabled in (False, True):
+                        limiter.enabled = enabled
+                        timings[enabled].append(await enroll_drop(client, args.requests))
+            return timings
+
+        timings = asyncio.run(run())
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+    off, on = (statistics.median(timings[enabled]) * 1e6 for enabled in (False, True))
+    print()
+    print(f"{'POST+DELETE /enrollments':<24} {'us/request':>10}")
+    print(f"{'limiter off':<24} {off:>10.0f}")
+    print(f"{f'limiter on ({settings.RATELIMIT_STRATEGY})':<24} {on:>10.0f}")
+    print(f"{'overhead':<24} {on - off:>10.0f}  ({(on - off) / off:+.1%})")
+
+
+if __name__ == "__main__":
+    main()
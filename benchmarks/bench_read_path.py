@@ -0,0 +1,137 @@
+"""
+Listing read paths at scale: ORM entities vs projected Rows vs __slots__ DTOs.
+
+    python -m benchmarks.bench_read_path
+    python -m benchmarks.bench_read_path --rows 100000 --repeat 5
+
+Loads --rows enrollments into a temporary SQLite file and reads all of them
+with the EnrollmentOut columns each way:
+
+  orm           Session.scalars(select(Enrollment)), autoflush on
+  orm_noflush   the same with autoflush off (SessionLocal's settings)
+  rows          crud.ENROLLMENT_OUT_COLUMNS through crud.read_rows on a
+                read-only session (what the listings do now)
+  dto           those rows copied into __slots__ objects
+  core          the same statement on a bare Connection, no Session at all
+
+For each it reports the fetch time (best of --repeat), the fetch plus JSON
+serialization through core.serialization.ModelList, and the memory the
+result holds and peaks at (tracemalloc, measured in a separate pass).
+"""
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+import crud
+from core.serialization import ModelList
+from database import READ_ONLY, Base, create_db_engine
+from models import models
+from schemas.enrollment import EnrollmentOut
+
+
+class EnrollmentRow:
+    __slots__ = ("id", "user_id", "course_id", "created_at")
+
+    def __init__(self, id, user_id, course_id, created_at):
+        self.id = id
+        self.user_id = user_id
+        self.course_id = course_id
+        self.created_at = created_at
+
+
+def readers(engine):
+    write_session = sessionmaker(bind=engine)
+    plain_session = sessionmaker(bind=engine, autoflush=False)
+    read_session = sessionmaker(bind=engine.execution_options(**READ_ONLY), autoflush=False, expire_on_commit=False)
+    columns = select(*crud.ENROLLMENT_OUT_COLUMNS).order_by(models.Enrollment.id)
+
+    def orm(factory):
+        def read():
+            with factory() as db:
+                # Returned after close: the objects stay loaded, like a response being serialized
+                return db.scalars(select(models.Enrollment).order_by(models.Enrollment.id)).all()
+        return read
+
+    def rows():
+        with read_session() as db:
+            return crud.read_rows(db, columns)
+
+    def dto():
+        with read_session() as db:
+            return [EnrollmentRow(*row) for row in crud.read_rows(db, columns)]
+
+    def core():
+        with engine.connect() as conn:
+            return conn.execute(columns).all()
+
+    return {"orm": orm(write_session), "orm_noflush": orm(plain_session), "rows": rows, "dto": dto, "core": core}
+
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def memory(fn):
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return held, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    enrollment_list = ModelList(EnrollmentOut)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        now = datetime.now(timezone.utc)
+        with engine.begin() as conn:
+            conn.execute(insert(models.User), [
+                {"id": i, "name": f"Student {i}", "email": f"student{i}@bench.test",
+                 "hashed_password": "unused", "role": "student", "is_active": True}
+                for i in range(1, args.rows + 1)
+            ])
+            conn.execute(insert(models.Course), [{"id": 1, "title": "Course", "code": "B1", "capacity": args.rows, "is_active": True}])
+            conn.execute(insert(models.Enrollment), [
+                {"user_id": i, "course_id": 1, "created_at": now} for i in range(1, args.rows + 1)
+            ])
+
+        results = []
+        for name, read in readers(engine).items():
+            assert len(read()) == args.rows # Warm-up, and the caches of the statement
+            fetch = best_of(args.repeat, read)
+            serialize = best_of(args.repeat, lambda: enrollment_list.dump_json(read()))
+            held, peak = memory(read)
+            results.append((name, fetch, serialize, held, peak))
+        engine.dispose()
+
+    base_fetch, base_held = results[0][1], results[0][3]
+    print(f"{args.rows} enrollments, best of {args.repeat}")
+    print(f"{'path':<12} {'fetch ms':>9} {'+json ms':>9} {'held MiB':>9} {'peak MiB':>9} {'fetch':>7} {'memory':>7}")
+    for name, fetch, serialize, held, peak in results:
+        print(
+            f"{name:<12} {fetch * 1000:>9.0f} {serialize * 1000:>9.0f} {held / 2**20:>9.1f} {peak / 2**20:>9.1f}"
+            f" {base_fetch / fetch:>6.1f}x {base_held / held:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Course search latency: the old LIKE '%term%' path vs. the full-text backend.
+
+    python -m benchmarks.bench_search                  # 10k, 100k and 1M courses
+    python -m benchmarks.bench_search --sizes 10000    # quick run
+
+Each size gets a fresh SQLite file in a temp directory, filled with
+deterministic random titles, and every search term is timed through the LIKE
+path, the ranked FTS path (?skip= listings) and the unranked FTS filter used by
+keyset pages. Note that LIKE with LIMIT and no ORDER BY stops at the first ten
+hits, so it stays cheap for very common words while ranking has to score every
+match; LIKE's cost explodes for rare terms and misses, which is where a
+search-as-you-type box spends most of its time.
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+from database import Base
+from models import models
+import crud
+
+WORDS = [
+    "advanced", "applied", "introduction", "modern", "theory", "practice", "systems", "analysis",
+    "python", "chemistry", "biology", "economics", "history", "algebra", "calculus", "physics",
+    "networks", "databases", "literature", "statistics", "design", "ethics", "music", "robotics",
+]
+# Common prefix, rare word, multi-word, and a miss
+TERMS = ["pyth", "robotics", "advanced data", "intro chem", "zzzz"]
+
+
+def build(path: Path, size: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(size)
+    with engine.begin() as conn:
+        batch = []
+        for i in range(size):
+            title = " ".join(rng.choice(WORDS) for _ in range(3)).title()
+            batch.append({"title": f"{title} {i}", "code": f"C{i}", "capacity": 30, "is_active": True})
+            if len(batch) == 50_000:
+                conn.execute(insert(models.Course), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.Course), batch)
+        conn.execute(text(
+            f"INSERT INTO {models.COURSE_SEARCH_TABLE} (rowid, title, code) SELECT id, title, code FROM courses"
+        ))
+    return engine
+
+
+def like_search(db, term, limit=10):
+    # The pre-FTS implementation of crud.get_courses(search=...)
+    return db.query(models.Course).filter(
+        models.Course.is_active == True, models.Course.title.contains(term)
+    ).limit(limit).all()
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'courses':>9} {'term':<14} {'LIKE p50':>10} {'LIKE p95':>10} "
+        f"{'ranked p50':>11} {'ranked p95':>11} {'keyset p50':>11} {'keyset p95':>11}"
+    )
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = build(Path(tmp) / "bench.db", size)
+            db = sessionmaker(bind=engine)()
+            for term in TERMS:
+                like_p50, like_p95 = timed(lambda: like_search(db, term), args.repeat)
+                ranked_p50, ranked_p95 = timed(lambda: crud.get_courses(db, limit=10, search=term), args.repeat)
+                keyset_p50, keyset_p95 = timed(lambda: crud.get_courses_page(db, limit=10, search=term), args.repeat)
+                print(
+                    f"{size:>9} {term:<14} {like_p50:>8.2f}ms {like_p95:>8.2f}ms "
+                    f"{ranked_p50:>9.2f}ms {ranked_p95:>9.2f}ms {keyset_p50:>9.2f}ms {keyset_p95:>9.2f}ms"
+                )
+            db.close()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Seat-change fan-out to many live watchers.
+
+    python -m benchmarks.bench_seat_stream
+    python -m benchmarks.bench_seat_stream --watchers 5000 --changes 200
+
+Opens --watchers subscriptions to one course on services.seat_events.broker,
+each drained by its own task as an SSE stream would, then publishes
+--changes seat states from a worker thread (as crud does after a commit in
+the threadpool). Reports how long each change took to reach every watcher,
+next to the query load the same watchers would put on the database by
+polling GET /courses/{id} every --poll-interval seconds.
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+from services import seat_events
+from services.seat_events import LocalBroker
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(args):
+    broker = LocalBroker(max_subscribers=args.watchers)
+    subscriptions = [broker.subscribe(1) for _ in range(args.watchers)]
+    published = {}
+    delivered = {} # version -> time the last watcher saw it (or a newer one)
+    remaining = {}
+
+    async def watch(subscription):
+        seen = 0
+        while seen < args.changes:
+            message = await subscription.next(timeout=30)
+            if message is None:
+                raise RuntimeError("watcher timed out")
+            now = time.perf_counter()
+            for version in range(seen + 1, message["version"] + 1):
+                remaining[version] -= 1
+                if not remaining[version]:
+                    delivered[version] = now
+            seen = message["version"]
+
+    def publisher():
+        for version in range(1, args.changes + 1):
+            published[version] = time.perf_counter()
+            broker.publish(1, seat_events.seat_state(
+                SimpleNamespace(id=1, enrolled_count=version, capacity=args.changes, version=version)
+            ))
+            time.sleep(args.gap)
+
+    remaining.update({version: args.watchers for version in range(1, args.changes + 1)})
+    watchers = [asyncio.create_task(watch(subscription)) for subscription in subscriptions]
+    thread = threading.Thread(target=publisher)
+    start = time.perf_counter()
+    thread.start()
+    await asyncio.gather(*watchers)
+    elapsed = time.perf_counter() - start
+    thread.join()
+    for subscription in subscriptions:
+        subscription.close()
+    return [(delivered[v] - published[v]) * 1000 for v in published], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--watchers", type=int, default=5000)
+    parser.add_argument("--changes", type=int, default=200, help="seat changes published")
+    parser.add_argument("--gap", type=float, default=0.01, help="seconds between changes")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds between polls, for comparison")
+    args = parser.parse_args()
+
+    latencies, elapsed = asyncio.run(run(args))
+    print(f"{args.watchers} watchers, {args.changes} changes over {elapsed:.2f}s")
+    print(
+        f"fan-out to all watchers: p50 {statistics.median(latencies):.1f}ms "
+        f"p95 {percentile(latencies, 95):.1f}ms p99 {percentile(latencies, 99):.1f}ms"
+    )
+    print(f"database queries while streaming: 0 per change (one read per watcher on connect)")
+    print(f"polling every {args.poll_interval:g}s instead: {args.watchers / args.poll_interval:.0f} GET /courses/{{id}} per second")
+
+
+if __name__ == "__main__":
+    main()
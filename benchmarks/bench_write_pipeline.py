@@ -0,0 +1,110 @@
+"""
+Enrollment write throughput: a commit per request vs the group-commit pipeline.
+
+    python -m benchmarks.bench_write_pipeline
+    python -m benchmarks.bench_write_pipeline --writes 5000 --concurrency 64 --synchronous FULL
+
+--concurrency threads (the threadpool serving sync routes) enroll --writes
+students into --courses courses on a fresh temporary SQLite file per run:
+
+  direct        crud.enroll_student on each thread's own session: one
+                transaction, write lock and commit per enrollment
+  batch=N       services.write_pipeline with WRITE_PIPELINE_MAX_BATCH=N; the
+                threads wait on their futures and the writer thread commits
+                up to N enrollments per transaction, each in a savepoint
+
+--synchronous sets PRAGMA synchronous (NORMAL is the app default; FULL syncs
+the WAL on every commit, which is what makes per-commit cost dominate).
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import sessionmaker
+import crud
+from core.config import settings
+from database import Base, create_db_engine
+from models import models
+from services import write_pipeline
+
+BATCH_SIZES = (1, 8, 32, 128, 512)
+
+
+def prepare(url, students, courses):
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": i, "name": f"Student {i}", "email": f"student{i}@bench.test",
+             "hashed_password": "unused", "role": "student", "is_active": True}
+            for i in range(1, students + 1)
+        ])
+        conn.execute(insert(models.Course), [
+            {"id": i, "title": f"Course {i}", "code": f"B{i}", "capacity": students, "is_active": True}
+            for i in range(1, courses + 1)
+        ])
+    return engine
+
+
+def run(url, args, batch_size=None):
+    engine = prepare(url, args.writes, args.courses)
+    targets = [(i % args.courses + 1, i) for i in range(1, args.writes + 1)]
+    if batch_size is None:
+        factory = sessionmaker(bind=engine, autoflush=False)
+
+        def write(target):
+            with factory() as db:
+                crud.enroll_student(db, *target)
+        pipeline = None
+    else:
+        settings.WRITE_PIPELINE_MAX_BATCH = batch_size
+        writer_engine = create_db_engine(url, pool_size=1, max_overflow=0)
+        pipeline = write_pipeline.WritePipeline(write_pipeline.writer_sessions(writer_engine))
+        pipeline.start()
+
+        def write(target):
+            pipeline.call(write_pipeline.enroll, *target)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(write, targets))
+    elapsed = time.perf_counter() - start
+
+    if pipeline is not None:
+        asyncio.run(pipeline.stop())
+        writer_engine.dispose()
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(models.Enrollment)) == args.writes
+    engine.dispose()
+    transactions = pipeline.stats()["batches"] if pipeline is not None else args.writes
+    return args.writes / elapsed, args.writes / transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writes", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--courses", type=int, default=20)
+    parser.add_argument("--synchronous", default=settings.SQLITE_SYNCHRONOUS)
+    args = parser.parse_args()
+
+    settings.SQLITE_SYNCHRONOUS = args.synchronous
+    settings.AUDIT_RELAY_ENABLED = False
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n, batch_size in enumerate((None, *BATCH_SIZES)):
+            name = "direct" if batch_size is None else f"batch={batch_size}"
+            results.append((name, *run(f"sqlite:///{Path(tmp) / f'bench{n}.db'}", args, batch_size)))
+
+    base = results[0][1]
+    print(f"{args.writes} enrollments, {args.concurrency} threads, synchronous={args.synchronous}")
+    print(f"{'mode':<10} {'writes/s':>9} {'per commit':>11} {'speedup':>8}")
+    for name, rate, per_commit in results:
+        print(f"{name:<10} {rate:>9.0f} {per_commit:>11.1f} {rate / base:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
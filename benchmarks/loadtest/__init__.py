@@ -0,0 +1,14 @@
+"""
+Load-test harness for the API's hot endpoints.
+
+    python -m benchmarks.loadtest                              # in-process over ASGI
+    python -m benchmarks.loadtest --target uvicorn --workers 2 # a local uvicorn server
+    python -m benchmarks.loadtest --save base.json             # keep a baseline
+    python -m benchmarks.loadtest --compare base.json          # diff against it
+
+seed.py fills a SQLite file with deterministic students, courses and
+enrollments; scenarios.py drives login, catalog listing, detail and search,
+an enroll/drop storm on one hot course, and the admin listings; report.py
+turns the samples into requests/s and p50/p95/p99 latencies, saves them as
+JSON and diffs two runs.
+"""
@@ -0,0 +1,168 @@
+"""
+Load test: seeds a SQLite database and drives the hot endpoints.
+
+Run with --help for the options; see benchmarks/loadtest/__init__.py.
+"""
+import argparse
+import asyncio
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import httpx
+from benchmarks.loadtest import report
+from benchmarks.loadtest.scenarios import SCENARIOS, SLOW, run_scenario
+from benchmarks.loadtest.seed import seed
+from core.config import settings
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _drive(base_url, transport, data, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60, limits=limits) as client:
+        for name in args.scenarios:
+            requests = args.slow_requests if name in SLOW else args.requests
+            if args.warmup:
+                await run_scenario(client, name, data, min(args.warmup, requests), args.concurrency, seed=args.seed + 1)
+            samples = await run_scenario(client, name, data, requests, args.concurrency, seed=args.seed)
+            results[name] = report.summarize(samples)
+            print(f"  {name}: {results[name]['rps']:.0f} req/s", file=sys.stderr)
+    return results
+
+
+def run_asgi(url, data, args) -> dict:
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from api.limiter import limiter
+    from app import app
+    from database import create_async_db_engine, create_db_engine, get_async_db, get_async_read_db, get_db, get_read_db
+
+    limiter.enabled = args.rate_limits
+    engine = create_db_engine(url)
+    async_engine = create_async_db_engine(url)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def loadtest_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def loadtest_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = app.dependency_overrides[get_read_db] = loadtest_db
+    app.dependency_overrides[get_async_db] = app.dependency_overrides[get_async_read_db] = loadtest_async_db
+    try:
+        return asyncio.run(_drive("http://loadtest", httpx.ASGITransport(app=app), data, args))
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+        asyncio.run(async_engine.dispose())
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_uvicorn(url, data, args) -> dict:
+    port = _free_port()
+    env = {**os.environ, "DATABASE_URL": url, "RATELIMIT_ENABLED": str(args.rate_limits).lower()}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise SystemExit("uvicorn did not start")
+            time.sleep(0.2)
+        return asyncio.run(_drive(base_url, None, data, args))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per scenario")
+    parser.add_argument("--slow-requests", type=int, default=200, help="measured requests for login (bcrypt)")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="clients in flight")
+    parser.add_argument("--students", type=int, default=20_000)
+    parser.add_argument("--courses", type=int, default=2_000)
+    parser.add_argument("--enrollments", type=int, default=100_000)
+    parser.add_argument("--hot-capacity", type=int, default=10, help="seats in the enroll/drop storm's course")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rate-limits", action="store_true", help="keep slowapi limits on (login is 5/minute)")
+    parser.add_argument("--save", metavar="JSON", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="diff against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=10, help="%% worse than the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'loadtest.db'}"
+        start = time.perf_counter()
+        data = seed(url, args.students, args.courses, args.enrollments, args.hot_capacity, seed=args.seed)
+        print(
+            f"seeded {data.students} students, {data.courses} courses, {data.enrollments} enrollments "
+            f"in {time.perf_counter() - start:.1f}s",
+            file=sys.stderr
+        )
+        results = (run_asgi if args.target == "asgi" else run_uvicorn)(url, data, args)
+
+    report.print_results(results)
+    meta = {
+        "commit": _git_commit(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": args.target if args.target == "asgi" else f"uvicorn x{args.workers}",
+        "db_async": settings.DB_ASYNC,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "dataset": {"students": data.students, "courses": data.courses, "enrollments": data.enrollments},
+    }
+    if args.save:
+        report.save(args.save, meta, results)
+    if args.compare:
+        regressions = report.compare(report.load(args.compare), results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:g}%: {regressions}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
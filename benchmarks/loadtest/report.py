@@ -0,0 +1,65 @@
+"""Latency percentiles, JSON baselines, and the diff between two runs."""
+import json
+from pathlib import Path
+
+# Metrics compared between runs, and whether higher is better
+METRICS = {"rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(samples) -> dict:
+    latencies = samples.latencies
+    return {
+        "requests": len(latencies),
+        "unexpected": samples.unexpected,
+        "rps": round(len(latencies) / samples.elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+
+def print_results(results: dict):
+    print(f"{'scenario':<20} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:<20} {r['requests']:>8} {r['unexpected']:>7} {r['rps']:>8.1f} {r['p50_ms']:>8.2f} "
+            f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['max_ms']:>8.2f}"
+        )
+
+
+def save(path: str, meta: dict, results: dict):
+    Path(path).write_text(json.dumps({"meta": meta, "scenarios": results}, indent=2) + "\n")
+
+
+def load(path: str) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def compare(baseline: dict, results: dict, tolerance: float) -> list:
+    """
+    Prints each metric's change against baseline and returns the
+    (scenario, metric, change %) that got worse by more than tolerance %.
+    """
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'} ({baseline['meta'].get('target')}):")
+    print(f"{'scenario':<20}" + "".join(f" {metric:>16}" for metric in METRICS))
+    regressions = []
+    for name, r in results.items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        cells = []
+        for metric, higher_is_better in METRICS.items():
+            change = (r[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            worse = -change if higher_is_better else change
+            flag = "!" if worse > tolerance else " "
+            if flag == "!":
+                regressions.append((name, metric, round(change, 1)))
+            cells.append(f" {old[metric]:>7.1f}→{r[metric]:<7.1f}{flag}")
+        print(f"{name:<20}" + "".join(cells))
+    return regressions
@@ -0,0 +1,133 @@
+"""
+The load-test scenarios. Each one is a closed loop: `concurrency` clients
+send requests back to back until `requests` have been sent, and every
+response's latency and status is recorded.
+"""
+import asyncio
+import itertools
+import random
+import time
+from core.security import create_access_token
+from benchmarks.loadtest.seed import ADMIN_EMAIL, HOT_COURSE_ID, PASSWORD, WORDS, Dataset
+
+
+class Samples:
+    def __init__(self):
+        self.latencies = []
+        self.unexpected = 0
+        self.elapsed = 0.0
+
+
+def _token(email: str, user_id: int, role: str) -> dict:
+    token = create_access_token({"sub": email, "id": user_id, "role": role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _run(client, requests: int, concurrency: int, session_factory) -> Samples:
+    """
+    session_factory(worker) returns an async generator of (method, path,
+    kwargs, expected statuses) for one client; it may also receive each
+    response back (asend), for cursor walks.
+    """
+    samples = Samples()
+    sent = itertools.count()
+
+    async def worker(n):
+        session = session_factory(n)
+        response = None
+        while next(sent) < requests:
+            method, path, kwargs, expected = await session.asend(response)
+            start = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            samples.latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code not in expected:
+                samples.unexpected += 1
+        await session.aclose()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    samples.elapsed = time.perf_counter() - start
+    return samples
+
+
+def login(data: Dataset, rng: random.Random):
+    async def session(worker):
+        while True:
+            user_id = rng.randint(1, data.students)
+            form = {"username": data.student_email(user_id), "password": PASSWORD}
+            yield "POST", "/auth/login", {"data": form}, {200}
+    return session
+
+
+def course_listing(data: Dataset, rng: random.Random):
+    # Walks the catalog page by page through X-Next-Cursor, starting over at the end
+    async def session(worker):
+        cursor = None
+        while True:
+            params = {"limit": 20, **({"cursor": cursor} if cursor else {})}
+            response = yield "GET", "/courses/", {"params": params}, {200}
+            cursor = response.headers.get("X-Next-Cursor")
+    return session
+
+
+def course_detail(data: Dataset, rng: random.Random):
+    async def session(worker):
+        while True:
+            yield "GET", f"/courses/{rng.randint(1, data.courses)}", {}, {200}
+    return session
+
+
+def course_search(data: Dataset, rng: random.Random):
+    async def session(worker):
+        while True:
+            # Search-as-you-type: a word prefix, sometimes with a second word
+            term = rng.choice(WORDS)[:rng.randint(3, 8)]
+            if rng.random() < 0.3:
+                term += " " + rng.choice(WORDS)
+            yield "GET", "/courses/", {"params": {"search": term, "limit": 20}}, {200}
+    return session
+
+
+def enroll_drop_storm(data: Dataset, rng: random.Random):
+    # Every client is its own student, so the only contention is for the hot course's seats
+    async def session(worker):
+        user_id = worker % data.students + 1
+        headers = _token(data.student_email(user_id), user_id, "student")
+        # A previous run may have stopped between this student's enroll and drop
+        yield "DELETE", f"/enrollments/{HOT_COURSE_ID}", {"headers": headers}, {200, 404}
+        while True:
+            yield "POST", "/enrollments", {"json": {"course_id": HOT_COURSE_ID}, "headers": headers}, {200, 400}
+            yield "DELETE", f"/enrollments/{HOT_COURSE_ID}", {"headers": headers}, {200, 404}
+    return session
+
+
+def admin_listings(data: Dataset, rng: random.Random):
+    async def session(worker):
+        headers = _token(ADMIN_EMAIL, data.admin_id, "admin")
+        cursor = None
+        while True:
+            params = {"limit": 50, **({"cursor": cursor} if cursor else {})}
+            response = yield "GET", "/admin/enrollments", {"params": params, "headers": headers}, {200}
+            cursor = response.headers.get("X-Next-Cursor")
+            course_id = rng.randint(1, data.courses)
+            yield "GET", f"/admin/courses/{course_id}/enrollments", {"params": {"limit": 50}, "headers": headers}, {200}
+    return session
+
+
+SCENARIOS = {
+    "login": login,
+    "course_listing": course_listing,
+    "course_detail": course_detail,
+    "course_search": course_search,
+    "enroll_drop_storm": enroll_drop_storm,
+    "admin_listings": admin_listings,
+}
+
+
+# bcrypt makes logins ~100x slower than the other routes, so they get their own request count
+SLOW = {"login"}
+
+
+async def run_scenario(client, name: str, data: Dataset, requests: int, concurrency: int, seed: int = 42) -> Samples:
+    rng = random.Random(f"{seed}:{name}")
+    return await _run(client, requests, concurrency, SCENARIOS[name](data, rng))
@@ -0,0 +1,77 @@
+"""Deterministic data for the load test: students, courses and enrollments."""
+import random
+from dataclasses import dataclass
+from sqlalchemy import insert, text
+from core.security import get_password_hash
+from database import Base, create_db_engine
+from models import models
+
+PASSWORD = "loadtest-password"
+ADMIN_EMAIL = "admin@loadtest.example"
+HOT_COURSE_ID = 1
+
+WORDS = [
+    "advanced", "applied", "introduction", "modern", "theory", "practice", "systems", "analysis",
+    "python", "chemistry", "biology", "economics", "history", "algebra", "calculus", "physics",
+    "networks", "databases", "literature", "statistics", "design", "ethics", "music", "robotics",
+]
+
+
+@dataclass
+class Dataset:
+    students: int
+    courses: int
+    enrollments: int
+    admin_id: int
+
+    @staticmethod
+    def student_email(user_id: int) -> str:
+        return f"student{user_id}@loadtest.example"
+
+
+def seed(url: str, students: int, courses: int, enrollments: int, hot_capacity: int, seed: int = 42) -> Dataset:
+    """
+    Creates the schema at url and fills it. Student ids are 1..students and
+    all share PASSWORD (hashed once, at the configured BCRYPT_ROUNDS, so logins
+    cost what they do in production). Course HOT_COURSE_ID starts empty with
+    hot_capacity seats; the others get roughly enrollments / (courses - 1)
+    students each.
+    """
+    rng = random.Random(seed)
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    hashed = get_password_hash(PASSWORD)
+    admin_id = students + 1
+    per_course = enrollments // max(courses - 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": i, "name": f"Student {i}", "email": Dataset.student_email(i),
+             "hashed_password": hashed, "role": "student", "is_active": True}
+            for i in range(1, students + 1)
+        ] + [{"id": admin_id, "name": "Registrar", "email": ADMIN_EMAIL,
+              "hashed_password": hashed, "role": "admin", "is_active": True}])
+
+        course_rows, enrollment_rows = [], []
+        for course_id in range(1, courses + 1):
+            title = " ".join(rng.choice(WORDS) for _ in range(3)).title()
+            if course_id == HOT_COURSE_ID:
+                taken, capacity = [], hot_capacity
+            else:
+                taken = rng.sample(range(1, students + 1), min(per_course, students))
+                capacity = len(taken) + rng.randint(5, 40)
+            course_rows.append({
+                "id": course_id, "title": f"{title} {course_id}", "code": f"LT{course_id}",
+                "capacity": capacity, "enrolled_count": len(taken), "is_active": True,
+            })
+            enrollment_rows.extend({"course_id": course_id, "user_id": user_id} for user_id in taken)
+        conn.execute(insert(models.Course), course_rows)
+        for start in range(0, len(enrollment_rows), 50_000):
+            conn.execute(insert(models.Enrollment), enrollment_rows[start:start + 50_000])
+
+        if conn.dialect.name == "sqlite":
+            conn.execute(text(
+                f"INSERT INTO {models.COURSE_SEARCH_TABLE} (rowid, title, code) SELECT id, title, code FROM courses"
+            ))
+    engine.dispose()
+    return Dataset(students=students, courses=courses, enrollments=len(enrollment_rows), admin_id=admin_id)
@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    A small thread-safe LRU cache whose entries also expire after a TTL.
+
+    Bounded by maxsize (least recently used entries are evicted first); a
+    maxsize of 0 disables caching. Counts hits and misses for stats().
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: float = None):
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+
+class LocalStore:
+    """
+    In-process stand-in for RedisStore, with the same get/set/incr calls, so
+    the shared tier can run in development and tests without a Redis server.
+    It is only shared by the threads of one process.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._data.get(key, (None, 0))[1]) + 1
+            self._data[key] = (None, value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisStore:
+    """Shared tier on a Redis server (needs the optional redis package)."""
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError(f"Cache URL {url!r} needs the 'redis' package (pip install redis)") from exc
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str):
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self._client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    def incr(self, key: str) -> int:
+        return self._client.incr(key)
+
+    def clear(self):
+        pass # Versions and entries on a shared server outlive one process
+
+
+def shared_store(url: str):
+    """The shared tier for a cache URL: none for "", LocalStore for memory://, else Redis."""
+    if not url:
+        return None
+    if url == "memory://":
+        return LocalStore()
+    return RedisStore(url)
+
+
+class VersionedCache:
+    """
+    Read-through cache of serialized bytes in two tiers: an in-process
+    TTLCache in front of an optional shared store (see shared_store) that
+    every worker reads and fills.
+
+    Keys live in scopes with a version counter (kept in the shared store when
+    there is one). Writers bump the scopes they changed instead of deleting
+    entries: lookups under the new version miss, and the old entries age out.
+    Read the version before loading the value, so a write that commits in
+    between leaves the stored entry under an already outdated version.
+    """
+
+    def __init__(self, prefix: str, maxsize: int, ttl: float, shared=None):
+        self.prefix = prefix
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self.shared_hits = 0
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.local.maxsize > 0
+
+    def version(self, scope) -> int:
+        if self.shared is not None:
+            return int(self.shared.get(f"{self.prefix}:version:{scope}") or 0)
+        return self._versions.get(scope, 0)
+
+    def bump(self, *scopes):
+        for scope in scopes:
+            if self.shared is not None:
+                self.shared.incr(f"{self.prefix}:version:{scope}")
+            else:
+                with self._lock:
+                    self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    def get(self, key: str, version: int):
+        if not self.enabled:
+            return None
+        value = self.local.get((key, version))
+        if value is None and self.shared is not None:
+            value = self.shared.get(f"{self.prefix}:{version}:{key}")
+            if value is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                self.local.set((key, version), value)
+        return value
+
+    def set(self, key: str, version: int, value: bytes, ttl: float = None):
+        """Stores value for ttl seconds (at most, and by default, the cache's TTL)."""
+        if not self.enabled:
+            return
+        ttl = self.local.ttl if ttl is None else min(ttl, self.local.ttl)
+        self.local.set((key, version), value, ttl=ttl)
+        if self.shared is not None:
+            self.shared.set(f"{self.prefix}:{version}:{key}", value, ttl)
+
+    def clear(self):
+        self.local.clear()
+        self.shared_hits = 0
+        with self._lock:
+            self._versions.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self) -> dict:
+        local = self.local.stats()
+        lookups = local["hits"] + local["misses"]
+        hits = local["hits"] + self.shared_hits
+        return {
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "local_hits": local["hits"],
+            "shared_hits": self.shared_hits,
+            "size": local["size"],
+            "maxsize": local["maxsize"],
+            "shared": type(self.shared).__name__ if self.shared is not None else None,
+        }
@@ -6,10 +6,165 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "SUPER_SECRET_KEY_CHANGE_ME_IN_PRODUCTION"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+
+    # Password hashing: bcrypt work factor (hashes with other rounds are
+    # rehashed on the next login) and the dedicated hashing thread pool size
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # Principal cache for get_current_user (0 entries disables it). With several
+    # workers, set AUTH_CACHE_URL (redis://host:6379/0) so a deactivation or role
+    # change committed by one of them revokes the cached principals of all
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_CACHE_URL: str = ""
     
     # Database Settings
     DATABASE_URL: str = "sqlite:///./enrollment_platform.db"
 
+    # Connection pool (SQLite files and server databases; in-memory SQLite is unpooled).
+    # Keep size + overflow at or above the threadpool size (40) so sync handlers
+    # are not left waiting on each other for connections.
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30 # Seconds to wait for a free connection
+    # Server databases only: recycle connections older than this, and test them on checkout
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_CONNECT_TIMEOUT: int = 10
+    DB_STATEMENT_TIMEOUT_MS: int = 30000 # Postgres statement_timeout
+
+    # SQLite connection PRAGMAs (file databases)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456 # 256 MiB
+    # Serve courses and enrollments from AsyncSession routers (aiosqlite/asyncpg)
+    # instead of sync sessions in the threadpool
+    DB_ASYNC: bool = False
+
+    # Read replicas for the read-only routes (get_read_db), comma-separated URLs;
+    # empty sends every read to the primary. For local SQLite copies (python
+    # replicate.py) use sqlite:///file:replica1.db?mode=ro&uri=true. Replicas are
+    # assumed to trail the primary by up to REPLICA_MAX_LAG_SECONDS: clients read
+    # from the primary for that long after their own writes, and course responses
+    # built from a replica are cached no longer than that. A replica that fails to
+    # connect is skipped for REPLICA_RETRY_SECONDS
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_MAX_LAG_SECONDS: float = 5
+    REPLICA_RETRY_SECONDS: float = 30
+
+    # Response cache for GET /courses/ and GET /courses/{id} (0 entries disables it).
+    # COURSE_CACHE_URL adds a tier shared by all workers: redis://host:6379/0, or
+    # memory:// for the in-process stand-in
+    COURSE_CACHE_MAX_ENTRIES: int = 5000
+    COURSE_CACHE_TTL_SECONDS: int = 300
+    COURSE_CACHE_URL: str = ""
+    # Cache-Control sent with those routes (and their 304s). Seat counts change all
+    # the time, so clients keep copies but revalidate them with their ETag
+    COURSE_LIST_CACHE_CONTROL: str = "public, no-cache"
+    COURSE_DETAIL_CACHE_CONTROL: str = "public, no-cache"
+
+    # GET /courses/{id}/seats/stream: open streams per process, seconds between
+    # heartbeat comments, and seconds before a stream ends (clients reconnect)
+    SEAT_STREAM_MAX_SUBSCRIBERS: int = 10000
+    SEAT_STREAM_HEARTBEAT_SECONDS: float = 15
+    SEAT_STREAM_MAX_SECONDS: float = 300
+
+    # Rate limiting (see api/limiter.py). The storage URI is memory:// (per process)
+    # or redis://host:6379/1 to share counters between workers; the strategy is
+    # sliding-window-counter, moving-window or fixed-window. Limits are
+    # "N/period" strings, several joined by ";"; RATELIMIT_DEFAULT (by client
+    # address) covers every route without a limit of its own and is off when empty
+    RATELIMIT_ENABLED: bool = True
+    RATELIMIT_STORAGE_URI: str = "memory://"
+    RATELIMIT_STRATEGY: str = "sliding-window-counter"
+    RATELIMIT_DEFAULT: str = ""
+    RATELIMIT_LOGIN: str = "5/minute" # Per client address
+    RATELIMIT_ENROLLMENTS: str = "30/minute;300/hour" # Per student
+
+    # Fast JSON mode: ORJSONResponse as the default response class, and the admin
+    # enrollment listings go to JSON in one TypeAdapter pass (core/serialization.py)
+    # instead of per-item response_model validation
+    FAST_JSON: bool = False
+
+    # Pagination Settings
+    MAX_PAGE_SIZE: int = 100
+
+    # Bulk enrollment: rows accepted per request, and rows per transaction
+    BULK_ENROLLMENT_MAX_ROWS: int = 50000
+    BULK_ENROLLMENT_CHUNK_SIZE: int = 2000
+
+    # Registration-day admission queue: POST /enrollments/intents answers 202 and a
+    # background worker applies the intents in FIFO batches (see services/admission.py)
+    ADMISSION_QUEUE_ENABLED: bool = False
+    ADMISSION_QUEUE_BATCH_SIZE: int = 500
+    ADMISSION_QUEUE_POLL_SECONDS: float = 1.0 # Idle re-check, besides the wake-up on each new intent
+    ADMISSION_QUEUE_MAX_WAIT_SECONDS: float = 30 # Cap for GET /enrollments/intents/{id}?wait=
+    ADMISSION_QUEUE_MAX_WAITERS: int = 10000 # Requests blocked in ?wait= at once, per process
+
+    # Write pipeline (see services/write_pipeline.py): enrollments, drops and admin
+    # removals are handed to one writer thread that commits them in batches of up
+    # to WRITE_PIPELINE_MAX_BATCH. It waits up to WRITE_PIPELINE_MAX_WAIT_MS for a
+    # batch to fill (0: take whatever queued up during the previous commit) and
+    # answers 503 once WRITE_PIPELINE_QUEUE_SIZE writes are waiting, or when a write
+    # is not confirmed within WRITE_PIPELINE_TIMEOUT_SECONDS
+    WRITE_PIPELINE_ENABLED: bool = False
+    WRITE_PIPELINE_MAX_BATCH: int = 256
+    WRITE_PIPELINE_MAX_WAIT_MS: float = 0
+    WRITE_PIPELINE_QUEUE_SIZE: int = 10000
+    WRITE_PIPELINE_TIMEOUT_SECONDS: float = 30
+
+    # Load shedding (see core/load_shedding.py): at most LOAD_SHEDDING_MAX_CONCURRENCY
+    # requests of the classes below run at once, each class within its own
+    # concurrency budget. Freed slots go to waiting enrollment writes first, then
+    # logins/registrations, then catalog reads. A class queues up to _QUEUE requests
+    # for up to _MAX_WAIT_MS each and answers the rest 503 with Retry-After
+    LOAD_SHEDDING_ENABLED: bool = False
+    LOAD_SHEDDING_MAX_CONCURRENCY: int = 40 # The threadpool size
+    LOAD_SHEDDING_ENROLLMENT_CONCURRENCY: int = 40
+    LOAD_SHEDDING_ENROLLMENT_QUEUE: int = 1000
+    LOAD_SHEDDING_ENROLLMENT_MAX_WAIT_MS: float = 5000
+    LOAD_SHEDDING_LOGIN_CONCURRENCY: int = 8 # Keeps the PASSWORD_HASH_WORKERS busy, no more
+    LOAD_SHEDDING_LOGIN_QUEUE: int = 100
+    LOAD_SHEDDING_LOGIN_MAX_WAIT_MS: float = 3000
+    LOAD_SHEDDING_BROWSE_CONCURRENCY: int = 24
+    LOAD_SHEDDING_BROWSE_QUEUE: int = 200
+    LOAD_SHEDDING_BROWSE_MAX_WAIT_MS: float = 1000
+
+    # Idempotency-Key on POST /enrollments and POST /auth/register (see
+    # services/idempotency.py): responses are replayed to retries with the same key
+    # for IDEMPOTENCY_TTL_SECONDS, from an in-process LRU of IDEMPOTENCY_MAX_ENTRIES
+    # and, with IDEMPOTENCY_PERSIST, the idempotency_keys table shared by all
+    # workers. A retry arriving while the original still runs waits up to
+    # IDEMPOTENCY_WAIT_SECONDS for its response, then gets 409
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_MAX_ENTRIES: int = 10000
+    IDEMPOTENCY_PERSIST: bool = False
+    IDEMPOTENCY_WAIT_SECONDS: float = 10
+
+    # Audit trail: events are committed to an outbox table and a background relay
+    # moves them into enrollment_audit in batches (see services/audit.py)
+    AUDIT_RELAY_ENABLED: bool = True
+    AUDIT_RELAY_INTERVAL_SECONDS: float = 1.0
+    AUDIT_RELAY_BATCH_SIZE: int = 1000
+
+    # Observability: GET /metrics (Prometheus text format) and the request timing
+    # middleware, the slow-query log threshold, and X-DB-Query-Count / X-DB-Time-Ms
+    # debug headers on every response. Scrapers send METRICS_TOKEN as a bearer
+    # token; /metrics answers 404 while it is empty
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = ""
+    SLOW_QUERY_MS: float = 200
+    QUERY_COUNT_HEADER: bool = False
+    # Error reporting and tracing with sentry-sdk (off while the DSN is empty)
+    SENTRY_DSN: str = ""
+    SENTRY_TRACES_SAMPLE_RATE: float = 0.0
+
+    # Export Settings (rows fetched per server-side cursor batch)
+    EXPORT_BATCH_SIZE: int = 1000
+
     model_config = ConfigDict(env_file=".env")
 
 settings = Settings()
\ No newline at end of file
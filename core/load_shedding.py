@@ -0,0 +1,191 @@
+"""
+Load shedding and admission control (settings.LOAD_SHEDDING_ENABLED).
+
+When registration opens, catalog reads, logins and enrollments all land in
+the same threadpool and connection pool, and without a limit they slow down
+together until everything times out. LoadSheddingMiddleware sorts requests
+into route classes, in priority order:
+
+  enrollments   POST/DELETE under /enrollments (enroll, drop, waitlist, intents)
+  login         POST /auth/login and /auth/register, the bcrypt lane
+  browse        GET /courses/ and /courses/{id}
+
+Everything else (admin routes, exports, live seat streams, /metrics) passes
+through untouched. At most LOAD_SHEDDING_MAX_CONCURRENCY classified requests
+run at once, each class within its own concurrency budget, so browsing can
+never take every slot and logins never queue more bcrypt work than the
+hashing pool gets through. Requests over budget wait in their class's
+bounded FIFO queue; whenever a request finishes, the slot goes to the
+highest-priority class with a waiter that fits its budget.
+
+A request is answered 503 with Retry-After straight away when its class's
+queue is full, or when the expected wait (queue position times the class's
+recent service time) already exceeds the class's deadline, and after the
+deadline if it is still waiting then. A fast 503 costs the server nothing
+and tells the client when to come back, where a request that times out in a
+queue has cost both sides the whole wait.
+
+State lives on the event loop and is per process; queue depth, running
+requests and shed counts are exported through core.metrics.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from starlette.responses import JSONResponse
+from core.config import settings
+
+SERVICE_TIME_WEIGHT = 0.2 # Of the latest request in the service time moving average
+
+
+class RouteClass:
+    """A concurrency budget and a bounded queue for one class of routes."""
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, max_wait_ms: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait_ms / 1000
+        self.running = 0
+        self.waiters = deque() # Futures, oldest first
+        self.service_seconds = 0.0
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "deadline": 0}
+
+
+def route_class(method: str, path: str):
+    """The name of the class a request belongs to, or None for unlimited routes."""
+    if method == "POST" and path in ("/auth/login", "/auth/register"):
+        return "login"
+    if method != "GET" and (path == "/enrollments" or path.startswith("/enrollments/")):
+        return "enrollments"
+    if method == "GET" and path.startswith("/courses") and not path.endswith("/seats/stream"):
+        return "browse"
+    return None
+
+
+class LoadShedder:
+    def __init__(self, max_concurrency: int, classes: list):
+        self.max_concurrency = max_concurrency
+        self.classes = classes # In priority order
+        self.by_name = {route_class.name: route_class for route_class in classes}
+        self.running = 0
+
+    @classmethod
+    def from_settings(cls):
+        return cls(settings.LOAD_SHEDDING_MAX_CONCURRENCY, [
+            RouteClass("enrollments", settings.LOAD_SHEDDING_ENROLLMENT_CONCURRENCY,
+                       settings.LOAD_SHEDDING_ENROLLMENT_QUEUE, settings.LOAD_SHEDDING_ENROLLMENT_MAX_WAIT_MS),
+            RouteClass("login", settings.LOAD_SHEDDING_LOGIN_CONCURRENCY,
+                       settings.LOAD_SHEDDING_LOGIN_QUEUE, settings.LOAD_SHEDDING_LOGIN_MAX_WAIT_MS),
+            RouteClass("browse", settings.LOAD_SHEDDING_BROWSE_CONCURRENCY,
+                       settings.LOAD_SHEDDING_BROWSE_QUEUE, settings.LOAD_SHEDDING_BROWSE_MAX_WAIT_MS),
+        ])
+
+    def _fits(self, route_class: RouteClass) -> bool:
+        return self.running < self.max_concurrency and route_class.running < route_class.concurrency
+
+    def _start(self, route_class: RouteClass):
+        route_class.running += 1
+        route_class.admitted += 1
+        self.running += 1
+
+    def expected_wait(self, route_class: RouteClass) -> float:
+        """Seconds a request joining route_class's queue now would likely wait."""
+        ahead = len(route_class.waiters)
+        for other in self.classes:
+            if other is route_class:
+                break
+            ahead += len(other.waiters) # Higher priority: served first
+        slots = max(1, min(route_class.concurrency, self.max_concurrency))
+        return math.ceil((ahead + 1) / slots) * route_class.service_seconds
+
+    def retry_after(self, route_class: RouteClass) -> int:
+        return max(1, math.ceil(self.expected_wait(route_class) or route_class.max_wait))
+
+    async def acquire(self, route_class: RouteClass):
+        """Takes a slot, waiting in the class queue if need be. Returns None once running, or the Retry-After seconds."""
+        if not route_class.waiters and self._fits(route_class):
+            self._start(route_class)
+            return None
+        if len(route_class.waiters) >= route_class.queue_size:
+            route_class.shed["queue_full"] += 1
+            return self.retry_after(route_class)
+        if self.expected_wait(route_class) > route_class.max_wait:
+            route_class.shed["deadline"] += 1
+            return self.retry_after(route_class)
+
+        slot = asyncio.get_running_loop().create_future()
+        route_class.waiters.append(slot)
+        try:
+            await asyncio.wait_for(slot, route_class.max_wait)
+            return None
+        except asyncio.TimeoutError:
+            if slot.done() and not slot.cancelled():
+                # release() handed over the slot as the deadline passed (wait_for
+                # on Python 3.12+ still times out then); it is ours, so run
+                return None
+            route_class.shed["deadline"] += 1
+            return self.retry_after(route_class)
+        except asyncio.CancelledError:
+            # The client went away; if the slot was handed over meanwhile, pass it on
+            if slot.done() and not slot.cancelled():
+                self.release(route_class)
+            raise
+        finally:
+            if slot in route_class.waiters:
+                route_class.waiters.remove(slot)
+
+    def release(self, route_class: RouteClass, service_seconds: float = None):
+        route_class.running -= 1
+        self.running -= 1
+        if service_seconds is not None:
+            route_class.service_seconds += SERVICE_TIME_WEIGHT * (service_seconds - route_class.service_seconds)
+        for waiting in self.classes:
+            while waiting.waiters and self._fits(waiting):
+                slot = waiting.waiters.popleft()
+                if not slot.done():
+                    self._start(waiting)
+                    slot.set_result(None)
+            if self.running >= self.max_concurrency:
+                break
+
+    def stats(self) -> dict:
+        return {
+            route_class.name: {
+                "running": route_class.running,
+                "queued": len(route_class.waiters),
+                "admitted": route_class.admitted,
+                "shed_queue_full": route_class.shed["queue_full"],
+                "shed_deadline": route_class.shed["deadline"],
+            }
+            for route_class in self.classes
+        }
+
+
+shedder = LoadShedder.from_settings()
+
+
+class LoadSheddingMiddleware:
+    """Pure ASGI middleware applying `shedder` to the classified routes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        name = route_class(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if name is None:
+            return await self.app(scope, receive, send)
+        budget = shedder.by_name[name]
+        retry_after = await shedder.acquire(budget)
+        if retry_after is not None:
+            response = JSONResponse(
+                {"detail": "The server is busy, please retry shortly"},
+                status_code=503, headers={"Retry-After": str(retry_after)}
+            )
+            return await response(scope, receive, send)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            shedder.release(budget, time.perf_counter() - started)
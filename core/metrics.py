@@ -0,0 +1,213 @@
+"""
+Request and database instrumentation, exported at GET /metrics.
+
+MetricsMiddleware times every HTTP request into a per-route latency
+histogram and tracks requests in flight. SQLAlchemy cursor events count the
+queries each request runs and the time they take (the counts reach sync
+routes in the threadpool and AsyncSession greenlets through a context
+variable); statements slower than SLOW_QUERY_MS are logged. With
+QUERY_COUNT_HEADER on, responses carry X-DB-Query-Count and X-DB-Time-Ms,
+which makes an N+1 pattern visible from a single curl.
+
+Pool occupancy (database.pool_stats), the cache counters and the load
+shedding queues are read when /metrics is scraped. Everything lives in
+`registry`, so the metrics of other libraries in the process are not
+exported by accident.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+registry = CollectorRegistry()
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to the end of the response, by route",
+    ["method", "route", "status"], registry=registry
+)
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being served", ["method"], registry=registry)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request, by route",
+    ["method", "route"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89), registry=registry
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request, by route",
+    ["method", "route"], registry=registry
+)
+QUERIES = Counter("db_queries_total", "SQL statements executed (in requests or not)", registry=registry)
+SLOW_QUERIES = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS", registry=registry)
+
+
+class RequestStats:
+    """Queries and database time of the request being served."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current: ContextVar = ContextVar("request_stats", default=None)
+
+def current_stats():
+    """The RequestStats of the request this code runs for, or None outside requests."""
+    return _current.get()
+
+
+# --- SQLAlchemy hooks (every Engine, sync or behind an AsyncEngine) ---
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    QUERIES.inc()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        SLOW_QUERIES.inc()
+        # Parameters are left out: they can hold emails and password hashes
+        logger.warning(
+            "Slow query (%.1f ms) during %s: %s",
+            elapsed * 1000, stats.path if stats else "background work", " ".join(statement.split())[:2000]
+        )
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+# --- Middleware ---
+
+def _route_label(scope) -> str:
+    # The path template, so /courses/1 and /courses/2 share a series
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses (SSE, exports) pass through untouched."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope["path"])
+        token = _current.set(stats)
+        method = scope["method"]
+        status = 500
+
+        async def send_with_stats(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.QUERY_COUNT_HEADER:
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Query-Count"] = str(stats.queries)
+                    headers["X-DB-Time-Ms"] = f"{stats.db_seconds * 1000:.2f}"
+            await send(message)
+
+        IN_FLIGHT.labels(method).inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.labels(method).dec()
+            route = _route_label(scope)
+            REQUEST_SECONDS.labels(method, route, str(status)).observe(elapsed)
+            REQUEST_QUERIES.labels(method, route).observe(stats.queries)
+            REQUEST_DB_SECONDS.labels(method, route).observe(stats.db_seconds)
+            _current.reset(token)
+
+
+# --- Scrape-time gauges ---
+
+class _StatsCollector:
+    """Connection pools and caches, read at scrape time from their own stats()."""
+
+    def describe(self):
+        return [] # Don't let register() call collect() while the app is still importing
+
+    def collect(self):
+        from database import async_database, engine, pool_stats
+        from core import load_shedding
+        from core.security import principal_cache
+        from services import course_cache, seat_events, write_pipeline
+
+        pool_gauges = {
+            "size": GaugeMetricFamily("db_pool_size", "Pooled connections kept open", labels=["engine"]),
+            "checked_out": GaugeMetricFamily("db_pool_checked_out", "Connections in use", labels=["engine"]),
+            "overflow": GaugeMetricFamily("db_pool_overflow", "Connections beyond the pool size (negative: unused slots)", labels=["engine"]),
+            "peak_checked_out": GaugeMetricFamily("db_pool_peak_checked_out", "Most connections in use at once", labels=["engine"]),
+            "wait_ms_max": GaugeMetricFamily("db_pool_wait_max_ms", "Longest wait for a connection", labels=["engine"]),
+        }
+        pool_counters = {
+            "checkouts": CounterMetricFamily("db_pool_checkouts", "Connections handed out", labels=["engine"]),
+            "timeouts": CounterMetricFamily("db_pool_timeouts", "Checkouts that gave up after DB_POOL_TIMEOUT", labels=["engine"]),
+        }
+        engines = [("sync", engine)]
+        if settings.DB_ASYNC:
+            engines.append(("async", async_database().engine))
+        for label, db_engine in engines:
+            stats = pool_stats(db_engine)
+            for key, family in {**pool_gauges, **pool_counters}.items():
+                if key in stats:
+                    family.add_metric([label], stats[key])
+        yield from pool_gauges.values()
+        yield from pool_counters.values()
+
+        caches = (("courses", course_cache.stats()), ("principals", principal_cache.stats()))
+        hits = CounterMetricFamily("cache_hits", "Cache hits", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache misses", labels=["cache"])
+        size = GaugeMetricFamily("cache_entries", "Entries held in process", labels=["cache"])
+        for name, stats in caches:
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            size.add_metric([name], stats["size"])
+        yield from (hits, misses, size)
+
+        pipeline = write_pipeline.pipeline.stats()
+        yield CounterMetricFamily("write_pipeline_batches", "Transactions committed by the write pipeline", value=pipeline["batches"])
+        yield CounterMetricFamily("write_pipeline_writes", "Writes handled by the write pipeline, committed or rejected", value=pipeline["writes"])
+        yield CounterMetricFamily("write_pipeline_failed_batches", "Write pipeline transactions that failed to commit", value=pipeline["failed_batches"])
+        yield GaugeMetricFamily("write_pipeline_queued", "Writes waiting for the write pipeline", value=pipeline["queued"])
+
+        running = GaugeMetricFamily("load_shedding_running", "Requests running, by route class", labels=["route_class"])
+        queued = GaugeMetricFamily("load_shedding_queue_depth", "Requests waiting for a slot, by route class", labels=["route_class"])
+        admitted = CounterMetricFamily("load_shedding_admitted", "Requests given a slot, by route class", labels=["route_class"])
+        shed = CounterMetricFamily("load_shedding_shed", "Requests answered 503, by route class and reason", labels=["route_class", "reason"])
+        for name, stats in load_shedding.shedder.stats().items():
+            running.add_metric([name], stats["running"])
+            queued.add_metric([name], stats["queued"])
+            admitted.add_metric([name], stats["admitted"])
+            shed.add_metric([name, "queue_full"], stats["shed_queue_full"])
+            shed.add_metric([name, "deadline"], stats["shed_deadline"])
+        yield from (running, queued, admitted, shed)
+
+        yield GaugeMetricFamily(
+            "seat_stream_subscribers", "Open live seat streams", value=seat_events.broker.subscriber_count()
+        )
+
+registry.register(_StatsCollector())
+
+
+def render() -> bytes:
+    """The Prometheus text exposition of everything above."""
+    return generate_latest(registry)
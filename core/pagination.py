@@ -0,0 +1,48 @@
+import base64
+import json
+from fastapi import HTTPException
+
+from core.config import settings
+
+
+def clamp_limit(limit: int) -> int:
+    """Every list endpoint serves at most MAX_PAGE_SIZE rows per page."""
+    return max(1, min(limit, settings.MAX_PAGE_SIZE))
+
+def encode_cursor(sort: str, values: list) -> str:
+    """
+    Packs the sort key of the last row on a page into an opaque token.
+    Clients hand it back unchanged as ?cursor= to get the next page.
+    """
+    raw = json.dumps({"s": sort, "v": values}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str, sort: str, types: tuple) -> list:
+    """
+    Unpacks a cursor made by encode_cursor for the given sort. Each value must
+    have exactly the type of its sort column (so no bools for ints and no
+    NULLs), as the values go straight into the keyset comparison.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = data["v"]
+        valid = (
+            data["s"] == sort and isinstance(values, list) and len(values) == len(types)
+            and all(type(value) is expected for value, expected in zip(values, types))
+        )
+    except (ValueError, TypeError, KeyError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid or expired cursor")
+    return values
+
+def keyset_page(rows: list, limit: int, sort: str, sort_key: tuple):
+    """
+    Trims a "limit + 1" fetch to one page. The extra row only signals that
+    another page exists; the cursor points at the last row that is returned.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(sort, [getattr(rows[-1], column.key) for column in sort_key])
@@ -0,0 +1,66 @@
+"""
+Read-your-writes for replica routing (see database.ReadRouting).
+
+Replicas trail the primary, so a student who enrolls and then lists their
+course could be served a replica that has not seen the enrollment yet.
+ReadYourWritesMiddleware therefore pins a client after every successful
+write request (any method but GET/HEAD/OPTIONS, answered below 400), and the
+read sessions of a pinned client come from the primary until
+REPLICA_MAX_LAG_SECONDS have passed.
+
+Clients are identified by the user id in their verified bearer token, so
+every token of a user shares one pin. Requests without a valid token are
+never pinned: routes such as /auth/login answer 200 whatever the header
+says, and pins taken from unverified claims would let anyone pin arbitrary
+users or flood the pin table. Pins are kept per process, like the default
+rate limit counters.
+"""
+from jose import JWTError, jwt
+from core.cache import TTLCache
+from core.config import settings
+
+MAX_PINNED_CLIENTS = 100_000
+
+pins = TTLCache(maxsize=MAX_PINNED_CLIENTS, ttl=settings.REPLICA_MAX_LAG_SECONDS)
+
+_READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def client_key(authorization: str):
+    """The pin key for an Authorization header value, or None without a valid token."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    user_id = claims.get("id")
+    return f"user:{user_id}" if user_id is not None else f"token:{token}"
+
+
+def is_pinned(headers) -> bool:
+    """Whether the client sending these request headers wrote within REPLICA_MAX_LAG_SECONDS."""
+    key = client_key(headers.get("authorization"))
+    return key is not None and pins.get(key) is not None
+
+
+class ReadYourWritesMiddleware:
+    """Pure ASGI middleware pinning clients to the primary after their writes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in _READ_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_and_pin(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                authorization = dict(scope["headers"]).get(b"authorization")
+                key = client_key(authorization.decode("latin-1") if authorization else None)
+                if key is not None:
+                    pins.set(key, True)
+            await send(message)
+
+        await self.app(scope, receive, send_and_pin)
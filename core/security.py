@@ -1,14 +1,19 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
 from passlib.context import CryptContext
 
 # Internal imports
 from database import get_db
 from models.models import User
+from core.cache import LocalStore, TTLCache, shared_store
 from core.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
@@ -22,13 +27,77 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+# --- PRINCIPAL CACHE ---
+# Authenticated requests would otherwise decode the JWT and query the users table
+# every time. A verified token maps to a lightweight snapshot of its user for up
+# to AUTH_CACHE_TTL_SECONDS (never past the token's own expiry).
+
+@dataclass(frozen=True)
+class Principal:
+    """The parts of a User that routes need; serializes through UserOut like the ORM object."""
+    id: int
+    email: str
+    name: str
+    role: str
+    is_active: bool
+
+principal_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAX_ENTRIES, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
+# Bumped whenever a user's status or role changes; cached entries remember the
+# generation they were loaded under, so a bump makes every token of that user
+# stale. The counters live in AUTH_CACHE_URL's store, so a change committed by
+# any worker (or by a script using these models) revokes the cached principals
+# of every worker; without one they only reach this process.
+user_generations = shared_store(settings.AUTH_CACHE_URL) or LocalStore()
+
+def _user_generation(user_id: int) -> int:
+    return int(user_generations.get(f"auth:generation:{user_id}") or 0)
+
+def invalidate_user(user_id: int):
+    """Drops cached principals for a user. Call it after committing bulk UPDATEs, which bypass the ORM events below."""
+    user_generations.incr(f"auth:generation:{user_id}")
+
+# Bumping at flush would be too early: a request could read the new generation,
+# load the row as still committed, and cache the old state as current. The
+# changed ids wait in session.info and are bumped once the commit is through.
+
+def _changed_later(target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_users", set()).add(target.id)
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_change(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.is_active.history.has_changes() or state.attrs.role.history.has_changes():
+        _changed_later(target)
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    _changed_later(target)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for user_id in session.info.pop("changed_users", ()):
+        invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop("changed_users", None)
+
 # --- TOKEN VERIFICATION (For Protected Routes) ---
 
 def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+    cached = principal_cache.get(token)
+    if cached is not None:
+        principal, generation = cached
+        if generation == _user_generation(principal.id):
+            return principal
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -42,9 +111,18 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+
+    # Read the generation before the user, so a change committed in between
+    # leaves the entry we are about to cache already stale
+    user_id = payload.get("id")
+    generation = _user_generation(user_id) if user_id is not None else None
         
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    # Tokens carrying the user id are looked up by primary key
+    if user_id is not None:
+        user = db.get(User, user_id)
+    else:
+        user = db.query(User).filter(User.email == email).first()
+    if user is None or user.email != email:
         raise credentials_exception
         
     # Requirement: Inactive users cannot authenticate
@@ -53,15 +131,39 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
             status_code=status.HTTP_401_UNAUTHORIZED, 
             detail="User account is inactive"
         )
-        
-    return user
 
-from passlib.context import CryptContext
+    principal = Principal(id=user.id, email=user.email, name=user.name, role=user.role, is_active=user.is_active)
+    if generation is None:
+        generation = _user_generation(user.id)
+    remaining = payload.get("exp", 0) - datetime.now(timezone.utc).timestamp()
+    principal_cache.set(token, (principal, generation), ttl=remaining)
+    return principal
+
+# --- PASSWORD HASHING ---
+# bcrypt takes ~250ms per call at the default work factor. Running it in the
+# request handler would pin one of AnyIO's shared worker threads for that long,
+# so a login burst would starve every other endpoint. The async helpers below
+# run it on a small dedicated pool instead (bcrypt releases the GIL, so threads
+# hash in parallel) and only ever PASSWORD_HASH_WORKERS hashes run at once.
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.wrap_future(_hash_executor.submit(pwd_context.hash, password))
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    """
+    Returns (is_valid, new_hash). new_hash is set when the stored hash uses
+    outdated settings (e.g. other BCRYPT_ROUNDS) and should replace it.
+    """
+    return await asyncio.wrap_future(
+        _hash_executor.submit(pwd_context.verify_and_update, plain_password, hashed_password)
+    )
\ No newline at end of file
@@ -1,21 +1,18 @@
+from collections import Counter
 from fastapi import HTTPException
+from sqlalchemy import and_, bindparam, case, delete, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from models import models
 from schemas import course, user
-from datetime import datetime
+from core.config import settings
+from core.pagination import decode_cursor, keyset_page
+from core.security import get_password_hash, verify_password
+from services import audit, course_cache, seat_events
+from services.search import get_search_backend
+from datetime import datetime, timezone
 
 
-# Setup password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# --- UTILITY FUNCTIONS ---
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
 # --- USER CRUD ---
 
 def get_user_by_email(db: Session, email: str):
@@ -29,11 +26,13 @@ def authenticate_user(db: Session, email: str, password: str):
         return False
     return user
 
-def create_user(db: Session, user: user.UserCreate):
+def create_user(db: Session, user: user.UserCreate, hashed_password: str = None):
     """
     Handles User Registration (Requirement 1.1)
+    Pass hashed_password when it was already computed off-thread
+    (see core.security.hash_password_async).
     """
-    hashed_pwd = get_password_hash(user.password)
+    hashed_pwd = hashed_password or get_password_hash(user.password)
     db_user = models.User(
         name=user.name,
         email=user.email,
@@ -46,6 +45,15 @@ def create_user(db: Session, user: user.UserCreate):
     db.refresh(db_user)
     return db_user
 
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    """Stores a rehashed password (e.g. after BCRYPT_ROUNDS changed)"""
+    db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(hashed_password=hashed_password)
+    )
+    db.commit()
+
 # --- COURSE CRUD ---
 
 def create_course(db: Session, course: course.CourseCreate):
@@ -54,108 +62,795 @@ def create_course(db: Session, course: course.CourseCreate):
     """
     db_course = models.Course(**course.model_dump())
     db.add(db_course)
+    db.flush()
+    get_search_backend(db).sync_course(db, db_course)
     db.commit()
+    course_cache.invalidate()
     db.refresh(db_course)
     return db_course
 
 def update_course(db: Session, course_id: int, course_in: course.CourseUpdate):
     db_course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    if not db_course:
+        return None # The router will handle the 404 based on this
     
     # Extract the data sent in the request (exclude unset fields)
     update_data = course_in.model_dump(exclude_unset=True)
     
     for key, value in update_data.items():
         setattr(db_course, key, value)
+
+    if update_data.keys() & {"title", "code", "is_active"}:
+        get_search_backend(db).sync_course(db, db_course)
+
+    # More seats (or a reopened course) go to the waitlist first
+    seats_changed = bool(update_data.keys() & {"capacity", "is_active"})
+    if seats_changed:
+        db.flush()
+        fill_from_waitlist(db, course_id)
     
     db.commit()
+    course_cache.invalidate(course_id)
     db.refresh(db_course)
+    if seats_changed:
+        seat_events.publish(db_course)
     return db_course
 
 def toggle_course(db: Session, course_id: int):
     db_course = db.query(models.Course).filter(models.Course.id == course_id).first()
     if db_course:
         db_course.is_active = not db_course.is_active
+        get_search_backend(db).sync_course(db, db_course)
+        if db_course.is_active:
+            db.flush()
+            fill_from_waitlist(db, course_id)
         db.commit()
+        course_cache.invalidate(course_id)
         db.refresh(db_course)
+        seat_events.publish(db_course)
     return db_course
 
-def get_courses(db: Session, skip: int = 0, limit: int = 10, search: str = None):
-    query = db.query(models.Course).filter(models.Course.is_active == True)
+# --- Statement builders ---
+# Shared with crud_async so the sync and async paths run identical SQL.
+
+# Read-only listings select exactly the CourseOut / EnrollmentOut fields and hand
+# back Rows: no ORM objects, identity-map entries or attribute instrumentation
+# per row, and response_model / TypeAdapter validate Rows like objects
+_capacity = func.coalesce(models.Course.capacity, 0)
+_enrolled = func.coalesce(models.Course.enrolled_count, 0)
+COURSE_OUT_COLUMNS = (
+    models.Course.id, models.Course.title, models.Course.code, models.Course.capacity,
+    models.Course.is_active, models.Course.enrolled_count,
+    case((_capacity > _enrolled, _capacity - _enrolled), else_=0).label("seats_remaining"),
+)
+ENROLLMENT_OUT_COLUMNS = (
+    models.Enrollment.id, models.Enrollment.user_id, models.Enrollment.course_id, models.Enrollment.created_at
+)
+
+def read_rows(db: Session, stmt) -> list:
+    """Runs a listing statement on the session's connection: Core rows, without ORM result processing."""
+    return db.connection().execute(stmt).all()
+
+def courses_statement(db, skip: int = 0, limit: int = 10, search: str = None):
+    stmt = select(*COURSE_OUT_COLUMNS).where(models.Course.is_active == True)
     if search:
-        query = query.filter(models.Course.title.contains(search))
-    return query.offset(skip).limit(limit).all()
-def enroll_student(db: Session, course_id: int, user_id: int):
-    # 1. Check if course exists and is active
-    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+        # Best matches first
+        return get_search_backend(db).ranked(stmt, search, skip, limit)
+    return stmt.order_by(models.Course.id).offset(skip).limit(limit)
+
+def courses_page_statement(db, limit: int = 10, cursor: str = None, sort: str = "id", search: str = None):
+    """Returns (statement, sort_key); the statement fetches limit + 1 rows for keyset_page."""
+    stmt = select(*COURSE_OUT_COLUMNS).where(models.Course.is_active == True)
+
+    if sort == "title":
+        sort_key = (models.Course.title, models.Course.id)
+    else:
+        sort_key = (models.Course.id,)
+    after = decode_cursor(cursor, sort, tuple(column.type.python_type for column in sort_key)) if cursor else None
+    if after:
+        stmt = stmt.where(tuple_(*sort_key) > tuple_(*after))
+
+    if search:
+        # Keyset pages keep their id/title order; the index only filters.
+        # In id order the search backend can seek to the page itself.
+        if sort == "id":
+            stmt = get_search_backend(db).filter(stmt, search, after_id=after[0] if after else None, limit=limit + 1)
+        else:
+            stmt = get_search_backend(db).filter(stmt, search)
+
+    # One extra row tells us whether another page exists
+    return stmt.order_by(*sort_key).limit(limit + 1), sort_key
+
+def enrollments_statement(skip: int = 0, limit: int = 10, course_id: int = None):
+    stmt = select(*ENROLLMENT_OUT_COLUMNS)
+    if course_id is not None:
+        stmt = stmt.where(models.Enrollment.course_id == course_id)
+    return stmt.order_by(models.Enrollment.id).offset(skip).limit(limit)
+
+def enrollments_page_statement(limit: int = 10, cursor: str = None, course_id: int = None):
+    stmt = select(*ENROLLMENT_OUT_COLUMNS)
+    if course_id is not None:
+        stmt = stmt.where(models.Enrollment.course_id == course_id)
+    if cursor:
+        (after_id,) = decode_cursor(cursor, "id", (int,))
+        stmt = stmt.where(models.Enrollment.id > after_id)
+    return stmt.order_by(models.Enrollment.id).limit(limit + 1)
+
+# What the seat UPDATEs return: the course's new state for services.seat_events
+SEAT_STATE_COLUMNS = (models.Course.id, models.Course.enrolled_count, models.Course.capacity, models.Course.version)
+
+def reserve_seat_statement(course_id: int):
+    # The WHERE clause re-checks activity and capacity while holding the row's
+    # write lock, so two concurrent requests can never both take the last seat
+    return (
+        update(models.Course)
+        .where(
+            models.Course.id == course_id,
+            models.Course.is_active == True,
+            models.Course.enrolled_count < models.Course.capacity
+        )
+        .values(enrolled_count=models.Course.enrolled_count + 1)
+        .returning(*SEAT_STATE_COLUMNS)
+    )
+
+def release_seat_statement(course_id: int):
+    return (
+        update(models.Course)
+        .where(models.Course.id == course_id, models.Course.enrolled_count > 0)
+        .values(enrolled_count=models.Course.enrolled_count - 1)
+        .returning(*SEAT_STATE_COLUMNS)
+    )
+
+def drop_enrollment_statement(course_id: int, user_id: int):
+    return (
+        delete(models.Enrollment)
+        .where(
+            models.Enrollment.course_id == course_id,
+            models.Enrollment.user_id == user_id
+        )
+        .returning(models.Enrollment.id)
+    )
+
+def admin_delete_enrollment_statement(enrollment_id: int):
+    return (
+        delete(models.Enrollment)
+        .where(models.Enrollment.id == enrollment_id)
+        .returning(models.Enrollment.id, models.Enrollment.user_id, models.Enrollment.course_id)
+    )
+
+ALREADY_ENROLLED = "You are already enrolled in this course"
+
+def rejection_for(course, already_enrolled: bool) -> HTTPException:
     if not course:
-        raise HTTPException(status_code=404, detail="Course not found")
+        return HTTPException(status_code=404, detail="Course not found")
     if not course.is_active:
-        raise HTTPException(status_code=400, detail="Cannot enroll in an inactive course")
+        return HTTPException(status_code=400, detail="Cannot enroll in an inactive course")
+    if already_enrolled:
+        return HTTPException(status_code=409, detail=ALREADY_ENROLLED)
+    return HTTPException(status_code=400, detail="Course is full")
 
-    # 2. Check if student is already enrolled
-    existing_enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.course_id == course_id,
-        models.Enrollment.user_id == user_id
-    ).first()
-    if existing_enrollment:
-        raise HTTPException(status_code=409, detail="You are already enrolled in this course")
+# --- Course listings ---
 
-    # 3. Check Capacity
-    current_enrolled_count = db.query(models.Enrollment).filter(
-        models.Enrollment.course_id == course_id
-    ).count()
-    
-    if current_enrolled_count >= course.capacity:
-        raise HTTPException(status_code=400, detail="Course is full")
+def get_courses(db: Session, skip: int = 0, limit: int = 10, search: str = None):
+    """
+    Offset pagination, kept for clients that still send ?skip=.
+    Deep pages get slower; get_courses_page is the keyset alternative.
+    Returns Rows of COURSE_OUT_COLUMNS.
+    """
+    return read_rows(db, courses_statement(db, skip, limit, search))
 
-    # 4. Perform Enrollment
-    new_enrollment = models.Enrollment(course_id=course_id, user_id=user_id)
-    db.add(new_enrollment)
-    
-    # We flush here to get the new_enrollment.id without finishing the transaction yet
-    db.flush() 
-
-    # 5. Create Audit Log
-    audit_log = models.EnrollmentAudit(
-        enrollment_id=new_enrollment.id, 
-        action="ENROLLED", 
-        user_id=user_id
+def get_courses_page(db: Session, limit: int = 10, cursor: str = None, sort: str = "id", search: str = None):
+    """
+    Keyset pagination: seeks past the last row of the previous page instead of
+    skipping rows, so every page costs the same. Returns (rows, next_cursor).
+    """
+    stmt, sort_key = courses_page_statement(db, limit, cursor, sort, search)
+    rows = read_rows(db, stmt)
+    return keyset_page(rows, limit, sort, sort_key)
+
+def _enrollment_rejection(db: Session, course_id: int, user_id: int) -> HTTPException:
+    """
+    Works out why a seat reservation matched no row. Only runs on the failure path,
+    so successful enrollments never pay for these lookups.
+    """
+    course = db.get(models.Course, course_id)
+    existing_enrollment = db.scalar(
+        select(models.Enrollment.id).where(
+            models.Enrollment.course_id == course_id,
+            models.Enrollment.user_id == user_id
+        )
     )
-    db.add(audit_log)
-    
-    # Final commit for both Enrollment and Audit Log
+    return rejection_for(course, existing_enrollment is not None)
+
+def stage_enrollment(db: Session, course_id: int, user_id: int):
+    """
+    enroll_student up to its commit, in the caller's transaction. Returns the
+    new enrollment's EnrollmentOut row and the course's seat state; a rejection
+    is raised as an HTTPException and rolling back is left to the caller.
+    """
+    # Both statements go straight to the connection: nothing the ORM would
+    # synchronize is loaded, and the RETURNING rows are all the response needs
+    conn = db.connection()
+    # 1. Reserve a seat with a single conditional UPDATE (see reserve_seat_statement)
+    reserved = conn.execute(reserve_seat_statement(course_id)).first()
+    if not reserved:
+        raise _enrollment_rejection(db, course_id, user_id)
+
+    # 2. Perform Enrollment; the (course_id, user_id) unique constraint rejects duplicates
+    try:
+        new_enrollment = conn.execute(
+            insert(models.Enrollment).values(course_id=course_id, user_id=user_id).returning(*ENROLLMENT_OUT_COLUMNS)
+        ).one()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail=ALREADY_ENROLLED)
+
+    # 3. A seat taken directly ends the student's wait for it
+    conn.execute(leave_waitlist_statement(course_id, user_id))
+
+    # 4. Audit event (written to the outbox when the transaction commits)
+    audit.record(db, audit.ENROLLED, new_enrollment.id, user_id, course_id)
+    return new_enrollment, reserved
+
+def stage_drop(db: Session, course_id: int, user_id: int):
+    """
+    delete_own_enrollment up to its commit: removes the student's enrollment and
+    hands the seat to the waitlist. Returns the course's new seat state (or None).
+    """
+    dropped = db.execute(drop_enrollment_statement(course_id, user_id)).first()
+    if not dropped:
+        raise HTTPException(status_code=404, detail="Enrollment record not found")
+
+    audit.record(db, audit.DROPPED, dropped.id, user_id, course_id)
+    released = db.execute(release_seat_statement(course_id)).first()
+    # The freed seat goes straight to the head of the waitlist, if anyone is waiting
+    state, _ = fill_from_waitlist(db, course_id)
+    return state or released
+
+def stage_admin_removal(db: Session, enrollment_id: int):
+    """
+    admin_delete_enrollment up to its commit. Returns the removed row (id,
+    user_id, course_id) and the course's new seat state, or (None, None).
+    """
+    # Remove the specific enrollment record by its ID
+    db_enrollment = db.execute(admin_delete_enrollment_statement(enrollment_id)).first()
+    if not db_enrollment:
+        return None, None
+
+    audit.record(db, audit.ADMIN_REMOVED, db_enrollment.id, db_enrollment.user_id, db_enrollment.course_id)
+    released = db.execute(release_seat_statement(db_enrollment.course_id)).first()
+    state, _ = fill_from_waitlist(db, db_enrollment.course_id)
+    return db_enrollment, state or released
+
+def seats_changed(course_id: int, state):
+    """After a commit that changed course_id's seats: drops its cached responses and publishes state."""
+    course_cache.invalidate(course_id)
+    if state:
+        seat_events.publish(state)
+
+def enroll_student(db: Session, course_id: int, user_id: int):
+    try:
+        new_enrollment, reserved = stage_enrollment(db, course_id, user_id)
+    except HTTPException:
+        db.rollback() # Also gives back a seat reserved before a duplicate was found
+        raise
+
+    # Final commit for the seat, the Enrollment and the audit event
     db.commit()
-    db.refresh(new_enrollment)
-    
+    seats_changed(course_id, reserved)
     return new_enrollment
 
 def delete_own_enrollment(db: Session, course_id: int, user_id: int):
-    enrollment = db.query(models.Enrollment).filter(
-        models.Enrollment.course_id == course_id,
-        models.Enrollment.user_id == user_id
-    ).first()
-    
-    if not enrollment:
-        raise HTTPException(status_code=404, detail="Enrollment record not found")
-        
-    db.delete(enrollment)
+    try:
+        state = stage_drop(db, course_id, user_id)
+    except HTTPException:
+        db.rollback()
+        raise
     db.commit()
+    seats_changed(course_id, state)
     return {"message": "Successfully dropped the course"}
 
 def admin_delete_enrollment(db: Session, enrollment_id: int):
-    # Find the specific enrollment record by its ID
-    db_enrollment = db.query(models.Enrollment).filter(models.Enrollment.id == enrollment_id).first()
-    
+    db_enrollment, state = stage_admin_removal(db, enrollment_id)
     if not db_enrollment:
+        db.rollback()
         return None  # The router will handle the 404 based on this
-        
-    db.delete(db_enrollment)
     db.commit()
+    seats_changed(db_enrollment.course_id, state)
     return db_enrollment
 
+# --- WAITLIST ---
+
+def leave_waitlist_statement(course_id: int, user_id: int):
+    return (
+        delete(models.Waitlist)
+        .where(models.Waitlist.course_id == course_id, models.Waitlist.user_id == user_id)
+        .returning(models.Waitlist.id)
+    )
+
+def _still_waiting(course_id: int):
+    # Enrolling removes a student's entry, so this only filters out an entry
+    # whose join raced an enrollment committed in between
+    Waitlist = models.Waitlist
+    return and_(
+        Waitlist.course_id == course_id,
+        ~select(models.Enrollment.id).where(
+            models.Enrollment.course_id == Waitlist.course_id,
+            models.Enrollment.user_id == Waitlist.user_id
+        ).exists()
+    )
+
+def waitlist_head_statement(course_id: int):
+    # Oldest entry first. SKIP LOCKED lets concurrent drops promote different
+    # students instead of queueing on the same row (Postgres).
+    return (
+        select(models.Waitlist)
+        .where(_still_waiting(course_id))
+        .order_by(models.Waitlist.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+
+def fill_from_waitlist(db: Session, course_id: int):
+    """
+    Moves waitlisted students into the course's free seats, oldest first, in
+    the caller's transaction. Returns (seat state after the last promotion or
+    None, {user_id: enrollment_id} of the promoted); the caller commits.
+    """
+    state, promoted = None, {}
+    while True:
+        entry = db.scalars(waitlist_head_statement(course_id)).first()
+        if entry is None:
+            break
+        reserved = db.execute(reserve_seat_statement(course_id)).first()
+        if not reserved:
+            break
+        db.delete(entry)
+        enrollment = models.Enrollment(course_id=course_id, user_id=entry.user_id)
+        db.add(enrollment)
+        db.flush()
+        audit.record(db, audit.ENROLLED, enrollment.id, entry.user_id, course_id)
+        state, promoted[entry.user_id] = reserved, enrollment.id
+    return state, promoted
+
+def join_waitlist(db: Session, course_id: int, user_id: int) -> dict:
+    """
+    Queues a student for a course. If a seat is free (or frees up while
+    joining) and nobody is ahead of them, they are enrolled right away.
+    """
+    course = db.get(models.Course, course_id)
+    if not course or not course.is_active:
+        raise rejection_for(course, False)
+    if db.scalar(select(models.Enrollment.id).where(
+        models.Enrollment.course_id == course_id,
+        models.Enrollment.user_id == user_id
+    )):
+        raise HTTPException(status_code=409, detail=ALREADY_ENROLLED)
+
+    entry = models.Waitlist(course_id=course_id, user_id=user_id)
+    db.add(entry)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="You are already on this course's waitlist")
+    entry_id = entry.id
+    state, promoted = fill_from_waitlist(db, course_id)
+    db.commit()
+    if state:
+        course_cache.invalidate(course_id)
+        seat_events.publish(state)
+
+    if user_id in promoted:
+        return {"course_id": course_id, "status": "enrolled", "enrollment_id": promoted[user_id], "position": None}
+    # Counted over the entries promotion would consider, so it is the real queue position
+    position = db.scalar(
+        select(func.count()).select_from(models.Waitlist)
+        .where(_still_waiting(course_id), models.Waitlist.id <= entry_id)
+    )
+    return {"course_id": course_id, "status": "waitlisted", "enrollment_id": None, "position": position}
+
+def leave_waitlist(db: Session, course_id: int, user_id: int):
+    left = db.execute(leave_waitlist_statement(course_id, user_id)).first()
+    if not left:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="You are not on this course's waitlist")
+    db.commit()
+    return {"message": "Left the waitlist"}
+
+# --- ENROLLMENT LISTINGS (Admin) ---
+
+def get_enrollments(db: Session, skip: int = 0, limit: int = 10, course_id: int = None):
+    return read_rows(db, enrollments_statement(skip, limit, course_id))
+
+def get_enrollments_page(db: Session, limit: int = 10, cursor: str = None, course_id: int = None):
+    rows = read_rows(db, enrollments_page_statement(limit, cursor, course_id))
+    return keyset_page(rows, limit, "id", (models.Enrollment.id,))
+
+# --- BULK ENROLLMENT (Admin) ---
+
+class _BulkConflict(Exception):
+    """A concurrent writer changed seats or enrollments between the chunk's reads and writes."""
+
+def _bulk_decide(db: Session, rows: list):
+    """
+    Validates a chunk with three set-based lookups and decides every row in
+    request order. Returns (results, accepted) where accepted holds the
+    (result, user_id, course_id) rows to insert.
+    """
+    pairs = {(course_id, user_id) for _, user_id, course_id in rows if user_id is not None and course_id is not None}
+    course_ids = {course_id for course_id, _ in pairs}
+    user_ids = {user_id for _, user_id in pairs}
+
+    # Locked in id order on Postgres so concurrent chunks cannot deadlock (SQLite ignores it)
+    courses = {
+        c.id: c for c in db.execute(
+            select(models.Course.id, models.Course.is_active, models.Course.capacity, models.Course.enrolled_count)
+            .where(models.Course.id.in_(course_ids))
+            .order_by(models.Course.id)
+            .with_for_update()
+        )
+    } if course_ids else {}
+    roles = dict(db.execute(
+        select(models.User.id, models.User.role).where(models.User.id.in_(user_ids))
+    ).all()) if user_ids else {}
+    # The chunk's students' current enrollments, through the user_id index. A plain
+    # IN list binds far faster than a row-value IN over every pair, and the
+    # students' other courses it also returns are harmless.
+    taken = set(db.execute(
+        select(models.Enrollment.course_id, models.Enrollment.user_id)
+        .where(models.Enrollment.user_id.in_(user_ids))
+    ).all()) if pairs else set()
+    seats = {c.id: (c.capacity or 0) - c.enrolled_count for c in courses.values()}
+
+    results, accepted = [], []
+    for row, user_id, course_id in rows:
+        course = courses.get(course_id)
+        if user_id is None or course_id is None:
+            status = "invalid_row"
+        elif course is None:
+            status = "course_not_found"
+        elif not course.is_active:
+            status = "course_inactive"
+        elif user_id not in roles:
+            status = "user_not_found"
+        elif roles[user_id] != "student":
+            status = "not_a_student"
+        elif (course_id, user_id) in taken:
+            status = "already_enrolled"
+        elif seats[course_id] <= 0:
+            status = "course_full"
+        else:
+            status = "enrolled"
+            taken.add((course_id, user_id))
+            seats[course_id] -= 1
+        result = {"row": row, "user_id": user_id, "course_id": course_id, "status": status, "enrollment_id": None}
+        results.append(result)
+        if status == "enrolled":
+            accepted.append((result, user_id, course_id))
+    return results, accepted
+
+def _bulk_write(db: Session, accepted: list):
+    # Take each course's seats with a guarded UPDATE, sent as one executemany.
+    # On Postgres the courses are already locked FOR UPDATE, so the guard cannot
+    # miss; SQLite reports the summed rowcount, which catches a concurrent writer.
+    per_course = Counter(course_id for _, _, course_id in accepted)
+    courses = models.Course.__table__
+    reserved = db.execute(
+        update(courses)
+        .where(
+            courses.c.id == bindparam("b_course_id"),
+            courses.c.is_active == True,
+            courses.c.enrolled_count + bindparam("b_taken") <= courses.c.capacity
+        )
+        .values(enrolled_count=courses.c.enrolled_count + bindparam("b_taken")),
+        [{"b_course_id": course_id, "b_taken": taken} for course_id, taken in sorted(per_course.items())]
+    )
+    if db.get_bind().dialect.supports_sane_multi_rowcount and reserved.rowcount != len(per_course):
+        raise _BulkConflict()
+
+    # Core executemany INSERTs, batched into multi-row VALUES. RETURNING rows are
+    # matched back by (course_id, user_id), which is unique within the chunk;
+    # asking for parameter order instead would make SQLite insert row by row.
+    enrollments = models.Enrollment.__table__
+    inserted = db.execute(
+        insert(enrollments).returning(enrollments.c.id, enrollments.c.course_id, enrollments.c.user_id),
+        [{"user_id": user_id, "course_id": course_id} for _, user_id, course_id in accepted]
+    ).all()
+    enrollment_ids = {(course_id, user_id): id_ for id_, course_id, user_id in inserted}
+
+    # The audit events are copied from the new enrollments into the outbox inside the database
+    outbox = models.AuditOutbox.__table__
+    db.execute(
+        insert(outbox).from_select(
+            ["enrollment_id", "action", "user_id", "course_id", "timestamp"],
+            select(
+                enrollments.c.id,
+                literal(audit.ENROLLED),
+                enrollments.c.user_id,
+                enrollments.c.course_id,
+                literal(datetime.now(timezone.utc), outbox.c.timestamp.type)
+            ).where(enrollments.c.id.in_(enrollment_ids.values()))
+        )
+    )
+    for result, user_id, course_id in accepted:
+        result["enrollment_id"] = enrollment_ids[course_id, user_id]
+
+    # Students who got their seat here stop waiting for it
+    waitlist = models.Waitlist.__table__
+    db.execute(
+        delete(waitlist).where(waitlist.c.course_id == bindparam("b_course_id"), waitlist.c.user_id == bindparam("b_user_id")),
+        [{"b_course_id": course_id, "b_user_id": user_id} for _, user_id, course_id in accepted]
+    )
+
+def _bulk_committed(db: Session, accepted: list):
+    # Caches and live seat streams of every course that took seats
+    if accepted:
+        course_ids = {course_id for _, _, course_id in accepted}
+        course_cache.invalidate(*course_ids)
+        for state in db.execute(select(*SEAT_STATE_COLUMNS).where(models.Course.id.in_(course_ids))):
+            seat_events.publish(state)
+
+def bulk_enroll_chunk(db: Session, rows: list, attempts: int = 3) -> list:
+    """
+    Enrolls a chunk of (row, user_id, course_id) tuples in one transaction and
+    returns a result dict per row, in order. Rows are checked like
+    enroll_student would check them, but with one query per table for the
+    whole chunk instead of four per row.
+    """
+    for _ in range(attempts):
+        results, accepted = _bulk_decide(db, rows)
+        try:
+            if accepted:
+                _bulk_write(db, accepted)
+            db.commit()
+            _bulk_committed(db, accepted)
+            return results
+        except (_BulkConflict, IntegrityError):
+            # Someone enrolled into the same courses meanwhile: decide the chunk again
+            db.rollback()
+    raise HTTPException(status_code=409, detail="Enrollments changed during the bulk load; retry the request")
+
+# --- ADMISSION QUEUE ---
+# Registration-day mode (settings.ADMISSION_QUEUE_ENABLED): requests are stored
+# as intents and applied in FIFO batches by services.admission's worker,
+# through the bulk enrollment path above.
+
+def create_enrollment_intent(db: Session, course_id: int, user_id: int):
+    intent = models.EnrollmentIntent(course_id=course_id, user_id=user_id, status="pending")
+    db.add(intent)
+    db.commit()
+    db.refresh(intent)
+    return intent
+
+def get_enrollment_intent(db: Session, intent_id: int, user_id: int):
+    intent = db.get(models.EnrollmentIntent, intent_id, populate_existing=True)
+    if not intent or intent.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Enrollment request not found")
+    return intent
+
+def _waitlist_full(db: Session, results: list):
+    # Students who found their course full queue up in arrival order
+    full = [result for result in results if result["status"] == "course_full"]
+    if not full:
+        return
+    waiting = set(db.execute(
+        select(models.Waitlist.course_id, models.Waitlist.user_id)
+        .where(models.Waitlist.user_id.in_({result["user_id"] for result in full}))
+    ).all())
+    new_entries = []
+    for result in full:
+        pair = (result["course_id"], result["user_id"])
+        if pair not in waiting:
+            waiting.add(pair)
+            new_entries.append({"course_id": pair[0], "user_id": pair[1]})
+        result["status"] = "waitlisted"
+    if new_entries:
+        db.execute(insert(models.Waitlist.__table__), new_entries)
+
+def apply_enrollment_intents(db: Session, limit: int, attempts: int = 3) -> list:
+    """
+    Applies up to limit pending intents, oldest first, in one transaction:
+    seats go to the earliest requests and the rest join the waitlist. Returns
+    a result dict per intent (row is the intent id), like bulk_enroll_chunk.
+    """
+    Intent = models.EnrollmentIntent
+    for _ in range(attempts):
+        # SKIP LOCKED: a second worker process takes the next batch instead of waiting (Postgres)
+        pending = db.execute(
+            select(Intent.id, Intent.user_id, Intent.course_id)
+            .where(Intent.status == "pending")
+            .order_by(Intent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not pending:
+            db.rollback()
+            return []
+        results, accepted = _bulk_decide(db, [tuple(row) for row in pending])
+        try:
+            if accepted:
+                _bulk_write(db, accepted)
+            _waitlist_full(db, results)
+            intents = Intent.__table__
+            db.execute(
+                update(intents)
+                .where(intents.c.id == bindparam("b_id"))
+                .values(status=bindparam("b_status"), enrollment_id=bindparam("b_enrollment_id"), processed_at=datetime.now(timezone.utc)),
+                [{"b_id": r["row"], "b_status": r["status"], "b_enrollment_id": r["enrollment_id"]} for r in results]
+            )
+            db.commit()
+            _bulk_committed(db, accepted)
+            return results
+        except (_BulkConflict, IntegrityError):
+            db.rollback()
+    raise HTTPException(status_code=409, detail="Enrollments changed while applying the admission queue")
+
+# --- AUDIT OUTBOX ---
+# See services/audit.py: events are committed to the outbox and relayed here.
+
+AUDIT_COLUMNS = ("enrollment_id", "action", "user_id", "course_id", "timestamp")
+
+def relay_audit_outbox(db: Session, limit: int = None) -> int:
+    """
+    Moves up to limit of the oldest outbox events into enrollment_audit in one
+    transaction (copy, then delete) and returns how many were moved.
+    """
+    outbox = models.AuditOutbox.__table__
+    # SKIP LOCKED: a second relay takes the next batch instead of waiting (Postgres)
+    ids = db.scalars(
+        select(outbox.c.id)
+        .order_by(outbox.c.id)
+        .limit(limit or settings.AUDIT_RELAY_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not ids:
+        db.rollback()
+        return 0
+    # By id list rather than "id <= last": on Postgres a smaller id can commit
+    # after this read, and a range delete would drop it unrelayed
+    batch = outbox.c.id.in_(ids)
+    db.execute(
+        insert(models.EnrollmentAudit.__table__).from_select(
+            AUDIT_COLUMNS,
+            select(*(outbox.c[name] for name in AUDIT_COLUMNS)).where(batch).order_by(outbox.c.id)
+        )
+    )
+    db.execute(delete(outbox).where(batch))
+    db.commit()
+    return len(ids)
+
+def relay_all_audit_events(db: Session) -> int:
+    relayed = 0
+    while moved := relay_audit_outbox(db):
+        relayed += moved
+        if moved < settings.AUDIT_RELAY_BATCH_SIZE:
+            break
+    return relayed
+
+# --- IDEMPOTENCY KEYS ---
+# The persistent store of services/idempotency.py (IDEMPOTENCY_PERSIST). A
+# pending row (status_code NULL) is the lock of the request running the key.
+
+def claim_idempotency_key(db: Session, key: str, fingerprint: str, now: datetime, expired_before: datetime, abandoned_before: datetime):
+    """
+    Makes the caller the owner of key: inserts a pending row, or takes over one
+    created before expired_before (or, still pending, before abandoned_before).
+    Returns None once claimed, else the existing row to wait on or replay.
+    """
+    keys = models.IdempotencyKey.__table__
+    try:
+        db.execute(insert(keys).values(key=key, fingerprint=fingerprint, created_at=now))
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+    taken = db.execute(
+        update(keys)
+        .where(
+            keys.c.key == key,
+            or_(keys.c.created_at < expired_before, and_(keys.c.status_code.is_(None), keys.c.created_at < abandoned_before)),
+        )
+        .values(fingerprint=fingerprint, created_at=now, status_code=None, headers=None, body=None)
+    ).rowcount
+    db.commit()
+    if taken:
+        return None
+    return get_idempotency_key(db, key)
+
+def get_idempotency_key(db: Session, key: str):
+    keys = models.IdempotencyKey.__table__
+    row = db.execute(
+        select(keys.c.fingerprint, keys.c.status_code, keys.c.headers, keys.c.body).where(keys.c.key == key)
+    ).first()
+    db.rollback()
+    return row
+
+def complete_idempotency_key(db: Session, key: str, status_code: int, headers: str, body: bytes):
+    keys = models.IdempotencyKey.__table__
+    db.execute(update(keys).where(keys.c.key == key).values(status_code=status_code, headers=headers, body=body))
+    db.commit()
+
+def release_idempotency_key(db: Session, key: str):
+    """Drops a pending claim whose request failed, so the next retry runs it again."""
+    keys = models.IdempotencyKey.__table__
+    db.execute(delete(keys).where(keys.c.key == key, keys.c.status_code.is_(None)))
+    db.commit()
+
+def purge_idempotency_keys(db: Session, expired_before: datetime) -> int:
+    keys = models.IdempotencyKey.__table__
+    purged = db.execute(delete(keys).where(keys.c.created_at < expired_before)).rowcount
+    db.commit()
+    return purged
+
+# --- EXPORTS (Admin) ---
+# These return a streaming Result rather than a list: rows arrive in
+# EXPORT_BATCH_SIZE batches from a server-side cursor, so memory stays flat
+# however large the table is. Callers iterate result.partitions().
+
+def export_enrollments(
+    db: Session,
+    course_id: int = None,
+    since: datetime = None,
+    until: datetime = None,
+    include_user: bool = False,
+    include_course: bool = False
+):
+    Enrollment = models.Enrollment
+    stmt = select(Enrollment.id, Enrollment.user_id, Enrollment.course_id, Enrollment.created_at)
+    if include_user:
+        stmt = stmt.add_columns(
+            models.User.name.label("user_name"),
+            models.User.email.label("user_email")
+        ).outerjoin(models.User, models.User.id == Enrollment.user_id)
+    if include_course:
+        stmt = stmt.add_columns(
+            models.Course.code.label("course_code"),
+            models.Course.title.label("course_title")
+        ).outerjoin(models.Course, models.Course.id == Enrollment.course_id)
+
+    if course_id is not None:
+        stmt = stmt.where(Enrollment.course_id == course_id)
+    if since is not None:
+        stmt = stmt.where(Enrollment.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(Enrollment.created_at < until)
+
+    stmt = stmt.order_by(Enrollment.id).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    return db.execute(stmt)
+
+def export_audit_log(
+    db: Session,
+    action: str = None,
+    user_id: int = None,
+    course_id: int = None,
+    since: datetime = None,
+    until: datetime = None
+):
+    # Events still in the outbox are part of the history too
+    relay_all_audit_events(db)
+
+    Audit = models.EnrollmentAudit
+    stmt = select(Audit.id, Audit.enrollment_id, Audit.action, Audit.user_id, Audit.course_id, Audit.timestamp)
+
+    if action is not None:
+        stmt = stmt.where(Audit.action == action)
+    if user_id is not None:
+        stmt = stmt.where(Audit.user_id == user_id)
+    if course_id is not None:
+        stmt = stmt.where(Audit.course_id == course_id)
+    if since is not None:
+        stmt = stmt.where(Audit.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(Audit.timestamp < until)
+
+    stmt = stmt.order_by(Audit.id).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    return db.execute(stmt)
+
 def soft_delete_course(db: Session, course_id: int):
     course = db.query(models.Course).filter(models.Course.id == course_id).first()
     if course:
         course.deleted_at = datetime.utcnow()
+        get_search_backend(db).sync_course(db, course)
         db.commit()
+        course_cache.invalidate(course_id)
     return course
\ No newline at end of file
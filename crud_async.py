@@ -0,0 +1,95 @@
+"""
+AsyncSession versions of the crud.py functions behind the async routers
+(settings.DB_ASYNC). The SQL comes from the statement builders in crud.py, so
+both paths share the same queries, locking and error handling; only the
+awaiting differs. Admin course writes, enrollment writes (crud.stage_*) and
+the waitlist/admission queue calls run the sync crud functions through
+AsyncSession.run_sync.
+"""
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import models
+from schemas import course
+from core.pagination import keyset_page
+import crud
+
+# --- COURSE LOGIC ---
+
+async def get_course(db: AsyncSession, course_id: int):
+    return await db.get(models.Course, course_id)
+
+async def create_course(db: AsyncSession, course_in: course.CourseCreate):
+    return await db.run_sync(crud.create_course, course_in)
+
+async def update_course(db: AsyncSession, course_id: int, course_in: course.CourseUpdate):
+    return await db.run_sync(crud.update_course, course_id, course_in)
+
+async def toggle_course(db: AsyncSession, course_id: int):
+    return await db.run_sync(crud.toggle_course, course_id)
+
+async def _read_rows(db: AsyncSession, stmt) -> list:
+    return (await (await db.connection()).execute(stmt)).all()
+
+async def get_courses(db: AsyncSession, skip: int = 0, limit: int = 10, search: str = None):
+    return await _read_rows(db, crud.courses_statement(db, skip, limit, search))
+
+async def get_courses_page(db: AsyncSession, limit: int = 10, cursor: str = None, sort: str = "id", search: str = None):
+    stmt, sort_key = crud.courses_page_statement(db, limit, cursor, sort, search)
+    rows = await _read_rows(db, stmt)
+    return keyset_page(rows, limit, sort, sort_key)
+
+# --- ENROLLMENT LOGIC ---
+# The writes run crud.stage_* through run_sync, then commit and announce the
+# seat change like their sync counterparts, so the two paths cannot drift.
+
+async def enroll_student(db: AsyncSession, course_id: int, user_id: int):
+    try:
+        new_enrollment, reserved = await db.run_sync(crud.stage_enrollment, course_id, user_id)
+    except HTTPException:
+        await db.rollback() # Also gives back a seat reserved before a duplicate was found
+        raise
+    await db.commit()
+    crud.seats_changed(course_id, reserved)
+    return new_enrollment
+
+async def delete_own_enrollment(db: AsyncSession, course_id: int, user_id: int):
+    try:
+        state = await db.run_sync(crud.stage_drop, course_id, user_id)
+    except HTTPException:
+        await db.rollback()
+        raise
+    await db.commit()
+    crud.seats_changed(course_id, state)
+    return {"message": "Successfully dropped the course"}
+
+async def admin_delete_enrollment(db: AsyncSession, enrollment_id: int):
+    db_enrollment, state = await db.run_sync(crud.stage_admin_removal, enrollment_id)
+    if not db_enrollment:
+        await db.rollback()
+        return None
+    await db.commit()
+    crud.seats_changed(db_enrollment.course_id, state)
+    return db_enrollment
+
+# --- WAITLIST / ADMISSION QUEUE ---
+
+async def join_waitlist(db: AsyncSession, course_id: int, user_id: int):
+    return await db.run_sync(crud.join_waitlist, course_id, user_id)
+
+async def leave_waitlist(db: AsyncSession, course_id: int, user_id: int):
+    return await db.run_sync(crud.leave_waitlist, course_id, user_id)
+
+async def create_enrollment_intent(db: AsyncSession, course_id: int, user_id: int):
+    return await db.run_sync(crud.create_enrollment_intent, course_id, user_id)
+
+async def get_enrollment_intent(db: AsyncSession, intent_id: int, user_id: int):
+    return await db.run_sync(crud.get_enrollment_intent, intent_id, user_id)
+
+# --- ENROLLMENT LISTINGS (Admin) ---
+
+async def get_enrollments(db: AsyncSession, skip: int = 0, limit: int = 10, course_id: int = None):
+    return await _read_rows(db, crud.enrollments_statement(skip, limit, course_id))
+
+async def get_enrollments_page(db: AsyncSession, limit: int = 10, cursor: str = None, course_id: int = None):
+    rows = await _read_rows(db, crud.enrollments_page_statement(limit, cursor, course_id))
+    return keyset_page(rows, limit, "id", (models.Enrollment.id,))
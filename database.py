@@ -1,17 +1,277 @@
-from sqlalchemy import create_engine
+import functools
+import itertools
+import logging
+import threading
+import time
+from typing import NamedTuple
+from fastapi import Request
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from core import read_your_writes
+from core.config import settings
 
-# Use SQLite for local development
-SQLALCHEMY_DATABASE_URL = "sqlite:///./enrollment_platform.db"
+logger = logging.getLogger(__name__)
 
-# 'check_same_thread' is required only for SQLite
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Use SQLite for local development (override with DATABASE_URL, e.g. postgresql://...)
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+# Async drivers for each sync URL scheme
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db, postgresql://... -> postgresql+asyncpg://..."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r} databases")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+# --- Pool metrics ---
+
+class PoolMetrics:
+    """Checkout counts and time spent waiting for a pooled connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.peak_checked_out = 0
+
+    def record(self, waited: float, checked_out: int, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": self.wait_seconds_total / max(self.checkouts + self.timeouts, 1) * 1000,
+                "wait_ms_max": self.wait_seconds_max * 1000,
+            }
+
+class _TimedPool:
+    """Mixin timing every checkout of a QueuePool (including the wait for a free slot)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, self.checkedout(), timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start, self.checkedout())
+        return connection
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+def pool_stats(db_engine=None) -> dict:
+    """Pool occupancy and checkout wait times for db_engine (default: the app engine)."""
+    pool = (db_engine or engine).pool
+    metrics = getattr(pool, "metrics", None)
+    return metrics.snapshot(pool) if metrics else {"checked_out": pool.checkedout()}
+
+# --- Engine factory ---
+
+def _is_sqlite_memory(url) -> bool:
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    create_engine keyword arguments for url, from Settings: pool sizing for
+    server databases and SQLite files, connection health checks and
+    statement timeouts where the dialect has them.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    options = {"connect_args": {}}
+
+    if backend == "sqlite":
+        # 'check_same_thread' is required only for SQLite; pooled connections move between threads
+        options["connect_args"] = {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if _is_sqlite_memory(url):
+            return options # SQLAlchemy keeps in-memory databases on their own single-connection pool
+    elif backend == "postgresql":
+        timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS
+        if is_async:
+            options["connect_args"] = {
+                "timeout": settings.DB_CONNECT_TIMEOUT,
+                "server_settings": {"statement_timeout": str(timeout_ms)},
+            }
+        else:
+            options["connect_args"] = {
+                "connect_timeout": settings.DB_CONNECT_TIMEOUT,
+                "options": f"-c statement_timeout={timeout_ms}",
+            }
+        # Server connections can be dropped by the server or a proxy while idle
+        options["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+        options["pool_recycle"] = settings.DB_POOL_RECYCLE
+
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer; busy_timeout makes a second
+    # writer wait for the lock instead of failing with "database is locked"
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+def _install_sqlite_pragmas(sync_engine):
+    if sync_engine.dialect.name == "sqlite" and not _is_sqlite_memory(sync_engine.url):
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+
+def create_db_engine(url: str = None, **overrides):
+    """The app's Engine for url (default: settings.DATABASE_URL); overrides win over Settings."""
+    url = url or SQLALCHEMY_DATABASE_URL
+    db_engine = create_engine(url, **{**engine_options(url), **overrides})
+    _install_sqlite_pragmas(db_engine)
+    return db_engine
+
+def create_async_db_engine(url: str = None, **overrides):
+    """AsyncEngine counterpart of create_db_engine, on the matching async driver."""
+    url = to_async_url(url or SQLALCHEMY_DATABASE_URL)
+    db_engine = create_async_engine(url, **{**engine_options(url, is_async=True), **overrides})
+    _install_sqlite_pragmas(db_engine.sync_engine)
+    return db_engine
+
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessions for read-only routes (the listings). Nothing is added to them, so
+# they never flush or commit, and on Postgres their transactions run READ ONLY
+# (the driver setting is reset when the connection returns to the pool).
+# SQLite has no per-transaction equivalent and ignores the option.
+READ_ONLY = {"postgresql_readonly": True}
+ReadSessionLocal = sessionmaker(bind=engine.execution_options(**READ_ONLY), autoflush=False, expire_on_commit=False)
+
+# --- Read replicas ---
+
+_REPLICA = "replica" # Session.info key of read sessions bound to a replica
+
+class ReadRouting:
+    """
+    Picks the database behind a read-only session: the replicas in turn, or
+    the primary when there are none, none is healthy, or the client wrote
+    recently (core.read_your_writes). A replica that fails to connect or drops
+    a connection is left out for REPLICA_RETRY_SECONDS, then tried again.
+    """
+
+    def __init__(self, session_factory, replicas=()):
+        self.session_factory = session_factory
+        self.replicas = list(replicas)
+        self._binds = {replica: replica.execution_options(**READ_ONLY) for replica in self.replicas}
+        self._down_until = {}
+        self._turns = itertools.count()
+        for replica in self.replicas:
+            sync_engine = getattr(replica, "sync_engine", replica)
+            event.listen(sync_engine, "handle_error", functools.partial(self._on_error, replica))
+
+    def choose(self, headers=None):
+        """The replica for a request with these headers, or None for the primary."""
+        if not self.replicas or (headers is not None and read_your_writes.is_pinned(headers)):
+            return None
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._turns) % len(self.replicas)]
+            if self._down_until.get(replica, 0) <= now:
+                return replica
+        return None
+
+    def session(self, replica=None):
+        """A read-only session on replica, or on the primary."""
+        if replica is None:
+            return self.session_factory()
+        return self.session_factory(bind=self._binds[replica], info={_REPLICA: True})
+
+    def mark_down(self, replica):
+        if self._down_until.get(replica, 0) <= time.monotonic():
+            logger.warning(
+                "Read replica %s is unavailable; reading from the primary for %ss",
+                replica.url.render_as_string(hide_password=True), settings.REPLICA_RETRY_SECONDS
+            )
+        self._down_until[replica] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+    def _on_error(self, replica, context):
+        # No connection: connecting failed. Statement errors (bad SQL, constraints) say nothing about health
+        if context.connection is None or context.is_disconnect:
+            self.mark_down(replica)
+
+def replica_urls() -> list:
+    return [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+read_routing = ReadRouting(ReadSessionLocal, [create_db_engine(url) for url in replica_urls()])
+
+# --- Async twin (settings.DB_ASYNC) ---
+
+class AsyncDatabase(NamedTuple):
+    engine: object
+    sessions: async_sessionmaker
+    read_routing: ReadRouting
+
+@functools.lru_cache(maxsize=None)
+def async_database() -> AsyncDatabase:
+    """
+    The async engine, its session factories and replica routing, created on
+    first use by get_async_db/get_async_read_db. Only DB_ASYNC deployments
+    get these pools, or need an async driver (ASYNC_DRIVERS) at all.
+    """
+    async_engine = create_async_db_engine()
+    # expire_on_commit=False: an expired attribute would need lazy IO, which
+    # AsyncSession cannot do implicitly when the response is serialized
+    sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    read_sessions = async_sessionmaker(
+        async_engine.execution_options(**READ_ONLY), autoflush=False, expire_on_commit=False
+    )
+    routing = ReadRouting(read_sessions, [create_async_db_engine(url) for url in replica_urls()])
+    return AsyncDatabase(async_engine, sessions, routing)
+
+def replica_lag(db):
+    """REPLICA_MAX_LAG_SECONDS if db reads from a replica (what it returns may trail the primary), else None."""
+    return settings.REPLICA_MAX_LAG_SECONDS if db.info.get(_REPLICA) else None
+
 Base = declarative_base()
 
 # Dependency to get DB session
@@ -20,4 +280,39 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with async_database().sessions() as db:
+        yield db
+
+
+def get_read_db(request: Request):
+    """get_db for routes that only read: a replica when one is available (see ReadRouting)."""
+    replica = read_routing.choose(request.headers)
+    db = read_routing.session(replica)
+    if replica is not None:
+        try:
+            db.connection() # Connect up front, so a replica that is down costs a fallback rather than a 500
+        except exc.DBAPIError:
+            db.close()
+            read_routing.mark_down(replica)
+            db = read_routing.session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    routing = async_database().read_routing
+    replica = routing.choose(request.headers)
+    db = routing.session(replica)
+    if replica is not None:
+        try:
+            await db.connection()
+        except exc.DBAPIError:
+            await db.close()
+            routing.mark_down(replica)
+            db = routing.session()
+    async with db:
+        yield db
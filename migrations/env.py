@@ -13,6 +13,7 @@ if root_path not in sys.path:
 # 2. Import your Base and Models 
 # This ensures all tables (users, courses, enrollments) register with Base.metadata
 from database import Base
+from core.config import settings
 import models.models  
 
 # 3. Alembic Config
@@ -20,9 +21,18 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Migrate the same database the app uses (DATABASE_URL); '%' is escaped for configparser
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+
 # Set the metadata object for autogenerate
 target_metadata = Base.metadata
 
+def include_name(name, type_, parent_names):
+    """Skip the FTS5 search table (and its shadow tables); it is managed by DDL events, not the ORM."""
+    if type_ == "table" and name.startswith(models.models.COURSE_SEARCH_TABLE):
+        return False
+    return True
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     url = config.get_main_option("sqlalchemy.url")
@@ -31,6 +41,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -47,7 +58,8 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(
             connection=connection, 
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            include_name=include_name
         )
 
         with context.begin_transaction():
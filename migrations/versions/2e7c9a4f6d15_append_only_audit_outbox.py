@@ -0,0 +1,83 @@
+"""Append-only audit log with an outbox
+
+Revision ID: 2e7c9a4f6d15
+Revises: 9d3b6f1e4a27
+Create Date: 2026-10-17 18:55:12.904716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e7c9a4f6d15'
+down_revision: Union[str, Sequence[str], None] = '9d3b6f1e4a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('enrollment_audit') as batch_op:
+        batch_op.add_column(sa.Column('course_id', sa.Integer(), nullable=True))
+    # Older events only have the enrollment; its course is known while it still exists
+    op.execute(
+        "UPDATE enrollment_audit SET course_id = "
+        "(SELECT course_id FROM enrollments WHERE enrollments.id = enrollment_audit.enrollment_id)"
+    )
+    op.create_index('ix_enrollment_audit_course_id_timestamp', 'enrollment_audit', ['course_id', 'timestamp'], unique=False)
+
+    op.create_table(
+        'enrollment_audit_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('enrollment_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('course_id', sa.Integer(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # Append-only from here on (the same triggers models.py creates for create_all)
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS enrollment_audit_no_update BEFORE UPDATE ON enrollment_audit "
+            "BEGIN SELECT RAISE(ABORT, 'enrollment_audit is append-only'); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS enrollment_audit_no_delete BEFORE DELETE ON enrollment_audit "
+            "BEGIN SELECT RAISE(ABORT, 'enrollment_audit is append-only'); END"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE OR REPLACE FUNCTION enrollment_audit_append_only() RETURNS trigger AS $$ "
+            "BEGIN RAISE EXCEPTION 'enrollment_audit is append-only'; END $$ LANGUAGE plpgsql"
+        )
+        op.execute(
+            "CREATE TRIGGER enrollment_audit_append_only BEFORE UPDATE OR DELETE ON enrollment_audit "
+            "FOR EACH ROW EXECUTE FUNCTION enrollment_audit_append_only()"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS enrollment_audit_no_delete")
+        op.execute("DROP TRIGGER IF EXISTS enrollment_audit_no_update")
+    elif dialect == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS enrollment_audit_append_only ON enrollment_audit")
+        op.execute("DROP FUNCTION IF EXISTS enrollment_audit_append_only()")
+
+    # Events still waiting in the outbox would be lost with it
+    op.execute(
+        "INSERT INTO enrollment_audit (enrollment_id, action, user_id, course_id, timestamp) "
+        "SELECT enrollment_id, action, user_id, course_id, timestamp FROM enrollment_audit_outbox ORDER BY id"
+    )
+    op.drop_table('enrollment_audit_outbox')
+    op.drop_index('ix_enrollment_audit_course_id_timestamp', table_name='enrollment_audit')
+    with op.batch_alter_table('enrollment_audit') as batch_op:
+        batch_op.drop_column('course_id')
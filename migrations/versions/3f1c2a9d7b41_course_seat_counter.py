@@ -0,0 +1,47 @@
+"""Course seat counter and unique enrollments
+
+Revision ID: 3f1c2a9d7b41
+Revises: e8b0cd893b9d
+Create Date: 2026-10-17 09:12:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d7b41'
+down_revision: Union[str, Sequence[str], None] = 'e8b0cd893b9d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('courses') as batch_op:
+        batch_op.add_column(sa.Column('enrolled_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Drop duplicate seats (keeping the oldest) so the unique constraint can be created
+    op.execute(
+        "DELETE FROM enrollments WHERE id NOT IN ("
+        "SELECT MIN(id) FROM enrollments GROUP BY course_id, user_id)"
+    )
+    # Backfill the counter from the existing enrollments
+    op.execute(
+        "UPDATE courses SET enrolled_count = ("
+        "SELECT COUNT(*) FROM enrollments WHERE enrollments.course_id = courses.id)"
+    )
+
+    with op.batch_alter_table('enrollments') as batch_op:
+        batch_op.create_unique_constraint('uq_enrollments_course_user', ['course_id', 'user_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('enrollments') as batch_op:
+        batch_op.drop_constraint('uq_enrollments_course_user', type_='unique')
+
+    with op.batch_alter_table('courses') as batch_op:
+        batch_op.drop_column('enrolled_count')
@@ -0,0 +1,35 @@
+"""Course version and updated_at
+
+Revision ID: 5a9e2c7f1b38
+Revises: d4a8f3b2c917
+Create Date: 2026-10-17 16:02:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9e2c7f1b38'
+down_revision: Union[str, Sequence[str], None] = 'd4a8f3b2c917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('courses') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+
+    # Existing courses count as modified now; new rows get updated_at from the model
+    op.execute("UPDATE courses SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('courses') as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('version')
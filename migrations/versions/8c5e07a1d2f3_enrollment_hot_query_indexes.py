@@ -0,0 +1,40 @@
+"""Enrollment hot query indexes
+
+Revision ID: 8c5e07a1d2f3
+Revises: 3f1c2a9d7b41
+Create Date: 2026-10-17 10:03:27.160458
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c5e07a1d2f3'
+down_revision: Union[str, Sequence[str], None] = '3f1c2a9d7b41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (course_id, user_id) is already covered by the uq_enrollments_course_user
+    # unique constraint from 3f1c2a9d7b41; its index serves the course_id filters too.
+    op.create_index(op.f('ix_enrollments_user_id'), 'enrollments', ['user_id'], unique=False)
+    op.create_index(op.f('ix_enrollment_audit_enrollment_id'), 'enrollment_audit', ['enrollment_id'], unique=False)
+    op.create_index('ix_enrollment_audit_user_id_timestamp', 'enrollment_audit', ['user_id', 'timestamp'], unique=False)
+    op.create_index(
+        'ix_courses_active', 'courses', ['id'], unique=False,
+        sqlite_where=sa.text('is_active = 1'),
+        postgresql_where=sa.text('is_active = true'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_courses_active', table_name='courses')
+    op.drop_index('ix_enrollment_audit_user_id_timestamp', table_name='enrollment_audit')
+    op.drop_index(op.f('ix_enrollment_audit_enrollment_id'), table_name='enrollment_audit')
+    op.drop_index(op.f('ix_enrollments_user_id'), table_name='enrollments')
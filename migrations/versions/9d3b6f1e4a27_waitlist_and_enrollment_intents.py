@@ -0,0 +1,63 @@
+"""Waitlist and enrollment intents
+
+Revision ID: 9d3b6f1e4a27
+Revises: 5a9e2c7f1b38
+Create Date: 2026-10-17 17:41:09.552310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b6f1e4a27'
+down_revision: Union[str, Sequence[str], None] = '5a9e2c7f1b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'waitlist',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('course_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['course_id'], ['courses.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('course_id', 'user_id', name='uq_waitlist_course_user')
+    )
+    op.create_index('ix_waitlist_course_id_id', 'waitlist', ['course_id', 'id'], unique=False)
+    op.create_index(op.f('ix_waitlist_user_id'), 'waitlist', ['user_id'], unique=False)
+
+    op.create_table(
+        'enrollment_intents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('course_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), server_default='pending', nullable=False),
+        sa.Column('enrollment_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_enrollment_intents_user_id'), 'enrollment_intents', ['user_id'], unique=False)
+    op.create_index(
+        'ix_enrollment_intents_pending', 'enrollment_intents', ['id'], unique=False,
+        sqlite_where=sa.text("status = 'pending'"),
+        postgresql_where=sa.text("status = 'pending'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_enrollment_intents_pending', table_name='enrollment_intents')
+    op.drop_index(op.f('ix_enrollment_intents_user_id'), table_name='enrollment_intents')
+    op.drop_table('enrollment_intents')
+    op.drop_index(op.f('ix_waitlist_user_id'), table_name='waitlist')
+    op.drop_index('ix_waitlist_course_id_id', table_name='waitlist')
+    op.drop_table('waitlist')
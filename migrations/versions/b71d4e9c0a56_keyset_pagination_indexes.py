@@ -0,0 +1,34 @@
+"""Keyset pagination indexes
+
+Revision ID: b71d4e9c0a56
+Revises: 8c5e07a1d2f3
+Create Date: 2026-10-17 11:41:05.873112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71d4e9c0a56'
+down_revision: Union[str, Sequence[str], None] = '8c5e07a1d2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_courses_active_title', 'courses', ['title', 'id'], unique=False,
+        sqlite_where=sa.text('is_active = 1'),
+        postgresql_where=sa.text('is_active = true'),
+    )
+    op.create_index('ix_enrollments_course_id_id', 'enrollments', ['course_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_enrollments_course_id_id', table_name='enrollments')
+    op.drop_index('ix_courses_active_title', table_name='courses')
@@ -0,0 +1,33 @@
+"""Drop waitlist entries of students already enrolled in the course
+
+Revision ID: c4f2a8e61d05
+Revises: 5b8e1d3c7a92
+Create Date: 2026-10-18 16:40:12.093417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f2a8e61d05'
+down_revision: Union[str, Sequence[str], None] = '5b8e1d3c7a92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Enrolling now removes the student's waitlist entry; clear the ones left behind before
+    op.execute(
+        "DELETE FROM waitlist WHERE EXISTS ("
+        "SELECT 1 FROM enrollments WHERE enrollments.course_id = waitlist.course_id "
+        "AND enrollments.user_id = waitlist.user_id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass # The deleted entries were stale
@@ -0,0 +1,48 @@
+"""Course full-text search index
+
+Revision ID: d4a8f3b2c917
+Revises: b71d4e9c0a56
+Create Date: 2026-10-17 13:26:51.402377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8f3b2c917'
+down_revision: Union[str, Sequence[str], None] = 'b71d4e9c0a56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS course_search "
+            "USING fts5(title, code, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        # The index only holds listable courses: active and not soft-deleted
+        op.execute(
+            "INSERT INTO course_search (rowid, title, code) "
+            "SELECT id, coalesce(title, ''), coalesce(code, '') FROM courses "
+            "WHERE is_active = 1 AND deleted_at IS NULL"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_courses_search_tsv ON courses USING gin "
+            "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(code, '')))"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS course_search")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_courses_search_tsv")
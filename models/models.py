@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, DDL, Index, LargeBinary, Text, UniqueConstraint, event, literal_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base # Base is initialized in database.py
@@ -22,13 +22,70 @@ class Course(Base):
     capacity = Column(Integer)
     is_active = Column(Boolean, default=True)
     deleted_at = Column(DateTime, nullable=True)
+    # Maintained by crud.enroll_student / the drop helpers with conditional UPDATEs,
+    # so capacity checks never need a count() over enrollments
+    enrolled_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Every UPDATE of the row (admin edits and seat changes alike, ORM or Core)
+    # bumps version and updated_at through these onupdate defaults. The course's
+    # ETag and Last-Modified are derived from them (see services/course_cache.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version + 1"))
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
     
     enrollments = relationship("Enrollment", back_populates="course")
 
+    @property
+    def seats_remaining(self):
+        return max((self.capacity or 0) - (self.enrolled_count or 0), 0)
+
+# Partial indexes for the public catalog: crud.get_courses only ever lists active
+# courses, keyed by id or by (title, id) when sorting by title
+Index(
+    "ix_courses_active",
+    Course.id,
+    sqlite_where=Course.is_active == True,
+    postgresql_where=Course.is_active == True,
+)
+Index(
+    "ix_courses_active_title",
+    Course.title,
+    Course.id,
+    sqlite_where=Course.is_active == True,
+    postgresql_where=Course.is_active == True,
+)
+
+# Full-text search structures for the course catalog (see services/search.py).
+# They are not mapped tables, so they are created alongside "courses" by DDL events.
+COURSE_SEARCH_TABLE = "course_search"
+
+# SQLite: an FTS5 table keyed by course id, with prefix indexes for search-as-you-type
+event.listen(Course.__table__, "after_create", DDL(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {COURSE_SEARCH_TABLE} "
+    "USING fts5(title, code, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+).execute_if(dialect="sqlite"))
+event.listen(Course.__table__, "before_drop", DDL(
+    f"DROP TABLE IF EXISTS {COURSE_SEARCH_TABLE}"
+).execute_if(dialect="sqlite"))
+
+# Postgres: a GIN index over the same tsvector expression the search backend queries
+event.listen(Course.__table__, "after_create", DDL(
+    "CREATE INDEX IF NOT EXISTS ix_courses_search_tsv ON courses USING gin "
+    "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(code, '')))"
+).execute_if(dialect="postgresql"))
+
 class Enrollment(Base):
     __tablename__ = "enrollments"
+    __table_args__ = (
+        # A student can hold at most one seat per course
+        UniqueConstraint("course_id", "user_id", name="uq_enrollments_course_user"),
+        # Keyset pages of a course's roster
+        Index("ix_enrollments_course_id_id", "course_id", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     course_id = Column(Integer, ForeignKey("courses.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -36,12 +93,99 @@ class Enrollment(Base):
     course = relationship("Course", back_populates="enrollments")
 
 class EnrollmentAudit(Base):
+    """
+    Append-only log of enrollment events (see services/audit.py). Rows arrive
+    from AuditOutbox in batches and are never updated or deleted; the
+    database enforces that with triggers on SQLite and Postgres.
+    """
     __tablename__ = "enrollment_audit"
+    __table_args__ = (
+        # Per-student and per-course history
+        Index("ix_enrollment_audit_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_enrollment_audit_course_id_timestamp", "course_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    enrollment_id = Column(Integer, nullable=False)
-    action = Column(String, nullable=False) # e.g., "ENROLLED" or "DROPPED"
+    enrollment_id = Column(Integer, nullable=False, index=True)
+    action = Column(String, nullable=False) # "ENROLLED", "DROPPED" or "ADMIN_REMOVED"
     user_id = Column(Integer, nullable=False)
+    course_id = Column(Integer, nullable=True) # Unknown for events logged before it was recorded
 
     # Using a lambda for timezone-aware UTC time
-    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+class AuditOutbox(Base):
+    """
+    Audit events committed with the change they describe, waiting to be moved
+    into enrollment_audit. Deliberately without secondary indexes, so writing
+    one costs the enrollment hot path a single cheap insert.
+    """
+    __tablename__ = "enrollment_audit_outbox"
+    id = Column(Integer, primary_key=True)
+    enrollment_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    course_id = Column(Integer, nullable=True)
+    timestamp = Column(DateTime, nullable=False)
+
+# Append-only: reject UPDATE and DELETE on audit rows inside the database
+event.listen(EnrollmentAudit.__table__, "after_create", DDL(
+    "CREATE TRIGGER IF NOT EXISTS enrollment_audit_no_update BEFORE UPDATE ON enrollment_audit "
+    "BEGIN SELECT RAISE(ABORT, 'enrollment_audit is append-only'); END"
+).execute_if(dialect="sqlite"))
+event.listen(EnrollmentAudit.__table__, "after_create", DDL(
+    "CREATE TRIGGER IF NOT EXISTS enrollment_audit_no_delete BEFORE DELETE ON enrollment_audit "
+    "BEGIN SELECT RAISE(ABORT, 'enrollment_audit is append-only'); END"
+).execute_if(dialect="sqlite"))
+event.listen(EnrollmentAudit.__table__, "after_create", DDL(
+    "CREATE OR REPLACE FUNCTION enrollment_audit_append_only() RETURNS trigger AS $$ "
+    "BEGIN RAISE EXCEPTION 'enrollment_audit is append-only'; END $$ LANGUAGE plpgsql; "
+    "CREATE TRIGGER enrollment_audit_append_only BEFORE UPDATE OR DELETE ON enrollment_audit "
+    "FOR EACH ROW EXECUTE FUNCTION enrollment_audit_append_only()"
+).execute_if(dialect="postgresql"))
+
+class Waitlist(Base):
+    __tablename__ = "waitlist"
+    __table_args__ = (
+        UniqueConstraint("course_id", "user_id", name="uq_waitlist_course_user"),
+        # Promotion takes the oldest entry of a course first
+        Index("ix_waitlist_course_id_id", "course_id", "id"),
+    )
+    id = Column(Integer, primary_key=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class EnrollmentIntent(Base):
+    """An enrollment request accepted by the admission queue, and its outcome once applied."""
+    __tablename__ = "enrollment_intents"
+    id = Column(Integer, primary_key=True)
+    course_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False, index=True)
+    # "pending" until the admission worker applies it, then a BulkEnrollmentStatus or "waitlisted"
+    status = Column(String, nullable=False, default="pending", server_default="pending")
+    enrollment_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+# The worker only ever scans pending intents, oldest first
+Index(
+    "ix_enrollment_intents_pending",
+    EnrollmentIntent.id,
+    sqlite_where=EnrollmentIntent.status == "pending",
+    postgresql_where=EnrollmentIntent.status == "pending",
+)
+
+class IdempotencyKey(Base):
+    """
+    A POST sent with an Idempotency-Key, when IDEMPOTENCY_PERSIST is on (see
+    services/idempotency.py): pending while the first request runs, then its
+    response, replayed to retries for IDEMPOTENCY_TTL_SECONDS after created_at.
+    """
+    __tablename__ = "idempotency_keys"
+    key = Column(String, primary_key=True) # Route, user and the client's key
+    fingerprint = Column(String, nullable=False) # Of the request the response belongs to
+    status_code = Column(Integer, nullable=True) # NULL while the request is still running
+    headers = Column(Text, nullable=True) # JSON list of [name, value]
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,38 @@
+"""
+Copies the SQLite database into read replica files, for trying out replica
+routing locally.
+
+    python replicate.py replica1.db replica2.db
+    DATABASE_REPLICA_URLS="sqlite:///file:replica1.db?mode=ro&uri=true,sqlite:///file:replica2.db?mode=ro&uri=true" uvicorn app:app
+
+Each copy is a consistent snapshot taken with SQLite's online backup, so the
+app can keep writing meanwhile. The replicas then lag until the next run:
+rerun it (by hand, or from cron every few seconds) to catch them up.
+"""
+import sqlite3
+import sys
+from sqlalchemy.engine import make_url
+from database import SQLALCHEMY_DATABASE_URL
+
+
+def replicate(targets: list, url: str = SQLALCHEMY_DATABASE_URL):
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite" or not url.database:
+        raise SystemExit("replicate.py copies SQLite files; server databases have their own replication")
+    source = sqlite3.connect(url.database)
+    try:
+        for target in targets:
+            replica = sqlite3.connect(target)
+            try:
+                source.backup(replica)
+            finally:
+                replica.close()
+            print(f"Copied {url.database} to {target}")
+    finally:
+        source.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit(__doc__)
+    replicate(sys.argv[1:])
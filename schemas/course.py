@@ -13,6 +13,8 @@ class CourseCreate(CourseBase):
 
 class CourseOut(CourseBase):
     id: int
+    enrolled_count: int = 0
+    seats_remaining: int = 0
 
     model_config = ConfigDict(from_attributes = True)
 
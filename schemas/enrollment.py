@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal, Optional, Union
 from pydantic import BaseModel, ConfigDict
 
 
@@ -12,3 +13,53 @@ class EnrollmentOut(BaseModel):
     created_at: datetime
 
     model_config = ConfigDict(from_attributes = True)
+
+
+# --- Bulk enrollment (admin) ---
+
+class BulkEnrollmentItem(BaseModel):
+    user_id: int
+    course_id: int
+
+BulkEnrollmentStatus = Literal[
+    "enrolled",
+    "already_enrolled",
+    "course_not_found",
+    "course_inactive",
+    "course_full",
+    "user_not_found",
+    "not_a_student",
+    "invalid_row",
+]
+
+class BulkEnrollmentResult(BaseModel):
+    row: int # 1-based position in the request (CSV: data row, header excluded)
+    user_id: Optional[int] = None
+    course_id: Optional[int] = None
+    status: BulkEnrollmentStatus
+    enrollment_id: Optional[int] = None
+
+class BulkEnrollmentOut(BaseModel):
+    enrolled: int
+    failed: int
+    results: list[BulkEnrollmentResult]
+
+
+# --- Waitlist and admission queue ---
+
+class WaitlistOut(BaseModel):
+    course_id: int
+    status: Literal["waitlisted", "enrolled"] # Enrolled at once when a seat was free
+    position: Optional[int] = None # 1 = next in line
+    enrollment_id: Optional[int] = None
+
+class EnrollmentIntentOut(BaseModel):
+    id: int
+    course_id: int
+    # "pending" until the admission worker applies it
+    status: Union[Literal["pending", "waitlisted"], BulkEnrollmentStatus]
+    enrollment_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    processed_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes = True)
@@ -1,29 +1,241 @@
-from sqlalchemy.orm import Session
-from database import SessionLocal, engine
-import models.models as models
-
-def seed_data():
-    models.Base.metadata.create_all(bind=engine)
-    db = SessionLocal()
-    # Check if we already have courses
-    if db.query(models.Course).count() > 0:
-        print("Database already has data. Skipping seed.")
-        return
-
-    print("Seeding 20 demo courses...")
-    for i in range(1, 21):
-        course = models.Course(
-            title=f"Advanced Python {i}01",
-            code=f"PY{100 + i}",
-            capacity=10 + i,
-            is_active=True,
-            deleted_at=None  # Matches your model's column name
+"""
+Generates a deterministic synthetic dataset, from a demo catalog up to production-sized tables.
+
+    python seed.py
+    python seed.py --users 2000000 --courses 20000 --reset
+    DATABASE_URL=sqlite:///./big.db python seed.py --users 5000000 --courses 50000 --seed 7
+
+The same --seed gives the same rows every time. Course popularity follows
+a Zipf curve, so a handful of hot courses hold most enrollments:
+
+  hot courses     the most popular HOT_SHARE of the catalog, filled to capacity
+  full courses    another FULL_SHARE, also at capacity; the rest have free seats
+  inactive        INACTIVE_SHARE closed courses, and DELETED_SHARE soft-deleted
+                  ones; both keep their (fewer) historical enrollments
+  audit history   an ENROLLED event per enrollment, plus enrollments that were
+                  dropped (DROP_RATE) or removed by an admin (REMOVE_RATE)
+
+Each student takes 0 to 2 * --enrollments-per-user courses. Every account
+shares SEED_PASSWORD, hashed once at BCRYPT_ROUNDS, so seeding is bound by
+the inserts rather than by bcrypt; sign in as admin@seed.example to manage
+the catalog.
+
+Rows go in through Core executemany in transactions of --batch-size rows.
+Non-unique indexes are dropped for the load and rebuilt afterwards, and on
+SQLite the load runs with synchronous=OFF and a large page cache. The tables
+must be empty: --reset drops and recreates them first.
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import bindparam, func, insert, select, text, update
+from core.security import get_password_hash
+from database import Base, SQLALCHEMY_DATABASE_URL, create_db_engine
+from models import models
+
+SEED_PASSWORD = "password123"
+ADMIN_EMAIL = "admin@seed.example"
+
+HOT_SHARE = 0.01
+FULL_SHARE = 0.15
+INACTIVE_SHARE = 0.05
+DELETED_SHARE = 0.02
+DROP_RATE = 0.08
+REMOVE_RATE = 0.01
+ZIPF_EXPONENT = 1.1
+INACTIVE_WEIGHT = 0.1 # Closed and deleted courses drew fewer students
+# Enrollments happen during a two-week registration window
+REGISTRATION_OPENS = datetime(2026, 1, 12, 8, tzinfo=timezone.utc)
+REGISTRATION_SECONDS = 14 * 24 * 3600
+
+SUBJECTS = [
+    "Algebra", "Anthropology", "Architecture", "Astronomy", "Biology", "Calculus", "Chemistry",
+    "Databases", "Design", "Economics", "Ethics", "Finance", "Genetics", "Geography", "History",
+    "Linguistics", "Literature", "Music", "Networks", "Philosophy", "Physics", "Psychology",
+    "Python", "Robotics", "Sociology", "Statistics", "Systems", "Theatre",
+]
+LEVELS = ["Introduction to", "Foundations of", "Applied", "Advanced", "Topics in", "Seminar in"]
+
+SQLITE_LOAD_PRAGMAS = ("PRAGMA synchronous=OFF", "PRAGMA cache_size=-262144", "PRAGMA temp_store=MEMORY")
+LOADED_TABLES = (models.User, models.Course, models.Enrollment, models.EnrollmentAudit)
+
+
+class Loader:
+    """Inserts rows per table in executemany batches, a transaction each, and times them."""
+
+    def __init__(self, engine, batch_size: int):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.pending = {}
+        self.rows = dict.fromkeys((model.__tablename__ for model in LOADED_TABLES), 0)
+        self.started = time.perf_counter()
+
+    def add(self, model, row: dict):
+        batch = self.pending.setdefault(model, [])
+        batch.append(row)
+        if len(batch) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model=None):
+        for flushed in ([model] if model else list(self.pending)):
+            batch = self.pending.pop(flushed, None)
+            if batch:
+                with self.engine.begin() as conn:
+                    _load_pragmas(conn)
+                    conn.execute(insert(flushed.__table__), batch)
+                self.rows[flushed.__tablename__] += len(batch)
+
+    def report(self, label: str):
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.rows.values())
+        counts = ", ".join(f"{rows:,} {table}" for table, rows in self.rows.items())
+        print(f"{label}: {counts} in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+def _load_pragmas(conn):
+    if conn.dialect.name == "sqlite":
+        for pragma in SQLITE_LOAD_PRAGMAS:
+            conn.exec_driver_sql(pragma)
+
+
+def _secondary_indexes():
+    # Unique indexes stay: they are what keeps the generated data honest
+    return [index for model in LOADED_TABLES for index in model.__table__.indexes if not index.unique]
+
+
+def plan_courses(rng: random.Random, courses: int):
+    """Status and popularity weight per course id: the ids are shuffled before ranking."""
+    ranked = list(range(1, courses + 1))
+    rng.shuffle(ranked)
+    weights = [0.0] * (courses + 1)
+    status = ["open"] * (courses + 1)
+    hot = max(1, int(courses * HOT_SHARE))
+    for rank, course_id in enumerate(ranked, start=1):
+        weights[course_id] = 1 / rank ** ZIPF_EXPONENT
+        roll = rng.random()
+        if rank <= hot:
+            status[course_id] = "hot"
+        elif roll < DELETED_SHARE:
+            status[course_id] = "deleted"
+        elif roll < DELETED_SHARE + INACTIVE_SHARE:
+            status[course_id] = "inactive"
+        elif roll < DELETED_SHARE + INACTIVE_SHARE + FULL_SHARE:
+            status[course_id] = "full"
+        if status[course_id] in ("deleted", "inactive"):
+            weights[course_id] *= INACTIVE_WEIGHT
+    return status, list(itertools.accumulate(weights[1:]))
+
+
+def seed(url: str, users: int, courses: int, enrollments_per_user: float, seed: int = 42, batch_size: int = 100_000, reset: bool = False):
+    rng = random.Random(seed)
+    engine = create_db_engine(url)
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        if any(conn.scalar(select(func.count()).select_from(model.__table__)) for model in LOADED_TABLES):
+            print("Database already has data. Pass --reset to replace it.")
+            engine.dispose()
+            return
+        for index in _secondary_indexes():
+            index.drop(conn)
+        conn.commit()
+
+    loader = Loader(engine, batch_size)
+    hashed = get_password_hash(SEED_PASSWORD)
+    admin_id = users + 1
+    for user_id in range(1, users + 1):
+        loader.add(models.User, {
+            "id": user_id, "name": f"Student {user_id}", "email": f"student{user_id}@seed.example",
+            "hashed_password": hashed, "role": "student", "is_active": True,
+        })
+    loader.add(models.User, {
+        "id": admin_id, "name": "Registrar", "email": ADMIN_EMAIL,
+        "hashed_password": hashed, "role": "admin", "is_active": True,
+    })
+    loader.flush()
+    loader.report("Users")
+
+    # Courses go in before their enrollments (foreign keys); seat counts follow at the end
+    status, cumulative = plan_courses(rng, courses)
+    created = REGISTRATION_OPENS - timedelta(days=60)
+    for course_id in range(1, courses + 1):
+        loader.add(models.Course, {
+            "id": course_id, "title": f"{rng.choice(LEVELS)} {rng.choice(SUBJECTS)} {course_id}",
+            "code": f"C{course_id:06d}", "capacity": 0, "enrolled_count": 0,
+            "is_active": status[course_id] != "inactive",
+            "deleted_at": created + timedelta(days=30) if status[course_id] == "deleted" else None,
+            "version": 1, "updated_at": created,
+        })
+    loader.flush()
+    loader.report("Courses")
+
+    enrolled = [0] * (courses + 1)
+    enrollment_ids = itertools.count(1)
+    max_picks = min(courses, round(2 * enrollments_per_user))
+    course_ids = range(1, courses + 1)
+    for user_id in range(1, users + 1):
+        picks = set(rng.choices(course_ids, cum_weights=cumulative, k=rng.randint(0, max_picks)))
+        for course_id in sorted(picks):
+            enrollment_id = next(enrollment_ids)
+            at = REGISTRATION_OPENS + timedelta(seconds=rng.randrange(REGISTRATION_SECONDS))
+            event = {"enrollment_id": enrollment_id, "user_id": user_id, "course_id": course_id}
+            loader.add(models.EnrollmentAudit, {**event, "action": "ENROLLED", "timestamp": at})
+            roll = rng.random()
+            if roll < DROP_RATE + REMOVE_RATE:
+                action = "DROPPED" if roll < DROP_RATE else "ADMIN_REMOVED"
+                later = at + timedelta(seconds=rng.randrange(REGISTRATION_SECONDS))
+                loader.add(models.EnrollmentAudit, {**event, "action": action, "timestamp": later})
+                continue
+            enrolled[course_id] += 1
+            loader.add(models.Enrollment, {"id": enrollment_id, "user_id": user_id, "course_id": course_id, "created_at": at})
+    loader.flush()
+    loader.report("Enrollments")
+
+    seats = []
+    for course_id in course_ids:
+        taken = enrolled[course_id]
+        at_capacity = status[course_id] in ("hot", "full")
+        capacity = max(taken, 1) if at_capacity else taken + rng.randint(5, 60)
+        seats.append({"b_id": course_id, "b_capacity": capacity, "b_enrolled": taken})
+    courses_table = models.Course.__table__
+    with engine.begin() as conn:
+        _load_pragmas(conn)
+        conn.execute(
+            update(courses_table)
+            .where(courses_table.c.id == bindparam("b_id"))
+            # version and updated_at are pinned so the update does not look like an edit
+            .values(capacity=bindparam("b_capacity"), enrolled_count=bindparam("b_enrolled"), version=1, updated_at=created),
+            seats
         )
-        db.add(course)
-    
-    db.commit()
-    print("Seeding complete! Run your server and check /courses?limit=5")
-    db.close()
+        if conn.dialect.name == "sqlite":
+            conn.execute(text(
+                f"INSERT INTO {models.COURSE_SEARCH_TABLE} (rowid, title, code) "
+                "SELECT id, title, code FROM courses WHERE is_active AND deleted_at IS NULL"
+            ))
+        for index in _secondary_indexes():
+            index.create(conn)
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+    loader.report("Seat counts, search index and secondary indexes")
+    engine.dispose()
+    print(f"Sign in as {ADMIN_EMAIL} or student1@seed.example with password {SEED_PASSWORD!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1000, help="Students to create (plus one admin)")
+    parser.add_argument("--courses", type=int, default=20)
+    parser.add_argument("--enrollments-per-user", type=float, default=3, help="Average courses per student")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=100_000, help="Rows per INSERT and transaction")
+    parser.add_argument("--url", default=SQLALCHEMY_DATABASE_URL)
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate the tables first")
+    args = parser.parse_args()
+    seed(args.url, args.users, args.courses, args.enrollments_per_user, args.seed, args.batch_size, args.reset)
+
 
 if __name__ == "__main__":
-    seed_data()
\ No newline at end of file
+    main()
@@ -0,0 +1,91 @@
+"""
+Admission queue for registration day (settings.ADMISSION_QUEUE_ENABLED).
+
+When a popular course opens, thousands of POST /enrollments contend for the
+same course row and most of them end in "Course is full" after doing all the
+work. In queue mode students POST /enrollments/intents instead: the intent is
+stored and acknowledged with 202 straight away, and the worker below applies
+pending intents oldest first, ADMISSION_QUEUE_BATCH_SIZE at a time, through
+crud.apply_enrollment_intents. Each batch is one set-based transaction (the
+bulk enrollment path), seats go to the earliest requests, and whoever finds
+the course full joins its waitlist in arrival order.
+
+Students poll GET /enrollments/intents/{id}; with ?wait= the request blocks
+until the worker publishes the intent's outcome on `outcomes` (or the wait
+runs out). The worker wakes as soon as an intent is stored in this process,
+and otherwise re-checks every ADMISSION_QUEUE_POLL_SECONDS, which also picks
+up intents stored by other processes.
+"""
+import asyncio
+import contextlib
+import logging
+from fastapi.concurrency import run_in_threadpool
+from core.config import settings
+from database import SessionLocal
+from services.seat_events import LocalBroker
+import crud
+
+logger = logging.getLogger(__name__)
+
+# Intent outcomes, keyed by intent id. Each intent has a single outcome, published as version 1
+outcomes = LocalBroker(
+    max_subscribers=settings.ADMISSION_QUEUE_MAX_WAITERS,
+    overflow_detail="Too many requests waiting for outcomes; poll without ?wait="
+)
+
+
+class AdmissionWorker:
+    """Applies pending enrollment intents in FIFO batches on a background task."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def notify(self):
+        """Wakes the worker after an intent is stored; safe from any thread."""
+        if self._task is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while True:
+            with contextlib.suppress(TimeoutError):
+                async with asyncio.timeout(settings.ADMISSION_QUEUE_POLL_SECONDS):
+                    await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                await self.drain()
+            except Exception:
+                # Keep serving the queue; the batch stays pending and is retried on the next pass
+                logger.exception("Admission queue batch failed")
+
+    async def drain(self) -> int:
+        """Applies batches until nothing is pending; returns how many intents were applied."""
+        applied = 0
+        while True:
+            results = await run_in_threadpool(self._apply_batch)
+            for result in results:
+                outcomes.publish(result["row"], {"version": 1, "status": result["status"]})
+            applied += len(results)
+            if len(results) < settings.ADMISSION_QUEUE_BATCH_SIZE:
+                return applied
+
+    def _apply_batch(self) -> list:
+        with self.session_factory() as db:
+            return crud.apply_enrollment_intents(db, settings.ADMISSION_QUEUE_BATCH_SIZE)
+
+
+worker = AdmissionWorker()
@@ -0,0 +1,113 @@
+"""
+Enrollment audit trail: an append-only event log in enrollment_audit.
+
+The crud writers call record() for every ENROLLED, DROPPED and ADMIN_REMOVED
+event. Nothing is sent to the database then: events are buffered on the
+session and written to the outbox table (models.AuditOutbox) in one
+executemany just before the session commits. They therefore commit or roll
+back together with the change they describe, so no event is lost or logged
+for a change that did not happen, and the hot path pays one insert into an
+unindexed table per transaction. Bulk loads write their events straight into
+the outbox with INSERT ... SELECT.
+
+AuditRelay then moves outbox rows into enrollment_audit in batches of
+AUDIT_RELAY_BATCH_SIZE (crud.relay_audit_outbox), where the per-user and
+per-course history indexes are maintained. History readers relay what is
+left before reading (see crud.export_audit_log), so they never miss events.
+"""
+import asyncio
+import contextlib
+import logging
+from datetime import datetime, timezone
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from core.config import settings
+from database import SessionLocal
+from models import models
+import crud
+
+logger = logging.getLogger(__name__)
+
+ENROLLED = "ENROLLED"
+DROPPED = "DROPPED"
+ADMIN_REMOVED = "ADMIN_REMOVED"
+ACTIONS = (ENROLLED, DROPPED, ADMIN_REMOVED)
+
+_BUFFER = "audit_events" # Session.info key of the events recorded in the current transaction
+
+
+def record(db, action: str, enrollment_id: int, user_id: int, course_id: int):
+    """Queues an audit event on db (a Session or AsyncSession); it is written when db commits."""
+    db.info.setdefault(_BUFFER, []).append({
+        "enrollment_id": enrollment_id,
+        "action": action,
+        "user_id": user_id,
+        "course_id": course_id,
+        "timestamp": datetime.now(timezone.utc),
+    })
+
+@contextlib.contextmanager
+def savepoint(db: Session):
+    """db.begin_nested(), discarding the audit events recorded inside it if it rolls back."""
+    events = db.info.setdefault(_BUFFER, [])
+    recorded = len(events)
+    try:
+        with db.begin_nested():
+            yield
+    except BaseException:
+        del events[recorded:]
+        raise
+
+@event.listens_for(Session, "before_commit")
+def _write_outbox(session):
+    # Also fires for AsyncSession, whose commit runs the sync Session's
+    events = session.info.pop(_BUFFER, None)
+    if events:
+        session.execute(insert(models.AuditOutbox.__table__), events)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_buffer(session, transaction):
+    # Events of a transaction that was rolled back (or closed without committing)
+    if transaction.parent is None:
+        session.info.pop(_BUFFER, None)
+
+
+class AuditRelay:
+    """Moves committed outbox events into enrollment_audit every AUDIT_RELAY_INTERVAL_SECONDS."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+            # Events are durable in the outbox either way; this just leaves it empty
+            await self.drain()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.AUDIT_RELAY_INTERVAL_SECONDS)
+            try:
+                await self.drain()
+            except Exception:
+                # The events stay in the outbox and are relayed on the next pass
+                logger.exception("Audit outbox relay failed")
+
+    async def drain(self) -> int:
+        """Relays batches until the outbox is empty; returns how many events were moved."""
+        return await run_in_threadpool(self._relay_all)
+
+    def _relay_all(self) -> int:
+        with self.session_factory() as db:
+            return crud.relay_all_audit_events(db)
+
+
+relay = AuditRelay()
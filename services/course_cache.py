@@ -0,0 +1,129 @@
+"""
+Read-through response cache for the public course catalog.
+
+GET /courses/ and GET /courses/{id} are read far more often than courses
+change, so the JSON they return is cached as bytes and served without a
+query or a CourseOut validation. Listings are keyed by their query (skip or
+cursor, limit, sort, search) under the catalog version; a course's detail is
+keyed by its id under that course's own version.
+
+Every CourseOut carries enrolled_count and seats_remaining, so seat changes
+count as writes too. The crud writers call invalidate() after they commit:
+admin course edits, enrollments and drops bump the course's version and the
+catalog version, and the next read repopulates. A read from a replica may
+predate the version it is stored under, so the routes pass its lag
+(database.replica_lag) as the entry's TTL, and such entries are marked:
+clients pinned to the primary after their own writes (core.read_your_writes)
+skip them, or they would be served the replica's view of their write.
+"""
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from core import read_your_writes
+from core.cache import VersionedCache, shared_store
+from core.config import settings
+from core.serialization import ModelList
+from schemas.course import CourseOut
+
+CATALOG = "catalog"
+# First line of entries built from a replica read; internal, never sent
+_FROM_REPLICA = "From-Replica"
+
+cache = VersionedCache(
+    "courses",
+    maxsize=settings.COURSE_CACHE_MAX_ENTRIES,
+    ttl=settings.COURSE_CACHE_TTL_SECONDS,
+    shared=shared_store(settings.COURSE_CACHE_URL)
+)
+
+_course_list = ModelList(CourseOut)
+
+def catalog_version() -> int:
+    return cache.version(CATALOG)
+
+def course_version(course_id: int) -> int:
+    return cache.version(f"course:{course_id}")
+
+def invalidate(*course_ids: int):
+    """Call after committing a change to these courses (or with none, after adding one)."""
+    cache.bump(*(f"course:{course_id}" for course_id in course_ids), CATALOG)
+
+def lookup(request: Request, key: str, version: int):
+    """The cached entry, unless it was built from a replica and the client is pinned to the primary."""
+    entry = cache.get(key, version)
+    if entry is not None and entry.startswith(_FROM_REPLICA.encode()) and read_your_writes.is_pinned(request.headers):
+        return None
+    return entry
+
+def listing_key(skip, limit, search, cursor, sort) -> str:
+    return f"list:{skip}:{limit}:{sort}:{cursor}:{search}"
+
+def course_key(course_id: int) -> str:
+    return f"course:{course_id}"
+
+# An entry is laid out like an HTTP message: "Name: value" header lines, a blank line, then the JSON body
+
+def _entry(headers: dict, body: bytes, ttl: float = None) -> bytes:
+    if ttl is not None:
+        headers = {_FROM_REPLICA: "true", **headers}
+    return "".join(f"{name}: {value}\n" for name, value in headers.items()).encode() + b"\n" + body
+
+def _parse(entry: bytes):
+    head, _, body = entry.partition(b"\n\n")
+    headers = dict(line.split(": ", 1) for line in head.decode().split("\n"))
+    return headers, body
+
+def store_listing(key: str, version: int, courses, next_cursor: str = None, ttl: float = None) -> bytes:
+    body = _course_list.dump_json(courses) # Courses, or Rows of crud.COURSE_OUT_COLUMNS
+    headers = {"ETag": f'"{hashlib.blake2b(body + (next_cursor or "").encode(), digest_size=16).hexdigest()}"'}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    entry = _entry(headers, body, ttl)
+    cache.set(key, version, entry, ttl)
+    return entry
+
+def store_course(course_id: int, version: int, course, ttl: float = None) -> bytes:
+    headers = {"ETag": f'"course-{course.id}-{course.version}"'}
+    updated_at = course.updated_at
+    if updated_at is not None:
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc) # SQLite hands back naive UTC
+        headers["Last-Modified"] = format_datetime(updated_at.astimezone(timezone.utc), usegmt=True)
+    entry = _entry(headers, CourseOut.model_validate(course).model_dump_json().encode(), ttl)
+    cache.set(course_key(course_id), version, entry, ttl)
+    return entry
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: a W/ prefix does not matter
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def _not_modified_since(if_modified_since: str, last_modified: str) -> bool:
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False # An unparsable date is ignored
+
+def respond(request: Request, entry: bytes, cache_control: str) -> Response:
+    """The entry as a 200, or a 304 when the request's validators still match it."""
+    headers, body = _parse(entry)
+    headers.pop(_FROM_REPLICA, None)
+    headers["Cache-Control"] = cache_control
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, headers["ETag"])
+    else:
+        # Second granularity, so only consulted when the client sent no ETag
+        if_modified_since = request.headers.get("if-modified-since")
+        last_modified = headers.get("Last-Modified")
+        not_modified = bool(if_modified_since and last_modified) and _not_modified_since(if_modified_since, last_modified)
+
+    if not_modified:
+        headers.pop("X-Next-Cursor", None)
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+def stats() -> dict:
+    return cache.stats()
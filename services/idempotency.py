@@ -0,0 +1,288 @@
+"""
+Idempotency-Key for POST /enrollments and POST /auth/register
+(settings.IDEMPOTENCY_ENABLED).
+
+Clients on flaky networks retry POSTs whose response they never received.
+Without a key the retry runs again and the student is told "Already
+enrolled" or "Email already registered" instead of what actually happened.
+A client that sends Idempotency-Key: <unique value> with one of these POSTs
+gets the original response back for every retry with the same key, for
+IDEMPOTENCY_TTL_SECONDS, marked with Idempotent-Replayed: true.
+
+IdempotencyMiddleware is pure ASGI, so it sees the raw request body and the
+serialized response. Each request is keyed by route, user (the verified id
+in the bearer token or, for anonymous registrations, a digest of the email
+being registered) and the client's key, and fingerprinted by method, path
+and body:
+
+- a stored response is replayed without running the route, so a replay
+  never touches the enrollment tables; the same key sent with a different
+  request is answered 422
+- a retry arriving while the original is still running waits for its
+  response (up to IDEMPOTENCY_WAIT_SECONDS, then 409 with Retry-After)
+  instead of racing it into a second enrollment attempt
+- 5xx and 429 responses are not stored: the request did not take effect, and
+  the next retry runs it again
+
+Responses are kept in an in-process LRU of IDEMPOTENCY_MAX_ENTRIES. With
+IDEMPOTENCY_PERSIST they also go to the idempotency_keys table, where the
+pending row written before the route runs is the lock shared by all worker
+processes: a worker finding another worker's pending row polls it until the
+response lands.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+from jose import JWTError, jwt
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from core.cache import TTLCache
+from core.config import settings
+from database import SessionLocal
+import crud
+
+logger = logging.getLogger(__name__)
+
+ROUTES = {("POST", "/enrollments"), ("POST", "/auth/register")}
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+# A pending row older than this belongs to a worker that died mid-request
+ABANDONED_SECONDS = 300
+PURGE_EVERY = 1000 # Persistent claims between purges of expired rows
+_POLL_SECONDS = 0.05
+
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status: int
+    headers: list # [(name, value)] as bytes, like ASGI
+    body: bytes
+
+
+class _Reject(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int = None):
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    def response(self):
+        headers = {"Retry-After": str(self.retry_after)} if self.retry_after else None
+        return JSONResponse({"detail": self.detail}, status_code=self.status_code, headers=headers)
+
+
+def _mismatch():
+    return _Reject(422, "Idempotency-Key was already used with a different request")
+
+
+def _in_progress():
+    return _Reject(409, "A request with this Idempotency-Key is still in progress", retry_after=1)
+
+
+def principal(authorization: str):
+    """Who a key belongs to: "user:<id>", "anonymous" without a token, None for an invalid one."""
+    if not authorization:
+        return "anonymous"
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    return f"user:{payload.get('id', payload.get('sub'))}"
+
+
+def anonymous_owner(body: bytes) -> str:
+    """Scopes an unauthenticated key to the email it registers, so unrelated clients reusing a key never meet."""
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        email = None
+    if not isinstance(email, str):
+        return "anonymous" # Not a registration the route would accept
+    return f"anonymous:{hashlib.sha256(email.strip().lower().encode()).hexdigest()}"
+
+
+def fingerprint(method: str, path: str, body: bytes) -> str:
+    return hashlib.sha256(f"{method} {path}\n".encode() + body).hexdigest()
+
+
+def storable(status_code: int) -> bool:
+    return status_code < 500 and status_code != 429
+
+
+class IdempotencyStore:
+    """Completed responses (LRU, plus the table with IDEMPOTENCY_PERSIST) and the requests running per key."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.responses = TTLCache(maxsize=settings.IDEMPOTENCY_MAX_ENTRIES, ttl=settings.IDEMPOTENCY_TTL_SECONDS)
+        # key -> (fingerprint, future resolved when the request ends); event loop only
+        self.in_flight = {}
+        self._claims = 0
+
+    def clear(self):
+        self.responses.clear()
+
+    # The persistent store, called from the threadpool
+
+    def claim(self, key: str, fingerprint: str):
+        now = datetime.now(timezone.utc)
+        expired_before = now - timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        with self.session_factory() as db:
+            self._claims += 1
+            if self._claims % PURGE_EVERY == 0:
+                crud.purge_idempotency_keys(db, expired_before)
+            row = crud.claim_idempotency_key(
+                db, key, fingerprint, now, expired_before, now - timedelta(seconds=ABANDONED_SECONDS)
+            )
+        if row is None or row.status_code is None:
+            return row
+        return StoredResponse(
+            row.fingerprint, row.status_code,
+            [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(row.headers)],
+            row.body,
+        )
+
+    def complete(self, key: str, response: StoredResponse):
+        headers = json.dumps([(name.decode("latin-1"), value.decode("latin-1")) for name, value in response.headers])
+        with self.session_factory() as db:
+            crud.complete_idempotency_key(db, key, response.status, headers, response.body)
+
+    def release(self, key: str):
+        with self.session_factory() as db:
+            crud.release_idempotency_key(db, key)
+
+
+store = IdempotencyStore()
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware replaying responses to retried POSTs that carry an Idempotency-Key."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in ROUTES:
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        client_key = headers.get("idempotency-key")
+        if client_key is None:
+            return await self.app(scope, receive, send)
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            response = _Reject(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters").response()
+            return await response(scope, receive, send)
+        owner = principal(headers.get("authorization"))
+        if owner is None:
+            # The route answers 401 itself, and there is nothing worth storing
+            return await self.app(scope, receive, send)
+
+        body = await _read_body(receive)
+        if owner == "anonymous":
+            owner = anonymous_owner(body)
+        key = f"{scope['path']}:{owner}:{client_key}"
+        try:
+            await self._run(key, fingerprint(scope["method"], scope["path"], body), scope, body, receive, send)
+        except _Reject as rejection:
+            await rejection.response()(scope, receive, send)
+
+    async def _run(self, key, request_fingerprint, scope, body, receive, send):
+        while True:
+            stored = store.responses.get(key)
+            if stored is not None:
+                return await _replay(stored, request_fingerprint, send)
+            running = store.in_flight.get(key)
+            if running is None:
+                break
+            if running[0] != request_fingerprint:
+                raise _mismatch()
+            try:
+                await asyncio.wait_for(asyncio.shield(running[1]), settings.IDEMPOTENCY_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                raise _in_progress()
+            # Replays the original's response, or runs this one if it was not stored
+
+        done = asyncio.get_running_loop().create_future()
+        store.in_flight[key] = (request_fingerprint, done)
+        try:
+            if settings.IDEMPOTENCY_PERSIST:
+                stored = await self._claim(key, request_fingerprint)
+                if stored is not None:
+                    store.responses.set(key, stored)
+                    return await _replay(stored, request_fingerprint, send)
+            response = None
+            try:
+                response = await self._forward(scope, body, receive, send, request_fingerprint)
+            finally:
+                if response is not None and storable(response.status):
+                    store.responses.set(key, response)
+                    if settings.IDEMPOTENCY_PERSIST:
+                        await run_in_threadpool(store.complete, key, response)
+                elif settings.IDEMPOTENCY_PERSIST:
+                    await run_in_threadpool(store.release, key)
+        finally:
+            del store.in_flight[key]
+            done.set_result(None)
+
+    async def _claim(self, key, request_fingerprint):
+        """Claims key in the table, waiting while another worker holds it; returns a response to replay, or None."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            row = await run_in_threadpool(store.claim, key, request_fingerprint)
+            if row is None or isinstance(row, StoredResponse):
+                return row
+            if row.fingerprint != request_fingerprint:
+                raise _mismatch()
+            if loop.time() >= deadline:
+                raise _in_progress()
+            await asyncio.sleep(_POLL_SECONDS)
+
+    async def _forward(self, scope, body, receive, send, request_fingerprint):
+        """Runs the route with the buffered body, passing its response on and returning a copy."""
+        sent_body = False
+        start = {}
+        chunks = []
+
+        async def replay_receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        await self.app(scope, replay_receive, capture)
+        if not start:
+            return None
+        return StoredResponse(request_fingerprint, start["status"], list(start.get("headers", [])), b"".join(chunks))
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _replay(stored: StoredResponse, request_fingerprint: str, send):
+    if stored.fingerprint != request_fingerprint:
+        raise _mismatch()
+    await send({"type": "http.response.start", "status": stored.status, "headers": [*stored.headers, REPLAYED_HEADER]})
+    await send({"type": "http.response.body", "body": stored.body})
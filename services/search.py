@@ -0,0 +1,115 @@
+"""
+Course catalog search.
+
+Each backend narrows a Course select() to the courses matching a search term,
+using whatever full-text index the database offers:
+
+* SQLite   -> the FTS5 table created next to "courses" (see models.models)
+* Postgres -> the GIN tsvector expression index on "courses"
+* others   -> plain LIKE, which cannot use an index
+
+Terms are split into words and every word is prefix-matched, so "adv pyt"
+finds "Advanced Python". The SQLite index only holds listable courses (active
+and not soft-deleted), which lets paging run inside the FTS query; the crud
+writers keep it in sync through sync_course.
+"""
+import re
+from sqlalchemy import Float, Integer, Select, false, func, literal_column, or_, select, text
+from sqlalchemy.orm import Session
+from models import models
+from models.models import COURSE_SEARCH_TABLE
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(term: str) -> list:
+    return _WORD.findall(term.lower())
+
+
+class LikeSearch:
+    """Fallback: case-insensitive substring match on title and code."""
+
+    def filter(self, query: Select, term: str, after_id: int = None, limit: int = None) -> Select:
+        """
+        Restricts query to matching courses. after_id/limit describe the keyset
+        page the caller is about to fetch; backends may use them to stop early.
+        """
+        return query.filter(
+            models.Course.deleted_at.is_(None),
+            or_(models.Course.title.icontains(term), models.Course.code.icontains(term))
+        )
+
+    def ranked(self, query: Select, term: str, skip: int, limit: int) -> Select:
+        """Matching courses, best first, with skip/limit applied."""
+        return self.filter(query, term).order_by(models.Course.id).offset(skip).limit(limit)
+
+    def sync_course(self, db: Session, course: models.Course):
+        pass
+
+
+class SQLiteFTSSearch(LikeSearch):
+    """FTS5 with bm25 ranking."""
+
+    def _hits(self, term: str, order_by: str, after_id: int = None, limit: int = None, offset: int = 0):
+        sql = f"SELECT rowid AS course_id, rank FROM {COURSE_SEARCH_TABLE} WHERE {COURSE_SEARCH_TABLE} MATCH :match"
+        params = {"match": " ".join(f'"{word}"*' for word in _words(term))}
+        if after_id is not None:
+            sql += " AND rowid > :after_id"
+            params["after_id"] = after_id
+        sql += f" ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT :limit OFFSET :offset"
+            params.update(limit=limit, offset=offset)
+        return text(sql).bindparams(**params).columns(course_id=Integer, rank=Float).subquery()
+
+    def filter(self, query: Select, term: str, after_id: int = None, limit: int = None) -> Select:
+        if not _words(term):
+            return query.filter(false())
+        # Walking the index in rowid order is cheap; only this page's ids leave FTS
+        hits = self._hits(term, "rowid", after_id=after_id, limit=limit)
+        return query.filter(models.Course.id.in_(select(hits.c.course_id)))
+
+    def ranked(self, query: Select, term: str, skip: int, limit: int) -> Select:
+        if not _words(term):
+            return query.filter(false())
+        # FTS5 rank is bm25(): lower is a better match
+        hits = self._hits(term, "rank", limit=limit, offset=skip)
+        return query.join(hits, hits.c.course_id == models.Course.id).order_by(hits.c.rank, models.Course.id)
+
+    def sync_course(self, db: Session, course: models.Course):
+        db.execute(text(f"DELETE FROM {COURSE_SEARCH_TABLE} WHERE rowid = :id"), {"id": course.id})
+        if course.is_active and course.deleted_at is None:
+            db.execute(
+                text(f"INSERT INTO {COURSE_SEARCH_TABLE} (rowid, title, code) VALUES (:id, :title, :code)"),
+                {"id": course.id, "title": course.title or "", "code": course.code or ""}
+            )
+
+
+class PostgresSearch(LikeSearch):
+    """tsvector/tsquery with ts_rank, served by the ix_courses_search_tsv GIN index."""
+
+    # Must match the indexed expression exactly (no bind parameters) for the planner to use it
+    document = literal_column("to_tsvector('simple', coalesce(courses.title, '') || ' ' || coalesce(courses.code, ''))")
+
+    def _tsquery(self, term: str):
+        return func.to_tsquery(literal_column("'simple'"), " & ".join(f"{word}:*" for word in _words(term)))
+
+    def filter(self, query: Select, term: str, after_id: int = None, limit: int = None) -> Select:
+        if not _words(term):
+            return query.filter(false())
+        return query.filter(models.Course.deleted_at.is_(None), self.document.op("@@")(self._tsquery(term)))
+
+    def ranked(self, query: Select, term: str, skip: int, limit: int) -> Select:
+        rank = func.ts_rank(self.document, self._tsquery(term))
+        return self.filter(query, term).order_by(rank.desc(), models.Course.id).offset(skip).limit(limit)
+
+
+_backends = {
+    "sqlite": SQLiteFTSSearch(),
+    "postgresql": PostgresSearch(),
+}
+_fallback = LikeSearch()
+
+
+def get_search_backend(db: Session) -> LikeSearch:
+    return _backends.get(db.get_bind().dialect.name, _fallback)
@@ -0,0 +1,159 @@
+"""
+Live seat counts for GET /courses/{id}/seats/stream.
+
+The crud writers publish a course's new seat state after every commit that
+changes it (enrollments, drops, admin removals, bulk loads and capacity
+edits), and each open stream holds a subscription to its course. One change
+therefore costs one message per watcher, however many students are waiting
+on a course, instead of one query per poll.
+
+LocalBroker fans messages out inside this process. Publishers may run on any
+thread (sync routes run in the threadpool), so delivery is handed to each
+subscriber's event loop. A subscription only keeps the newest state: seat
+counts are a snapshot, so a slow client skips to the latest one instead of
+queueing every change, and a message older (by course version) than one
+already delivered is dropped. With several worker processes, swap broker
+for one backed by a message broker with the same publish/subscribe calls.
+"""
+import asyncio
+import threading
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from core.config import settings
+
+
+def seat_state(course) -> dict:
+    """The published message for a Course, or a row with its id, enrolled_count, capacity and version."""
+    return {
+        "course_id": course.id,
+        "enrolled_count": course.enrolled_count,
+        "capacity": course.capacity,
+        "seats_remaining": max((course.capacity or 0) - (course.enrolled_count or 0), 0),
+        "version": course.version,
+    }
+
+
+class Subscription:
+    """The latest state published for one topic, awaited by one stream."""
+
+    def __init__(self, broker, topic, loop: asyncio.AbstractEventLoop):
+        self.broker = broker
+        self.topic = topic
+        self.loop = loop
+        self.latest = None
+        self._changed = asyncio.Event()
+
+    def offer(self, message: dict):
+        # Runs on self.loop
+        if self.latest is not None and message["version"] <= self.latest["version"]:
+            return
+        self.latest = message
+        self._changed.set()
+
+    async def next(self, timeout: float):
+        """The newest state once it changes, or None after timeout seconds without a change."""
+        try:
+            async with asyncio.timeout(timeout):
+                await self._changed.wait()
+        except TimeoutError:
+            return None
+        self._changed.clear()
+        return self.latest
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+def _deliver(subscriptions: list, message: dict):
+    for subscription in subscriptions:
+        subscription.offer(message)
+
+
+class LocalBroker:
+    """In-process publish/subscribe, keyed by topic."""
+
+    def __init__(self, max_subscribers: int, overflow_detail: str = "Too many subscribers"):
+        self.max_subscribers = max_subscribers
+        self.overflow_detail = overflow_detail
+        self._topics = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic) -> Subscription:
+        """A Subscription delivered on the running event loop; close() it when done."""
+        subscription = Subscription(self, topic, asyncio.get_running_loop())
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise HTTPException(status_code=503, detail=self.overflow_detail)
+            self._topics.setdefault(topic, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._topics.get(subscription.topic)
+            if subscriptions is None or subscription not in subscriptions:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._topics[subscription.topic]
+            self._count -= 1
+
+    def publish(self, topic, message: dict):
+        by_loop = {}
+        with self._lock:
+            for subscription in self._topics.get(topic, ()):
+                by_loop.setdefault(subscription.loop, []).append(subscription)
+        # One wake-up per event loop, not per watcher
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, subscriptions, message)
+            except RuntimeError:
+                pass # That loop has shut down
+
+    def subscriber_count(self, topic=None) -> int:
+        with self._lock:
+            return self._count if topic is None else len(self._topics.get(topic, ()))
+
+
+broker = LocalBroker(
+    max_subscribers=settings.SEAT_STREAM_MAX_SUBSCRIBERS,
+    overflow_detail="Too many live seat streams; poll the course instead"
+)
+
+def publish(course):
+    """Call after committing a change to course's seats (see seat_state for what course may be)."""
+    broker.publish(course.id, seat_state(course))
+
+def _event(message: dict) -> str:
+    # The id lets a client tell states apart (it is the course version)
+    return f"id: {message['version']}\nevent: seats\ndata: {orjson.dumps(message).decode()}\n\n"
+
+async def _events(subscription: Subscription):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SEAT_STREAM_MAX_SECONDS
+    try:
+        delivered = subscription.latest
+        yield _event(delivered)
+        while (remaining := deadline - loop.time()) > 0:
+            message = await subscription.next(min(settings.SEAT_STREAM_HEARTBEAT_SECONDS, remaining))
+            if message is None:
+                yield ": keep-alive\n\n" # Comment lines keep proxies from timing the connection out
+            elif message is not delivered:
+                delivered = message
+                yield _event(message)
+    finally:
+        subscription.close()
+
+def event_stream(subscription: Subscription) -> StreamingResponse:
+    """
+    SSE response for a subscription already offered the current state: that
+    state first, then every change. It ends after SEAT_STREAM_MAX_SECONDS;
+    EventSource clients reconnect on their own.
+    """
+    return StreamingResponse(
+        _events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,221 @@
+"""
+Group commit for enrollment writes (settings.WRITE_PIPELINE_ENABLED).
+
+SQLite has one writer at a time, and every enroll, drop or admin removal
+commits on its own: one write-lock acquisition and one WAL sync each. Under
+load the requests queue on the lock (up to SQLITE_BUSY_TIMEOUT_MS, then
+"database is locked") and throughput is capped by the commit rate.
+
+In pipeline mode the routes hand those writes to WritePipeline instead. A
+single writer thread takes whatever has queued up (at most
+WRITE_PIPELINE_MAX_BATCH writes) and applies it in one transaction: each
+write runs in its own SAVEPOINT through the same crud.stage_* functions the
+direct path uses, so a rejected one (course full, already enrolled) is
+rolled back alone while the rest commit together. Every caller's future is
+then resolved with its own result or HTTPException, after the commit, so
+nobody is told "enrolled" before it is durable. The more writes arrive while
+a commit is under way, the larger the next batch, and the commit cost is
+shared among them.
+
+Sync routes wait on the future from their threadpool thread, async routes
+await it. The writer has its own one-connection engine; on SQLite its
+transactions start with BEGIN IMMEDIATE, taking the write lock up front
+rather than upgrading to it halfway through a batch.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from fastapi import HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from core.config import settings
+from database import create_db_engine
+from services import audit
+import crud
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_TIMED_OUT = "The write was not confirmed in time; it may still be applied"
+_NOT_APPLIED = "The write timed out before it ran and was not applied"
+
+
+def _unavailable(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail, headers={"Retry-After": "1"}
+    )
+
+
+def _timed_out(future: Future) -> HTTPException:
+    return _unavailable(_NOT_APPLIED if future.cancelled() else _TIMED_OUT)
+
+
+# --- Writes (run on the writer thread; each returns (result, course_id, seat state)) ---
+
+def enroll(db, course_id: int, user_id: int):
+    new_enrollment, reserved = crud.stage_enrollment(db, course_id, user_id)
+    return new_enrollment, course_id, reserved
+
+def drop(db, course_id: int, user_id: int):
+    state = crud.stage_drop(db, course_id, user_id)
+    return {"message": "Successfully dropped the course"}, course_id, state
+
+def admin_remove(db, enrollment_id: int):
+    removed, state = crud.stage_admin_removal(db, enrollment_id)
+    return removed, removed.course_id if removed else None, state
+
+
+# --- Writer sessions ---
+
+def _no_driver_transactions(dbapi_connection, connection_record):
+    # pysqlite would BEGIN on its own before DML and make the first SAVEPOINT's
+    # RELEASE a commit; the "begin" hook below opens transactions instead
+    dbapi_connection.isolation_level = None
+
+def _begin_immediate(conn):
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def writer_sessions(db_engine) -> sessionmaker:
+    """
+    Sessions for the writer thread on db_engine (which it then owns: on SQLite,
+    transactions are switched to explicit BEGIN IMMEDIATE so savepoints nest
+    inside the batch).
+    """
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine, "connect", _no_driver_transactions)
+        event.listen(db_engine, "begin", _begin_immediate)
+    return sessionmaker(bind=db_engine, autoflush=False)
+
+
+class WritePipeline:
+    """Applies queued writes in batches, one transaction per batch, on a single thread."""
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self._queue = queue.Queue(maxsize=settings.WRITE_PIPELINE_QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.failed_batches = 0
+
+    def start(self):
+        if self.session_factory is None:
+            self.session_factory = writer_sessions(create_db_engine(pool_size=1, max_overflow=0))
+        self._thread = threading.Thread(target=self._run, name="write-pipeline", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        """Applies what is already queued, then ends the writer thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+    def submit(self, write, *args) -> Future:
+        """Queues write(db, *args); the Future resolves once its batch has committed."""
+        if self._thread is None or not self._thread.is_alive():
+            # Nothing would ever resolve the future (lifespan not run, or stopped)
+            raise _unavailable("The write pipeline is not running")
+        future = Future()
+        try:
+            self._queue.put_nowait((write, args, future))
+        except queue.Full:
+            raise _unavailable("Too many writes waiting; try again shortly")
+        return future
+
+    def call(self, write, *args):
+        """submit() and wait, from a sync route's threadpool thread."""
+        future = self.submit(write, *args)
+        try:
+            return future.result(timeout=settings.WRITE_PIPELINE_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            # A write still queued is withdrawn (apply() skips it); one already running is not
+            future.cancel()
+            raise _timed_out(future)
+
+    async def run(self, write, *args):
+        """submit() and await, from an async route."""
+        future = self.submit(write, *args)
+        try:
+            # On timeout wait_for cancels the wrapper, which cancels a still queued write
+            return await asyncio.wait_for(asyncio.wrap_future(future), settings.WRITE_PIPELINE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise _timed_out(future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"batches": self.batches, "writes": self.writes,
+                    "failed_batches": self.failed_batches, "queued": self._queue.qsize()}
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + settings.WRITE_PIPELINE_MAX_WAIT_MS / 1000
+            while len(batch) < settings.WRITE_PIPELINE_MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self.apply(batch)
+            except Exception:
+                logger.exception("Write pipeline batch failed")
+
+    def apply(self, batch: list):
+        """Applies (write, args, future) items in one transaction and resolves their futures."""
+        applied = []
+        try:
+            with self.session_factory() as db:
+                for write, args, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue # The caller went away before its turn
+                    try:
+                        with audit.savepoint(db):
+                            outcome = write(db, *args)
+                    except Exception as exc:
+                        # Rejections and statement errors alike only fail this write
+                        future.set_exception(exc)
+                        continue
+                    applied.append((future, outcome))
+                db.commit()
+        except Exception as exc:
+            with self._lock:
+                self.failed_batches += 1
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            raise
+
+        # Callers hear about their committed writes first; what follows is best effort
+        for future, (result, _, _) in applied:
+            future.set_result(result)
+        with self._lock:
+            self.batches += 1
+            self.writes += len(batch)
+
+        # One cache invalidation and one seat message per course, with its last state
+        changed = {}
+        for _, (_, course_id, state) in applied:
+            if course_id is not None:
+                changed[course_id] = state or changed.get(course_id)
+        for course_id, state in changed.items():
+            try:
+                crud.seats_changed(course_id, state)
+            except Exception:
+                logger.exception("Write pipeline could not announce seat changes of course %s", course_id)
+
+
+pipeline = WritePipeline()
@@ -1,21 +1,41 @@
+import tempfile
+from pathlib import Path
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from api.limiter import limiter
 from app import app as project_app 
-from database import Base, get_db
+from core.config import settings
+from core.security import principal_cache
+from services import course_cache, idempotency
+from database import Base, get_async_db, get_async_read_db, get_db, get_read_db, to_async_url
 
 limiter.enabled = False
-# Setup In-Memory Database
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# The relay would run against the app database; tests relay through crud instead
+settings.AUDIT_RELAY_ENABLED = False
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+if settings.DB_ASYNC:
+    # DB_ASYNC=1 pytest runs the suite against the async routers. The sync
+    # fixtures and the async sessions must see the same data, so both connect
+    # to a temporary file instead of a private in-memory database.
+    SQLALCHEMY_DATABASE_URL = f"sqlite:///{Path(tempfile.mkdtemp()) / 'test.db'}"
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=NullPool)
+    TestingAsyncSessionLocal = async_sessionmaker(
+        create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool),
+        autoflush=False,
+        expire_on_commit=False
+    )
+else:
+    # Setup In-Memory Database
+    SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @pytest.fixture
@@ -44,6 +64,19 @@ def client(app, db_session):
             pass
             
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    if settings.DB_ASYNC:
+        async def override_get_async_db():
+            async with TestingAsyncSessionLocal() as db:
+                yield db
+
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        app.dependency_overrides[get_async_read_db] = override_get_async_db
+    # Tokens minted in the same second are identical across tests
+    principal_cache.clear()
+    # Every test starts from an empty database, so ids and cache versions repeat
+    course_cache.cache.clear()
+    idempotency.store.clear()
     with TestClient(app) as c:
         yield c
     # This resets all overrides (including auth) after every test
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from database import Base, to_async_url
+from models import models
+import crud_async
+
+# --- Tests ---
+
+def test_to_async_url():
+    """ Drivers: Sync URLs map to their async drivers"""
+    assert to_async_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert to_async_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    with pytest.raises(ValueError):
+        to_async_url("mysql://u:p@db/app")
+
+def test_async_enroll_concurrent_never_exceeds_capacity(tmp_path):
+    """ Concurrency: Parallel async enrollments for the last seats never overbook"""
+    url = f"sqlite:///{tmp_path / 'race.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+
+    async def scenario():
+        engine = create_async_engine(to_async_url(url), connect_args={"timeout": 30})
+        AsyncRaceSession = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        async with AsyncRaceSession() as db:
+            c = models.Course(title="Hot", code="HOT1", capacity=5, is_active=True)
+            db.add(c)
+            await db.commit()
+            course_id = c.id
+
+        async def attempt(user_id):
+            async with AsyncRaceSession() as db:
+                try:
+                    await crud_async.enroll_student(db, course_id, user_id)
+                    return 200
+                except HTTPException as exc:
+                    return exc.status_code
+
+        results = await asyncio.gather(*(attempt(user_id) for user_id in range(1, 21)))
+        async with AsyncRaceSession() as db:
+            enrolled = await db.scalar(
+                select(func.count()).where(models.Enrollment.course_id == course_id)
+            )
+            course = await db.get(models.Course, course_id)
+        await engine.dispose()
+        return results, enrolled, course
+
+    results, enrolled, course = asyncio.run(scenario())
+    assert results.count(200) == 5
+    assert results.count(400) == 15
+    assert enrolled == 5
+    assert course.enrolled_count == 5
+
+def test_async_drop_course_releases_seat(tmp_path):
+    """ Success: Async drop removes the enrollment and frees its seat"""
+    url = f"sqlite:///{tmp_path / 'drop.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+
+    async def scenario():
+        engine = create_async_engine(to_async_url(url))
+        AsyncTestSession = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        async with AsyncTestSession() as db:
+            c = models.Course(title="Drop", code="DR1", capacity=1, is_active=True)
+            db.add(c)
+            await db.commit()
+            course_id = c.id # A rollback expires c, and expired attributes cannot lazy-load here
+            await crud_async.enroll_student(db, course_id, 1)
+            with pytest.raises(HTTPException) as full:
+                await crud_async.enroll_student(db, course_id, 2)
+            await crud_async.delete_own_enrollment(db, course_id, 1)
+            await crud_async.enroll_student(db, course_id, 2)
+            with pytest.raises(HTTPException) as missing:
+                await crud_async.delete_own_enrollment(db, course_id, 1)
+            course = await db.get(models.Course, course_id, populate_existing=True)
+        await engine.dispose()
+        return full.value, missing.value, course
+
+    full, missing, course = asyncio.run(scenario())
+    assert full.status_code == 400
+    assert missing.status_code == 404
+    assert course.enrolled_count == 1
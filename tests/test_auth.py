@@ -1,7 +1,7 @@
 import pytest
 from jose import jwt
 from core.config import settings
-from core.security import verify_password 
+from core.security import pwd_context, verify_password 
 from models.models import User
 
 ## --- Registration Tests ---
@@ -33,6 +33,28 @@ def test_register_duplicate_email(client):
     assert response.status_code == 400
     assert "already registered" in response.json()["detail"].lower()
 
+def test_register_idempotency_key_replays(client):
+    """ Retried registration: Same Idempotency-Key returns the original user, not a 400"""
+    payload = {"name": "Retry", "email": "retry@example.com", "password": "password123", "role": "student"}
+    headers = {"Idempotency-Key": "signup-1"}
+    first = client.post("/auth/register", json=payload, headers=headers)
+    retry = client.post("/auth/register", json=payload, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+
+    # The key belongs to that request; without a key the route runs again
+    changed = client.post("/auth/register", json={**payload, "name": "Changed"}, headers=headers)
+    assert changed.status_code == 422
+    assert client.post("/auth/register", json=payload).status_code == 400
+
+    # Another client picking the same key for another email is a different request
+    other = client.post("/auth/register", json={**payload, "email": "other@example.com"}, headers=headers)
+    assert other.status_code == 200
+    assert other.json()["email"] == "other@example.com"
+    assert "Idempotent-Replayed" not in other.headers
+
 def test_register_invalid_input(client):
     """ Invalid input: Missing fields (422)"""
     response = client.post("/auth/register", json={"name": "No Email User"})
@@ -70,6 +92,21 @@ def test_login_success(client):
     payload = jwt.decode(data["access_token"], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     assert payload.get("sub") == "login@example.com"
 
+def test_login_rehashes_outdated_hash(client, db_session):
+    """ Security: Hashes with other bcrypt rounds are upgraded on login"""
+    client.post("/auth/register", json={
+        "name": "Legacy", "email": "legacy@example.com", "password": "password", "role": "student"
+    })
+    db_user = db_session.query(User).filter(User.email == "legacy@example.com").first()
+    db_user.hashed_password = pwd_context.handler().using(rounds=4).hash("password")
+    db_session.commit()
+
+    response = client.post("/auth/login", data={"username": "legacy@example.com", "password": "password"})
+    assert response.status_code == 200
+    db_user = db_session.query(User).filter(User.email == "legacy@example.com").first()
+    assert db_user.hashed_password.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    assert verify_password("password", db_user.hashed_password)
+
 def test_login_wrong_password(client):
     """ Wrong password: returns 400 """
     client.post("/auth/register", json={
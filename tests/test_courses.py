@@ -1,5 +1,14 @@
+import json
+import threading
 from api.deps import admin_required, get_current_user
 from fastapi import HTTPException
+from core.cache import LocalStore, VersionedCache
+from core.config import settings
+from core.pagination import encode_cursor
+from schemas import user as user_schema
+from models import models
+from services import course_cache, seat_events
+import crud
 
 # --- Mocks ---
 
@@ -33,6 +42,126 @@ def test_list_courses_empty(client):
     assert response.status_code == 200
     assert response.json() == []
 
+def test_list_courses_cursor_pagination(client, app):
+    """ Keyset paging: Follow X-Next-Cursor until the last page"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    for i in range(5):
+        client.post("/courses/", json={"title": f"Course {i}", "code": f"P{i}", "capacity": 10})
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/courses/", params=params)
+        assert response.status_code == 200
+        seen += [c["code"] for c in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == ["P0", "P1", "P2", "P3", "P4"]
+
+def test_list_courses_sorted_by_title(client, app):
+    """ Keyset paging: (title, id) ordering across pages"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    for title, code in (("Zoology", "Z1"), ("Algebra", "A1"), ("Biology", "B1")):
+        client.post("/courses/", json={"title": title, "code": code, "capacity": 10})
+
+    first = client.get("/courses/", params={"limit": 2, "sort": "title"})
+    assert [c["title"] for c in first.json()] == ["Algebra", "Biology"]
+    second = client.get("/courses/", params={"limit": 2, "sort": "title", "cursor": first.headers["X-Next-Cursor"]})
+    assert [c["title"] for c in second.json()] == ["Zoology"]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_list_courses_skip_compatibility(client, app):
+    """ Legacy paging: skip/limit still works and limit is capped"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    for i in range(3):
+        client.post("/courses/", json={"title": f"Legacy {i}", "code": f"L{i}", "capacity": 10})
+
+    response = client.get("/courses/", params={"skip": 1, "limit": 100000})
+    assert [c["code"] for c in response.json()] == ["L1", "L2"]
+
+def test_list_courses_fast_json(client, app, db_session, monkeypatch):
+    """ Fast JSON: Projected course rows compute seats_remaining like CourseOut"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    for i in range(3):
+        client.post("/courses/", json={"title": f"Fast {i}", "code": f"FJ{i}", "capacity": 10})
+    db_session.query(models.Course).filter(models.Course.code == "FJ1").update({"enrolled_count": 4})
+    db_session.commit()
+    course_cache.cache.clear()
+
+    expected = [client.get("/courses/", params=params).json() for params in ({"limit": 2}, {"skip": 1})]
+    monkeypatch.setattr(settings, "FAST_JSON", True)
+    course_cache.cache.clear()
+    first = client.get("/courses/", params={"limit": 2})
+    assert first.json() == expected[0]
+    assert first.json()[1]["seats_remaining"] == 6
+    assert "X-Next-Cursor" in first.headers
+    assert client.get("/courses/", params={"skip": 1}).json() == expected[1]
+
+def test_list_courses_invalid_cursor(client):
+    """ Invalid cursor: Tampered token returns 400"""
+    response = client.get("/courses/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_list_courses_cursor_value_types(client, app):
+    """ Invalid cursor: Well-formed tokens with values of the wrong type return 400, not 500"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    tampered = [
+        ("id", [{"a": 1}]), ("id", [[1]]), ("id", [True]), ("id", [None]), ("id", ["1"]),
+        ("title", [{"a": 1}, 1]), ("title", [None, 1]), ("title", ["Algebra", 1.5]),
+    ]
+    for sort, values in tampered:
+        response = client.get("/courses/", params={"sort": sort, "cursor": encode_cursor(sort, values)})
+        assert response.status_code == 400, (sort, values)
+    assert client.get("/admin/enrollments", params={"cursor": encode_cursor("id", [{"a": 1}])}).status_code == 400
+    assert client.get("/courses/", params={"cursor": encode_cursor("id", [0])}).status_code == 200
+
+def test_search_courses_prefix_match(client, app):
+    """ Search: Word prefixes over title and code, case-insensitive"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    client.post("/courses/", json={"title": "Advanced Python", "code": "PY301", "capacity": 10})
+    client.post("/courses/", json={"title": "Python Basics", "code": "PY101", "capacity": 10})
+    client.post("/courses/", json={"title": "Organic Chemistry", "code": "CH201", "capacity": 10})
+
+    assert {c["code"] for c in client.get("/courses/", params={"search": "pyth"}).json()} == {"PY301", "PY101"}
+    assert [c["code"] for c in client.get("/courses/", params={"search": "ADV pyt"}).json()] == ["PY301"]
+    assert [c["code"] for c in client.get("/courses/", params={"search": "ch2"}).json()] == ["CH201"]
+    assert client.get("/courses/", params={"search": "%"}).json() == []
+
+def test_search_courses_cursor_pagination(client, app):
+    """ Search: Keyset pages of search results skip non-matching courses"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    for i in range(6):
+        title = "Linear Algebra" if i % 2 else "World History"
+        client.post("/courses/", json={"title": f"{title} {i}", "code": f"S{i}", "capacity": 10})
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, "search": "algebra", **({"cursor": cursor} if cursor else {})}
+        response = client.get("/courses/", params=params)
+        seen += [c["code"] for c in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == ["S1", "S3", "S5"]
+
+def test_search_index_follows_updates(client, app, db_session):
+    """ Search: Renames, status toggles and soft deletes keep the index in sync"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    c = client.post("/courses/", json={"title": "Old Name", "code": "RN1", "capacity": 10}).json()
+    client.patch(f"/courses/{c['id']}", json={"title": "Fresh Name"})
+
+    assert client.get("/courses/", params={"search": "old"}).json() == []
+    assert [x["id"] for x in client.get("/courses/", params={"search": "fresh"}).json()] == [c["id"]]
+
+    client.patch(f"/courses/{c['id']}/status")
+    assert client.get("/courses/", params={"search": "fresh"}).json() == []
+    client.patch(f"/courses/{c['id']}/status")
+    assert len(client.get("/courses/", params={"search": "fresh"}).json()) == 1
+
+    crud.soft_delete_course(db_session, c["id"])
+    assert client.get("/courses/", params={"search": "fresh"}).json() == []
+
 ## 2. GET /courses/{id} (Public)
 
 def test_get_course_success(client, app):
@@ -50,6 +179,137 @@ def test_get_course_malformed_id(client):
     response = client.get("/courses/not-an-int")
     assert response.status_code == 422
 
+def test_get_course_served_from_cache(client, app):
+    """ Cache: Repeat reads are hits, and an update is visible on the next read"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    c_id = client.post("/courses/", json={"title": "Cached", "code": "CA1", "capacity": 5}).json()["id"]
+
+    first = client.get(f"/courses/{c_id}")
+    hits = course_cache.stats()["hits"]
+    second = client.get(f"/courses/{c_id}")
+    assert second.content == first.content
+    assert course_cache.stats()["hits"] == hits + 1
+
+    client.patch(f"/courses/{c_id}", json={"title": "Renamed"})
+    assert client.get(f"/courses/{c_id}").json()["title"] == "Renamed"
+    assert client.get("/courses/").json()[0]["title"] == "Renamed"
+
+def test_course_cache_follows_seat_changes(client, app, db_session):
+    """ Cache: Enrollments and drops invalidate the cached seat counts"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    c_id = client.post("/courses/", json={"title": "Seats", "code": "SE1", "capacity": 5}).json()["id"]
+    student = crud.create_user(
+        db_session,
+        user_schema.UserCreate(name="S", email="seats@test.com", password="password123", role="student"),
+        hashed_password="not-a-real-hash"
+    )
+    assert client.get(f"/courses/{c_id}").json()["seats_remaining"] == 5
+    assert client.get("/courses/").json()[0]["seats_remaining"] == 5
+
+    crud.enroll_student(db_session, c_id, student.id)
+    assert client.get(f"/courses/{c_id}").json()["seats_remaining"] == 4
+    assert client.get("/courses/").json()[0]["seats_remaining"] == 4
+
+    crud.delete_own_enrollment(db_session, c_id, student.id)
+    assert client.get(f"/courses/{c_id}").json()["seats_remaining"] == 5
+
+def test_get_course_conditional_requests(client, app, db_session):
+    """ Conditional GET: Matching ETag or date returns 304; any write changes the ETag"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    c_id = client.post("/courses/", json={"title": "Polled", "code": "PO1", "capacity": 5}).json()["id"]
+
+    first = client.get(f"/courses/{c_id}")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "public, no-cache"
+    not_modified = client.get(f"/courses/{c_id}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+    since = client.get(f"/courses/{c_id}", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert since.status_code == 304
+
+    # Seat changes are Core UPDATEs; they bump the version all the same
+    student = crud.create_user(
+        db_session,
+        user_schema.UserCreate(name="P", email="poll@test.com", password="password123", role="student"),
+        hashed_password="not-a-real-hash"
+    )
+    crud.enroll_student(db_session, c_id, student.id)
+    changed = client.get(f"/courses/{c_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["seats_remaining"] == 4
+
+def test_list_courses_conditional_requests(client, app):
+    """ Conditional GET: Listing pages revalidate by ETag, cursor header included"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    for i in range(3):
+        client.post("/courses/", json={"title": f"Page {i}", "code": f"PG{i}", "capacity": 5})
+
+    first = client.get("/courses/", params={"limit": 2})
+    etag = first.headers["ETag"]
+    again = client.get("/courses/", params={"limit": 2}, headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert again.status_code == 304
+    assert client.get("/courses/", params={"limit": 3}, headers={"If-None-Match": etag}).status_code == 200
+
+    client.patch(f"/courses/{first.json()[0]['id']}", json={"title": "Renamed"})
+    changed = client.get("/courses/", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()[0]["title"] == "Renamed"
+    assert changed.headers["X-Next-Cursor"]
+
+def test_course_cache_shared_tier():
+    """ Cache: Workers sharing a store see each other's entries and version bumps"""
+    store = LocalStore()
+    worker_a = VersionedCache("courses", maxsize=10, ttl=60, shared=store)
+    worker_b = VersionedCache("courses", maxsize=10, ttl=60, shared=store)
+
+    worker_a.set("course:1", worker_a.version("course:1"), b"v0")
+    assert worker_b.get("course:1", worker_b.version("course:1")) == b"v0"
+    assert worker_b.stats()["shared_hits"] == 1
+
+    worker_a.bump("course:1")
+    assert worker_b.get("course:1", worker_b.version("course:1")) is None
+
+def test_course_cache_stats_unauthorized(client, app):
+    """ Unauthorized: Student asks for the cache stats"""
+    app.dependency_overrides[admin_required] = mock_admin_forbidden
+    assert client.get("/courses/cache/stats").status_code == 403
+    app.dependency_overrides[admin_required] = mock_admin_required
+    assert "hit_ratio" in client.get("/courses/cache/stats").json()
+
+## 2b. GET /courses/{id}/seats/stream (Public)
+
+def test_stream_seats_pushes_changes(client, app, db_session, monkeypatch):
+    """ Success: Current seats first, then each committed change, with heartbeats"""
+    monkeypatch.setattr(settings, "SEAT_STREAM_MAX_SECONDS", 1.0)
+    monkeypatch.setattr(settings, "SEAT_STREAM_HEARTBEAT_SECONDS", 0.3)
+    app.dependency_overrides[admin_required] = mock_admin_required
+    c_id = client.post("/courses/", json={"title": "Live", "code": "LV1", "capacity": 5}).json()["id"]
+    student = crud.create_user(
+        db_session,
+        user_schema.UserCreate(name="L", email="live@test.com", password="password123", role="student"),
+        hashed_password="not-a-real-hash"
+    )
+
+    # Enroll while the stream is open (TestClient returns once the stream ends)
+    enrollment = threading.Timer(0.3, crud.enroll_student, (db_session, c_id, student.id))
+    enrollment.start()
+    response = client.get(f"/courses/{c_id}/seats/stream")
+    enrollment.join()
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert [e["seats_remaining"] for e in events] == [5, 4]
+    assert ": keep-alive" in response.text
+    assert seat_events.broker.subscriber_count() == 0
+
+def test_stream_seats_not_found(client):
+    """ Invalid ID: Nonexistent course, and no subscription is left behind"""
+    response = client.get("/courses/9999/seats/stream")
+    assert response.status_code == 404
+    assert seat_events.broker.subscriber_count() == 0
+
 ## 3. POST /courses/ (Admin Only)
 
 def test_create_course_unauthorized(client, app):
@@ -77,6 +337,12 @@ def test_update_course_success(client, app):
     assert response.status_code == 200
     assert response.json()["title"] == "New Title"
 
+def test_update_course_not_found(client, app):
+    """ Invalid ID: Updating a nonexistent course → returns 404"""
+    app.dependency_overrides[admin_required] = mock_admin_required
+    response = client.patch("/courses/9999", json={"title": "Nope"})
+    assert response.status_code == 404
+
 def test_update_course_unauthorized(client, app):
     """ Unauthorized: Student tries to update"""
     app.dependency_overrides[admin_required] = mock_admin_forbidden
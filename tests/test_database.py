@@ -0,0 +1,238 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from jose import jwt
+from sqlalchemy import exc, text
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from core import read_your_writes
+from core.config import settings
+from core.security import create_access_token
+from database import (
+    Base, ReadRouting, create_async_db_engine, create_db_engine, engine_options, get_read_db, pool_stats, replica_lag
+)
+from api.v1 import courses
+from models import models
+import crud
+import database
+import replicate
+import seed
+from services import course_cache
+
+# --- Tests ---
+
+def test_sqlite_file_engine_pragmas(tmp_path):
+    """ SQLite: Every pooled connection runs in WAL with a busy timeout"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1 # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.SQLITE_BUSY_TIMEOUT_MS
+        assert conn.execute(text("PRAGMA mmap_size")).scalar() == settings.SQLITE_MMAP_SIZE
+    assert engine.pool.size() == settings.DB_POOL_SIZE
+    engine.dispose()
+
+def test_async_sqlite_engine_pragmas(tmp_path):
+    """ SQLite: The aiosqlite engine gets the same PRAGMAs"""
+    async def journal_mode():
+        engine = create_async_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+        async with engine.connect() as conn:
+            mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        await engine.dispose()
+        return mode
+
+    assert asyncio.run(journal_mode()) == "wal"
+
+def test_async_engine_only_with_db_async(tmp_path):
+    """ Engines: Without DB_ASYNC no async engine, pool or driver is set up"""
+    check = (
+        "import sys, app, database; "
+        "assert database.async_database.cache_info().currsize == 0; "
+        "assert 'aiosqlite' not in sys.modules"
+    )
+    env = {**os.environ, "DB_ASYNC": "false", "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}"}
+    subprocess.run([sys.executable, "-c", check], env=env, check=True, capture_output=True)
+
+def test_concurrent_writers_wait_for_the_lock(tmp_path):
+    """ SQLite: Parallel writers queue on busy_timeout instead of failing with 'database is locked'"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    WriterSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with WriterSession() as db:
+        c = models.Course(title="Busy", code="BSY1", capacity=100, is_active=True)
+        db.add(c)
+        db.commit()
+        course_id = c.id
+
+    def attempt(user_id):
+        with WriterSession() as db:
+            return crud.enroll_student(db, course_id, user_id).id
+
+    with ThreadPoolExecutor(max_workers=30) as pool:
+        assert len(set(pool.map(attempt, range(1, 61)))) == 60
+    engine.dispose()
+
+def test_sqlite_memory_engine_is_unpooled():
+    """ SQLite: In-memory databases skip pool sizing and PRAGMAs"""
+    options = engine_options("sqlite:///:memory:")
+    assert "pool_size" not in options
+    engine = create_db_engine("sqlite:///:memory:")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "memory"
+
+def test_postgres_engine_options(monkeypatch):
+    """ Postgres: Statement timeouts, pre-ping and recycling come from Settings"""
+    monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 1234)
+    sync = engine_options("postgresql://u:p@db/app")
+    assert sync["connect_args"]["options"] == "-c statement_timeout=1234"
+    assert sync["pool_pre_ping"] is True
+    assert sync["pool_recycle"] == settings.DB_POOL_RECYCLE
+
+    asyncpg = engine_options("postgresql+asyncpg://u:p@db/app", is_async=True)
+    assert asyncpg["connect_args"]["server_settings"] == {"statement_timeout": "1234"}
+
+def test_pool_stats_count_checkouts_and_timeouts(tmp_path):
+    """ Metrics: Checkouts, peak usage and pool timeouts are recorded"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}", pool_size=1, max_overflow=0, pool_timeout=0.05)
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    held.close()
+    with engine.connect():
+        pass
+
+    stats = pool_stats(engine)
+    assert stats["checkouts"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["peak_checked_out"] == 1
+    assert stats["wait_ms_max"] >= 50
+    engine.dispose()
+
+def test_read_routing_replica_pinning_and_fallback(tmp_path, monkeypatch):
+    """ Replicas: Reads go to a file-copied replica, except after the client's own write or while it is down"""
+    primary_url = f"sqlite:///{tmp_path / 'primary.db'}"
+    primary = create_db_engine(primary_url)
+    Base.metadata.create_all(bind=primary)
+    with sessionmaker(bind=primary)() as db:
+        db.add(models.Course(title="Old", code="OLD1", capacity=5, is_active=True))
+        db.commit()
+    replicate.replicate([str(tmp_path / "replica.db")], primary_url)
+    with sessionmaker(bind=primary)() as db:
+        db.add(models.Course(title="New", code="NEW1", capacity=5, is_active=True))
+        db.commit()
+
+    replica = create_db_engine(f"sqlite:///file:{tmp_path / 'replica.db'}?mode=ro&uri=true")
+    missing = create_db_engine(f"sqlite:///file:{tmp_path / 'missing.db'}?mode=ro&uri=true")
+    routing = ReadRouting(sessionmaker(bind=primary), [replica, missing])
+    monkeypatch.setattr(database, "read_routing", routing)
+    read_your_writes.pins.clear()
+
+    def courses_seen(headers):
+        dependency = get_read_db(Request({"type": "http", "headers": headers}))
+        db = next(dependency)
+        try:
+            return db.query(models.Course).count(), replica_lag(db)
+        finally:
+            dependency.close()
+
+    # Replicas take turns. The missing one fails on its turn, that read falls back
+    # to the primary, and it is skipped from then on
+    stale = (1, settings.REPLICA_MAX_LAG_SECONDS)
+    assert [courses_seen([]) for _ in range(4)] == [stale, (2, None), stale, stale]
+
+    # A successful write pins its client (by user id) to the primary
+    async def write_endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    token = create_access_token({"sub": "student@test.com", "id": 7})
+    auth = [(b"authorization", f"Bearer {token}".encode())]
+    scope = {"type": "http", "method": "POST", "path": "/enrollments", "headers": auth}
+    async def receive():
+        return {"type": "http.request", "body": b""}
+    async def send(message):
+        pass
+    # A token that does not verify pins nobody, whatever user id it claims
+    forged = [(b"authorization", f"Bearer {jwt.encode({'sub': 'x', 'id': 7}, 'not-the-secret')}".encode())]
+    asyncio.run(read_your_writes.ReadYourWritesMiddleware(write_endpoint)({**scope, "headers": forged}, receive, send))
+    assert courses_seen(auth) == stale
+
+    asyncio.run(read_your_writes.ReadYourWritesMiddleware(write_endpoint)(scope, receive, send))
+    assert courses_seen(auth) == (2, None)
+    assert courses_seen([]) == stale
+
+    # With no healthy replica, everyone reads from the primary
+    routing.mark_down(replica)
+    assert courses_seen([]) == (2, None)
+    for db_engine in (primary, replica, missing):
+        db_engine.dispose()
+
+def test_pinned_client_skips_course_cache_entries_from_a_replica(tmp_path, monkeypatch):
+    """ Replicas: After a write, a stale replica read cached by another client is not served to the writer"""
+    primary_url = f"sqlite:///{tmp_path / 'primary.db'}"
+    primary = create_db_engine(primary_url)
+    Base.metadata.create_all(bind=primary)
+    with sessionmaker(bind=primary)() as db:
+        db.add(models.Course(id=1, title="Old", code="RYW1", capacity=5, is_active=True))
+        db.commit()
+    replicate.replicate([str(tmp_path / "replica.db")], primary_url)
+    replica = create_db_engine(f"sqlite:///file:{tmp_path / 'replica.db'}?mode=ro&uri=true")
+    monkeypatch.setattr(database, "read_routing", ReadRouting(sessionmaker(bind=primary), [replica]))
+    read_your_writes.pins.clear()
+    course_cache.cache.clear()
+
+    # The writer renames the course; the replica has not caught up
+    with sessionmaker(bind=primary)() as db:
+        db.get(models.Course, 1).title = "New"
+        db.commit()
+    course_cache.invalidate(1)
+    token = create_access_token({"sub": "admin@test.com", "id": 7})
+    writer = [(b"authorization", f"Bearer {token}".encode())]
+    read_your_writes.pins.set("user:7", True)
+
+    def read(headers):
+        request = Request({"type": "http", "headers": headers})
+        dependency = get_read_db(request)
+        try:
+            db = next(dependency)
+            detail = json.loads(courses.get_course(request, 1, db).body)
+            listing = json.loads(courses.list_courses(request, limit=10, db=db).body)
+            return detail["title"], [course["title"] for course in listing]
+        finally:
+            dependency.close()
+
+    assert read([]) == ("Old", ["Old"]) # Cached from the replica under the new versions
+    assert read(writer) == ("New", ["New"])
+    assert read(writer) == ("New", ["New"]) # Now cached from the primary
+    course_cache.cache.clear()
+    for db_engine in (primary, replica):
+        db_engine.dispose()
+
+def test_seed_is_deterministic_and_consistent(tmp_path, monkeypatch):
+    """ Seeding: The same seed gives the same rows, with seat counts matching the enrollments"""
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    snapshots = []
+    for name in ("a.db", "b.db"):
+        url = f"sqlite:///{tmp_path / name}"
+        seed.seed(url, users=300, courses=40, enrollments_per_user=3, seed=7, batch_size=250)
+        db_engine = create_db_engine(url)
+        with db_engine.connect() as conn:
+            enrollments = conn.execute(text("SELECT id, user_id, course_id FROM enrollments ORDER BY id")).all()
+            courses = conn.execute(text("SELECT id, capacity, enrolled_count, is_active, deleted_at FROM courses ORDER BY id")).all()
+            counted = dict(conn.execute(text("SELECT course_id, count(*) FROM enrollments GROUP BY course_id")).all())
+            assert all(c.enrolled_count == counted.get(c.id, 0) <= c.capacity for c in courses)
+            assert conn.execute(text(f"SELECT count(*) FROM {models.COURSE_SEARCH_TABLE}")).scalar() == sum(
+                1 for c in courses if c.is_active and c.deleted_at is None
+            )
+            # Every enrollment has its ENROLLED event; drops and removals only left events
+            actions = dict(conn.execute(text("SELECT action, count(*) FROM enrollment_audit GROUP BY action")).all())
+            assert actions["ENROLLED"] == len(enrollments) + actions["DROPPED"] + actions.get("ADMIN_REMOVED", 0)
+        db_engine.dispose()
+        snapshots.append((enrollments, courses))
+    assert snapshots[0] == snapshots[1]
+    # Skewed: the most popular course holds far more than its share
+    assert max(counted.values()) > 5 * len(enrollments) / len(counted)
@@ -1,5 +1,20 @@
+import asyncio
+import threading
+import httpx
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
 from api.deps import get_current_user, admin_required
+from api.limiter import limiter, user_limiter
+from core.config import settings
+from database import Base
+from models import models
+from schemas import user as user_schema
+from services import idempotency, write_pipeline
+from services.admission import AdmissionWorker
+from tests.conftest import TestingSessionLocal
+import crud
 
 # --- Mocks ---
 
@@ -73,6 +88,197 @@ def test_enroll_nonexistent_course(client, app):
     response = client.post("/enrollments", json={"course_id": 9999})
     assert response.status_code == 404
 
+def test_enroll_idempotency_key_replays(client, app, db_session):
+    """ Retried enrollment: Same Idempotency-Key replays the original response, enrolling once"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Retry", "code": "RTY1", "capacity": 10, "is_active": True}).json()
+
+    app.dependency_overrides[get_current_user] = mock_student
+    headers = {"Idempotency-Key": "enroll-1"}
+    first = client.post("/enrollments", json={"course_id": c["id"]}, headers=headers)
+    retry = client.post("/enrollments", json={"course_id": c["id"]}, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db_session.query(models.Enrollment).count() == 1
+    assert client.get(f"/courses/{c['id']}").json()["enrolled_count"] == 1
+
+    assert client.post("/enrollments", json={"course_id": 9999}, headers=headers).status_code == 422
+    assert client.post("/enrollments", json={"course_id": c["id"]}, headers={"Idempotency-Key": ""}).status_code == 400
+    assert client.post("/enrollments", json={"course_id": c["id"]}).status_code == 409
+
+def test_enroll_idempotency_key_concurrent_duplicates(client, app, db_session):
+    """ Concurrent retries: The duplicate waits for the original and gets its response"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Race", "code": "RACE1", "capacity": 10, "is_active": True}).json()
+    app.dependency_overrides[get_current_user] = mock_student
+
+    async def send_twice():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(
+                http.post("/enrollments", json={"course_id": c["id"]}, headers={"Idempotency-Key": "race"})
+                for _ in range(2)
+            ))
+
+    responses = asyncio.run(send_twice())
+    assert [r.status_code for r in responses] == [200, 200]
+    assert responses[0].json() == responses[1].json()
+    assert sorted("Idempotent-Replayed" in r.headers for r in responses) == [False, True]
+    assert db_session.query(models.Enrollment).count() == 1
+
+def test_enroll_idempotency_key_persisted(client, app, db_session, monkeypatch):
+    """ Persistent keys: A retry served by another worker (empty memory cache) still replays"""
+    monkeypatch.setattr(settings, "IDEMPOTENCY_PERSIST", True)
+    monkeypatch.setattr(idempotency.store, "session_factory", TestingSessionLocal)
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Durable", "code": "DUR1", "capacity": 10, "is_active": True}).json()
+
+    app.dependency_overrides[get_current_user] = mock_student
+    headers = {"Idempotency-Key": "enroll-2"}
+    first = client.post("/enrollments", json={"course_id": c["id"]}, headers=headers)
+    idempotency.store.clear()
+    retry = client.post("/enrollments", json={"course_id": c["id"]}, headers=headers)
+    assert retry.status_code == 200 and retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert db_session.query(models.IdempotencyKey).one().status_code == 200
+    assert db_session.query(models.Enrollment).count() == 1
+
+def test_enroll_concurrent_never_exceeds_capacity(tmp_path):
+    """ Concurrency: Parallel enrollments for the last seats never overbook"""
+    # A file database so every thread gets its own connection, like real workers
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'race.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    RaceSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with RaceSession() as db:
+        c = models.Course(title="Hot", code="HOT1", capacity=5, is_active=True)
+        db.add(c)
+        db.commit()
+        course_id = c.id
+
+    students = 20
+    start = threading.Barrier(students)
+
+    def attempt(user_id):
+        with RaceSession() as db:
+            start.wait()
+            try:
+                crud.enroll_student(db, course_id, user_id)
+                return 200
+            except HTTPException as exc:
+                return exc.status_code
+
+    with ThreadPoolExecutor(max_workers=students) as pool:
+        results = list(pool.map(attempt, range(1, students + 1)))
+
+    assert results.count(200) == 5
+    assert results.count(400) == students - 5
+    with RaceSession() as db:
+        assert db.query(models.Enrollment).filter(models.Enrollment.course_id == course_id).count() == 5
+        assert db.get(models.Course, course_id).enrolled_count == 5
+    engine.dispose()
+
+def test_write_pipeline_commits_batch_with_individual_results(tmp_path, monkeypatch):
+    """ Group commit: One transaction for the batch, and each write gets its own outcome"""
+    url = f"sqlite:///{tmp_path / 'pipeline.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        c = models.Course(title="Hot", code="HOT1", capacity=2, is_active=True)
+        db.add(c)
+        db.commit()
+        course_id = c.id
+
+    writer_engine = create_engine(url)
+    pipeline = write_pipeline.WritePipeline(write_pipeline.writer_sessions(writer_engine))
+    # Without a writer thread nothing would resolve the future
+    try:
+        pipeline.submit(write_pipeline.enroll, course_id, 1)
+        assert False, "submit() accepted a write with no writer running"
+    except HTTPException as exc:
+        assert exc.status_code == 503
+
+    # The writer lingers until all seven are queued, so they land in one batch
+    monkeypatch.setattr(settings, "WRITE_PIPELINE_MAX_BATCH", 7)
+    monkeypatch.setattr(settings, "WRITE_PIPELINE_MAX_WAIT_MS", 5000)
+    # A failing cache/seat announcement must not keep callers from their committed results
+    def broken_announcement(course_id, state):
+        raise ConnectionError("cache store unreachable")
+    monkeypatch.setattr(crud, "seats_changed", broken_announcement)
+    pipeline.start()
+    futures = [
+        pipeline.submit(write_pipeline.enroll, course_id, 1),
+        pipeline.submit(write_pipeline.enroll, course_id, 1),  # Duplicate
+        pipeline.submit(write_pipeline.enroll, course_id, 2),
+        pipeline.submit(write_pipeline.enroll, course_id, 3),  # Course full
+        pipeline.submit(write_pipeline.drop, course_id, 1),
+        pipeline.submit(write_pipeline.enroll, course_id, 3),  # Takes the dropped seat
+        pipeline.submit(write_pipeline.admin_remove, 9999),
+    ]
+    outcomes = []
+    for future in futures:
+        try:
+            outcomes.append(future.result(timeout=10))
+        except HTTPException as exc:
+            outcomes.append(exc.status_code)
+    asyncio.run(pipeline.stop())
+
+    assert outcomes[0].user_id == 1 and outcomes[0].created_at is not None
+    assert outcomes[1:5] == [409, outcomes[2], 400, {"message": "Successfully dropped the course"}]
+    assert outcomes[5].user_id == 3 and outcomes[6] is None
+    assert pipeline.stats()["batches"] == 1
+    with sessionmaker(bind=engine)() as db:
+        assert db.get(models.Course, course_id).enrolled_count == 2
+        assert {e.user_id for e in db.query(models.Enrollment)} == {2, 3}
+        # The rejected writes left no audit events behind
+        assert [e.action for e in db.query(models.AuditOutbox).order_by(models.AuditOutbox.id)] == [
+            "ENROLLED", "ENROLLED", "DROPPED", "ENROLLED"
+        ]
+    writer_engine.dispose()
+    engine.dispose()
+
+def test_write_pipeline_timeout_withdraws_queued_writes(tmp_path, monkeypatch):
+    """ Group commit: A write that times out while queued is never applied; a running one may be"""
+    url = f"sqlite:///{tmp_path / 'pipeline.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        c = models.Course(title="Slow", code="SLOW1", capacity=5, is_active=True)
+        db.add(c)
+        db.commit()
+        course_id = c.id
+
+    monkeypatch.setattr(settings, "WRITE_PIPELINE_MAX_BATCH", 1)
+    monkeypatch.setattr(settings, "WRITE_PIPELINE_TIMEOUT_SECONDS", 0.2)
+    writer_engine = create_engine(url)
+    pipeline = write_pipeline.WritePipeline(write_pipeline.writer_sessions(writer_engine))
+    pipeline.start()
+    gate = threading.Event()
+
+    def slow_write(db):
+        gate.wait(5)
+        return None, None, None
+
+    details = []
+    for write, args in ((slow_write, ()), (write_pipeline.enroll, (course_id, 1))):
+        try:
+            pipeline.call(write, *args)
+        except HTTPException as exc:
+            details.append((exc.status_code, exc.detail))
+    gate.set()
+    asyncio.run(pipeline.stop())
+
+    assert details == [(503, write_pipeline._TIMED_OUT), (503, write_pipeline._NOT_APPLIED)]
+    with sessionmaker(bind=engine)() as db:
+        assert db.query(models.Enrollment).count() == 0
+        assert db.get(models.Course, course_id).enrolled_count == 0
+    writer_engine.dispose()
+    engine.dispose()
+
 ## 2. Student Operations: DELETE /enrollments/{course_id}
 
 def test_drop_course_success(client, app):
@@ -86,6 +292,74 @@ def test_drop_course_success(client, app):
     response = client.delete(f"/enrollments/{c['id']}")
     assert response.status_code == 200
 
+def test_drop_course_frees_seat(client, app):
+    """ Capacity: Dropping gives the seat back to the next student"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "One Seat", "code": "OS1", "capacity": 1, "is_active": True}).json()
+
+    app.dependency_overrides[get_current_user] = lambda: MockUser(id=1, role="student")
+    client.post("/enrollments", json={"course_id": c["id"]})
+    assert client.get(f"/courses/{c['id']}").json()["seats_remaining"] == 0
+    client.delete(f"/enrollments/{c['id']}")
+
+    app.dependency_overrides[get_current_user] = lambda: MockUser(id=2, role="student")
+    response = client.post("/enrollments", json={"course_id": c["id"]})
+    assert response.status_code == 200
+    assert client.get(f"/courses/{c['id']}").json()["enrolled_count"] == 1
+
+def test_enrollment_rate_limit_is_per_student(client, app, monkeypatch):
+    """ Rate limit: Enrollment writes are counted per student id and answer 429 with Retry-After"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Busy", "code": "RL1", "capacity": 10, "is_active": True}).json()
+
+    monkeypatch.setattr(settings, "RATELIMIT_ENROLLMENTS", "3/minute")
+    monkeypatch.setattr(limiter, "enabled", True)
+    user_limiter.reset()
+    try:
+        app.dependency_overrides[get_current_user] = lambda: MockUser(id=1, role="student")
+        statuses = [
+            client.post("/enrollments", json={"course_id": c["id"]}).status_code,
+            client.delete(f"/enrollments/{c['id']}").status_code,
+            client.post("/enrollments", json={"course_id": c["id"]}).status_code,
+        ]
+        assert statuses == [200, 200, 200]
+        response = client.delete(f"/enrollments/{c['id']}")
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+        # Another student has an allowance of their own
+        app.dependency_overrides[get_current_user] = lambda: MockUser(id=2, role="student")
+        assert client.post("/enrollments", json={"course_id": c["id"]}).status_code == 200
+    finally:
+        user_limiter.reset()
+
+def test_enrollment_rate_limit_falls_back_when_storage_fails(client, app, monkeypatch, caplog):
+    """ Rate limit: With the shared store down, enrollment limits keep counting per process"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Outage", "code": "RL2", "capacity": 10, "is_active": True}).json()
+
+    def unreachable(*args, **kwargs):
+        raise ConnectionError("rate limit store down")
+
+    monkeypatch.setattr(settings, "RATELIMIT_ENROLLMENTS", "2/minute")
+    monkeypatch.setattr(limiter, "enabled", True)
+    monkeypatch.setattr(user_limiter.shared, "hit", unreachable)
+    monkeypatch.setattr(user_limiter.storage, "check", lambda: False)
+    user_limiter.reset()
+    try:
+        app.dependency_overrides[get_current_user] = lambda: MockUser(id=1, role="student")
+        statuses = [
+            client.post("/enrollments", json={"course_id": c["id"]}).status_code,
+            client.delete(f"/enrollments/{c['id']}").status_code,
+            client.post("/enrollments", json={"course_id": c["id"]}).status_code,
+        ]
+        assert statuses == [200, 200, 429]
+        outage_logs = [r for r in caplog.records if "Rate limit storage unreachable" in r.getMessage()]
+        assert len(outage_logs) == 1
+    finally:
+        user_limiter.storage_dead = False
+        user_limiter.reset()
+
 ## 3. Admin Operations: GET /admin/enrollments
 
 def test_admin_list_all_unauthorized(client, app):
@@ -101,6 +375,41 @@ def test_admin_list_success(client, app):
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
+def test_admin_list_cursor_pagination(client, app):
+    """ Keyset paging: Admin roster pages follow X-Next-Cursor"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Roster", "code": "R1", "capacity": 10}).json()
+    for student_id in (1, 2, 3):
+        app.dependency_overrides[get_current_user] = lambda student_id=student_id: MockUser(id=student_id, role="student")
+        client.post("/enrollments", json={"course_id": c["id"]})
+
+    first = client.get(f"/admin/courses/{c['id']}/enrollments", params={"limit": 2})
+    assert [e["user_id"] for e in first.json()] == [1, 2]
+    second = client.get(f"/admin/courses/{c['id']}/enrollments", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert [e["user_id"] for e in second.json()] == [3]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_admin_list_fast_json_matches(client, app, monkeypatch):
+    """ Fast JSON: Projected listings return the same body and cursor as the ORM path"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Roster", "code": "R2", "capacity": 10}).json()
+    for student_id in (1, 2, 3):
+        app.dependency_overrides[get_current_user] = lambda student_id=student_id: MockUser(id=student_id, role="student")
+        client.post("/enrollments", json={"course_id": c["id"]})
+
+    requests = [
+        ("/admin/enrollments", {"limit": 2}),
+        (f"/admin/courses/{c['id']}/enrollments", {"limit": 2}),
+        ("/admin/enrollments", {"skip": 1, "limit": 5}),
+    ]
+    expected = [client.get(url, params=params) for url, params in requests]
+    monkeypatch.setattr(settings, "FAST_JSON", True)
+    for (url, params), before in zip(requests, expected):
+        after = client.get(url, params=params)
+        assert after.status_code == 200
+        assert after.json() == before.json()
+        assert after.headers.get("X-Next-Cursor") == before.headers.get("X-Next-Cursor")
+
 def test_admin_get_course_enrollments_not_found(client, app):
     """ Invalid ID: Nonexistent course → returns 404"""
     app.dependency_overrides[admin_required] = mock_admin
@@ -138,4 +447,181 @@ def test_admin_remove_nonexistent(client, app):
     """ Invalid ID: 404"""
     app.dependency_overrides[admin_required] = mock_admin
     response = client.delete("/admin/enrollments/9999")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+## 5. Admin Operations: POST /admin/enrollments/bulk
+
+def make_user(db_session, name, role="student"):
+    return crud.create_user(
+        db_session,
+        user_schema.UserCreate(name=name, email=f"{name}@test.com", password="unused", role=role),
+        hashed_password="not-a-real-hash"
+    )
+
+def test_admin_bulk_enroll_json(client, app, db_session):
+    """ Success: Bulk JSON load reports a status per row and keeps seat counts right"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Bulk", "code": "BK1", "capacity": 2}).json()
+    closed = client.post("/courses/", json={"title": "Closed", "code": "BK2", "capacity": 5, "is_active": False}).json()
+    s1, s2, s3 = (make_user(db_session, f"bulk{i}").id for i in range(1, 4))
+    admin = make_user(db_session, "registrar", role="admin").id
+
+    items = [
+        (s1, c["id"]), (s1, c["id"]), (admin, c["id"]), (9999, c["id"]),
+        (s2, c["id"]), (s3, c["id"]), (s1, closed["id"]), (s1, 9999),
+    ]
+    response = client.post("/admin/enrollments/bulk", json={"items": [{"user_id": u, "course_id": k} for u, k in items]})
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["status"] for r in body["results"]] == [
+        "enrolled", "already_enrolled", "not_a_student", "user_not_found",
+        "enrolled", "course_full", "course_inactive", "course_not_found",
+    ]
+    assert [r["row"] for r in body["results"]] == list(range(1, 9))
+    assert body["enrolled"] == 2 and body["failed"] == 6
+
+    enrolled_ids = {r["enrollment_id"] for r in body["results"] if r["status"] == "enrolled"}
+    assert {e.id for e in db_session.query(models.Enrollment)} == enrolled_ids
+    assert db_session.query(models.AuditOutbox).count() == 2
+    assert crud.relay_all_audit_events(db_session) == 2
+    assert db_session.query(models.EnrollmentAudit).count() == 2
+    assert client.get(f"/courses/{c['id']}").json()["enrolled_count"] == 2
+
+def test_admin_bulk_enroll_csv_in_chunks(client, app, db_session, monkeypatch):
+    """ Success: CSV upload is processed in chunks and skips bad rows"""
+    monkeypatch.setattr(settings, "BULK_ENROLLMENT_CHUNK_SIZE", 2)
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Csv", "code": "CSV1", "capacity": 10}).json()
+    students = [make_user(db_session, f"csv{i}").id for i in range(4)]
+
+    lines = ["course_id,user_id"] + [f"{c['id']},{s}" for s in students] + ["oops,1", f"{c['id']},{students[0]}"]
+    response = client.post(
+        "/admin/enrollments/bulk",
+        content="\r\n".join(lines).encode(),
+        headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["enrolled"] * 4 + ["invalid_row", "already_enrolled"]
+    assert results[0]["user_id"] == students[0] and results[0]["course_id"] == c["id"]
+    assert client.get(f"/courses/{c['id']}").json()["enrolled_count"] == 4
+
+def test_admin_bulk_enroll_row_limit(client, app, monkeypatch):
+    """ Too large: Requests over BULK_ENROLLMENT_MAX_ROWS are rejected with 413"""
+    monkeypatch.setattr(settings, "BULK_ENROLLMENT_MAX_ROWS", 2)
+    app.dependency_overrides[admin_required] = mock_admin
+    items = [{"user_id": i, "course_id": 1} for i in range(3)]
+    assert client.post("/admin/enrollments/bulk", json={"items": items}).status_code == 413
+    assert client.post("/admin/enrollments/bulk", json={"items": "nope"}).status_code == 422
+
+def test_admin_bulk_enroll_unauthorized(client, app):
+    """ Unauthorized: Students cannot bulk enroll"""
+    app.dependency_overrides[admin_required] = mock_forbidden
+    response = client.post("/admin/enrollments/bulk", json={"items": []})
+    assert response.status_code == 403
+
+## 6. Waitlist: POST /enrollments/waitlist
+
+def test_waitlist_promotes_on_drop(client, app):
+    """ Success: A drop hands the seat to the oldest waitlisted student"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Popular", "code": "WL1", "capacity": 1}).json()
+
+    app.dependency_overrides[get_current_user] = lambda: MockUser(id=1, role="student")
+    client.post("/enrollments", json={"course_id": c["id"]})
+    for student_id in (2, 3):
+        app.dependency_overrides[get_current_user] = lambda student_id=student_id: MockUser(id=student_id, role="student")
+        response = client.post("/enrollments/waitlist", json={"course_id": c["id"]})
+        assert response.status_code == 200
+        assert response.json()["status"] == "waitlisted"
+        assert response.json()["position"] == student_id - 1
+
+    app.dependency_overrides[get_current_user] = lambda: MockUser(id=1, role="student")
+    assert client.delete(f"/enrollments/{c['id']}").status_code == 200
+
+    app.dependency_overrides[admin_required] = mock_admin
+    roster = client.get(f"/admin/courses/{c['id']}/enrollments").json()
+    assert [e["user_id"] for e in roster] == [2]
+    assert client.get(f"/courses/{c['id']}").json()["enrolled_count"] == 1
+
+def test_waitlist_enrolls_when_seat_free(client, app):
+    """ Success: Joining the waitlist of a course with a free seat enrolls right away"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Open", "code": "WL2", "capacity": 5}).json()
+
+    app.dependency_overrides[get_current_user] = mock_student
+    response = client.post("/enrollments/waitlist", json={"course_id": c["id"]})
+    assert response.json()["status"] == "enrolled"
+    assert response.json()["enrollment_id"] is not None
+    assert client.post("/enrollments/waitlist", json={"course_id": c["id"]}).status_code == 409
+
+def test_waitlist_duplicate_and_leave(client, app):
+    """ Duplicate join → 409; leaving twice → 404"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Tiny", "code": "WL3", "capacity": 1}).json()
+    app.dependency_overrides[get_current_user] = lambda: MockUser(id=2, role="student")
+    client.post("/enrollments", json={"course_id": c["id"]})
+
+    app.dependency_overrides[get_current_user] = mock_student
+    assert client.post("/enrollments/waitlist", json={"course_id": c["id"]}).json()["status"] == "waitlisted"
+    assert client.post("/enrollments/waitlist", json={"course_id": c["id"]}).status_code == 409
+    assert client.delete(f"/enrollments/waitlist/{c['id']}").status_code == 200
+    assert client.delete(f"/enrollments/waitlist/{c['id']}").status_code == 404
+
+def test_enrolling_directly_ends_the_wait(client, app, db_session):
+    """ Waitlist: Enrolling directly or in bulk deletes the student's entry, and positions skip stale ones"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Elsewhere", "code": "WL4", "capacity": 3}).json()
+    s1, s2, s3, s4 = (make_user(db_session, f"waiting{i}").id for i in range(1, 5))
+    db_session.add_all([models.Waitlist(course_id=c["id"], user_id=s) for s in (s1, s2)])
+    db_session.commit()
+
+    app.dependency_overrides[get_current_user] = lambda: MockUser(id=s1, role="student")
+    assert client.post("/enrollments", json={"course_id": c["id"]}).status_code == 200
+    response = client.post("/admin/enrollments/bulk", json={"items": [{"user_id": s2, "course_id": c["id"]}]})
+    assert response.json()["results"][0]["status"] == "enrolled"
+    assert db_session.query(models.Waitlist).count() == 0
+
+    # An entry left over from before this cleanup does not count towards later positions
+    db_session.add(models.Waitlist(course_id=c["id"], user_id=s1))
+    db_session.commit()
+    app.dependency_overrides[get_current_user] = lambda: MockUser(id=s3, role="student")
+    assert client.post("/enrollments", json={"course_id": c["id"]}).status_code == 200
+    app.dependency_overrides[get_current_user] = lambda: MockUser(id=s4, role="student")
+    response = client.post("/enrollments/waitlist", json={"course_id": c["id"]})
+    assert (response.json()["status"], response.json()["position"]) == ("waitlisted", 1)
+
+## 7. Admission queue: POST /enrollments/intents
+
+def test_admission_queue_applies_in_order(client, app, db_session, monkeypatch):
+    """ Success: Queued requests get seats first come, first served; the rest are waitlisted"""
+    monkeypatch.setattr(settings, "ADMISSION_QUEUE_ENABLED", True)
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Rush", "code": "AQ1", "capacity": 2}).json()
+    students = [make_user(db_session, f"rush{i}").id for i in range(3)]
+
+    intents = []
+    for student_id in students:
+        app.dependency_overrides[get_current_user] = lambda student_id=student_id: MockUser(id=student_id, role="student")
+        response = client.post("/enrollments/intents", json={"course_id": c["id"]})
+        assert response.status_code == 202
+        assert response.json()["status"] == "pending"
+        intents.append(response.json()["id"])
+
+    # Nothing applied yet: a short wait times out and reports the intent as still pending
+    assert client.get(f"/enrollments/intents/{intents[-1]}", params={"wait": 0.05}).json()["status"] == "pending"
+    assert asyncio.run(AdmissionWorker(TestingSessionLocal).drain()) == 3
+
+    statuses = []
+    for student_id, intent_id in zip(students, intents):
+        app.dependency_overrides[get_current_user] = lambda student_id=student_id: MockUser(id=student_id, role="student")
+        statuses.append(client.get(f"/enrollments/intents/{intent_id}", params={"wait": 5}).json()["status"])
+    assert statuses == ["enrolled", "enrolled", "waitlisted"]
+    # Someone else's request is not visible
+    assert client.get(f"/enrollments/intents/{intents[0]}").status_code == 404
+    assert client.get(f"/courses/{c['id']}").json()["enrolled_count"] == 2
+    assert db_session.query(models.Waitlist).filter(models.Waitlist.user_id == students[2]).count() == 1
+
+def test_admission_queue_disabled(client, app):
+    """ Disabled: Without ADMISSION_QUEUE_ENABLED the intents route is 404"""
+    app.dependency_overrides[get_current_user] = mock_student
+    assert client.post("/enrollments/intents", json={"course_id": 1}).status_code == 404
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.exc import DatabaseError
+from api.deps import admin_required, get_current_user
+from core.config import settings
+from models import models
+import crud
+
+# --- Mocks ---
+
+class MockUser:
+    def __init__(self, id, role):
+        self.id = id
+        self.role = role
+
+async def mock_admin():
+    return {"id": 99, "role": "admin"}
+
+def enroll(client, app, course_id, student_id):
+    app.dependency_overrides[get_current_user] = lambda: MockUser(id=student_id, role="student")
+    return client.post("/enrollments", json={"course_id": course_id}).json()
+
+# --- Tests ---
+
+def test_export_enrollments_ndjson(client, app, monkeypatch):
+    """ Success: NDJSON export streams every row across several cursor batches"""
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Export", "code": "EX1", "capacity": 10}).json()
+    for student_id in range(1, 6):
+        enroll(client, app, c["id"], student_id)
+
+    response = client.get("/admin/exports/enrollments", params={"include_course": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["user_id"] for r in rows] == [1, 2, 3, 4, 5]
+    assert rows[0]["course_code"] == "EX1"
+
+def test_export_enrollments_csv_filtered_by_course(client, app):
+    """ Filters: CSV export only contains the requested course"""
+    app.dependency_overrides[admin_required] = mock_admin
+    a = client.post("/courses/", json={"title": "A", "code": "CA", "capacity": 10}).json()
+    b = client.post("/courses/", json={"title": "B", "code": "CB", "capacity": 10}).json()
+    enroll(client, app, a["id"], 1)
+    enroll(client, app, b["id"], 2)
+
+    response = client.get("/admin/exports/enrollments", params={"format": "csv", "course_id": b["id"]})
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [r["user_id"] for r in rows] == ["2"]
+
+def test_export_empty_csv_has_header(client, app):
+    """ Empty export: CSV still carries its header row"""
+    app.dependency_overrides[admin_required] = mock_admin
+    response = client.get("/admin/exports/audit", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.text.strip() == "id,enrollment_id,action,user_id,course_id,timestamp"
+
+def test_export_audit_by_action(client, app):
+    """ Filters: Audit export by action"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Audit", "code": "AU1", "capacity": 10}).json()
+    enroll(client, app, c["id"], 7)
+
+    response = client.get("/admin/exports/audit", params={"action": "ENROLLED"})
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 1 and rows[0]["user_id"] == 7
+
+def test_export_audit_history_by_course(client, app):
+    """ Filters: A course's audit history has its enrollments, drops and admin removals in order"""
+    app.dependency_overrides[admin_required] = mock_admin
+    a = client.post("/courses/", json={"title": "A", "code": "HA", "capacity": 10}).json()
+    b = client.post("/courses/", json={"title": "B", "code": "HB", "capacity": 10}).json()
+    enroll(client, app, a["id"], 1)
+    removed = enroll(client, app, a["id"], 2)
+    enroll(client, app, b["id"], 1)
+    client.delete(f"/enrollments/{a['id']}") # Student 1 drops course A
+
+    app.dependency_overrides[admin_required] = mock_admin
+    client.delete(f"/admin/enrollments/{removed['id']}")
+
+    response = client.get("/admin/exports/audit", params={"course_id": a["id"]})
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["action"], r["user_id"]) for r in rows] == [
+        ("ENROLLED", 1), ("ENROLLED", 2), ("DROPPED", 1), ("ADMIN_REMOVED", 2)
+    ]
+    assert {r["course_id"] for r in rows} == {a["id"]}
+
+def test_audit_events_follow_the_transaction(client, app, db_session):
+    """ Outbox: Rejected enrollments log nothing; relayed events are append-only"""
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "One", "code": "AO1", "capacity": 1}).json()
+    enroll(client, app, c["id"], 1)
+    with pytest.raises(HTTPException):
+        crud.enroll_student(db_session, c["id"], 2) # Full: rolled back
+    assert db_session.query(models.AuditOutbox).count() == 1
+
+    assert crud.relay_all_audit_events(db_session) == 1
+    assert db_session.query(models.AuditOutbox).count() == 0
+    with pytest.raises(DatabaseError):
+        db_session.execute(update(models.EnrollmentAudit).values(action="DROPPED"))
+    db_session.rollback()
+
+def test_export_unauthorized(client, app):
+    """ Unauthorized: Students cannot export"""
+    app.dependency_overrides[get_current_user] = lambda: MockUser(id=1, role="student")
+    response = client.get("/admin/exports/enrollments")
+    assert response.status_code == 403
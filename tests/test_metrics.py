@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import httpx
+import pytest
+from api.deps import admin_required
+from core import load_shedding
+from core.config import settings
+from core.security import create_access_token
+
+# --- Mocks ---
+
+async def mock_admin():
+    return {"id": 99, "role": "admin"}
+
+SCRAPER = {"Authorization": "Bearer scrape-secret"}
+
+@pytest.fixture
+def metrics_token(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+
+# --- Tests ---
+
+def test_metrics_exports_route_latency(client, metrics_token):
+    """ Success: /metrics has per-route latency, query counts and pool gauges"""
+    client.get("/courses/")
+    client.get("/courses/12345")
+
+    response = client.get("/metrics", headers=SCRAPER)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/courses/{id}",status="404"}' in body
+    assert 'http_request_db_queries_bucket{le="+Inf",method="GET",route="/courses/"}' in body
+    assert 'http_requests_in_flight{method="GET"} 1.0' in body # The scrape itself
+    assert 'db_pool_size{engine="sync"}' in body
+    assert 'cache_hits_total{cache="courses"}' in body
+
+def test_metrics_requires_metrics_token(client, app, monkeypatch):
+    """ Security: /metrics is served only to METRICS_TOKEN, never to user tokens"""
+    assert client.get("/metrics", headers=SCRAPER).status_code == 404 # No token configured
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    admin = {"Authorization": f"Bearer {create_access_token({'sub': 'admin@test.com', 'id': 99, 'role': 'admin'})}"}
+    app.dependency_overrides[admin_required] = mock_admin
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=admin).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secreT"}).status_code == 401
+    assert client.get("/metrics", headers=SCRAPER).status_code == 200
+
+def test_query_count_header(client, app, monkeypatch):
+    """ Debug header: X-DB-Query-Count shows the cache saving the second lookup"""
+    monkeypatch.setattr(settings, "QUERY_COUNT_HEADER", True)
+    app.dependency_overrides[admin_required] = mock_admin
+    c = client.post("/courses/", json={"title": "Counted", "code": "QC1", "capacity": 5}).json()
+
+    first = client.get(f"/courses/{c['id']}")
+    second = client.get(f"/courses/{c['id']}")
+    assert int(first.headers["X-DB-Query-Count"]) >= 1
+    assert second.headers["X-DB-Query-Count"] == "0"
+    assert "X-DB-Time-Ms" in second.headers
+
+def test_query_count_header_off_by_default(client):
+    """ Default: No debug headers"""
+    assert "X-DB-Query-Count" not in client.get("/courses/").headers
+
+def test_slow_query_log(client, monkeypatch, caplog):
+    """ Slow queries: Statements over SLOW_QUERY_MS are logged with the request path"""
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="core.metrics"):
+        client.get("/courses/")
+    messages = [record.getMessage() for record in caplog.records if record.name == "core.metrics"]
+    assert messages and "during /courses/" in messages[0] and "SELECT" in messages[0]
+
+def test_load_shedding_priority_and_shed_reasons():
+    """ Load shedding: Freed slots go to enrollments first; a full queue and a passed deadline get 503s"""
+    enrollments = load_shedding.RouteClass("enrollments", concurrency=1, queue_size=1, max_wait_ms=5000)
+    browse = load_shedding.RouteClass("browse", concurrency=1, queue_size=1, max_wait_ms=100)
+    shedder = load_shedding.LoadShedder(1, [enrollments, browse])
+
+    async def scenario():
+        assert await shedder.acquire(browse) is None
+        browsing = asyncio.create_task(shedder.acquire(browse))
+        await asyncio.sleep(0)
+        enrolling = asyncio.create_task(shedder.acquire(enrollments))
+        await asyncio.sleep(0)
+        assert await shedder.acquire(browse) == 1 # Queue full, Retry-After of at least a second
+        shedder.release(browse, 0.01)
+        assert await enrolling is None # Arrived later, served first
+        assert await browsing == 1 # Still waiting at its 100 ms deadline
+        return shedder.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["enrollments"] == {"running": 1, "queued": 0, "admitted": 1, "shed_queue_full": 0, "shed_deadline": 0}
+    assert stats["browse"] == {"running": 0, "queued": 0, "admitted": 1, "shed_queue_full": 1, "shed_deadline": 1}
+
+def test_load_shedding_slot_handed_over_at_deadline(monkeypatch):
+    """ Load shedding: A waiter given a slot as its deadline passes runs instead of leaking the slot"""
+    browse = load_shedding.RouteClass("browse", concurrency=1, queue_size=1, max_wait_ms=100)
+    shedder = load_shedding.LoadShedder(1, [browse])
+
+    async def handed_over_then_timed_out(awaitable, timeout):
+        # The timeout and the hand-over land in the same loop iteration
+        shedder.release(browse)
+        raise asyncio.TimeoutError
+
+    async def scenario():
+        assert await shedder.acquire(browse) is None
+        monkeypatch.setattr(load_shedding.asyncio, "wait_for", handed_over_then_timed_out)
+        admitted = await shedder.acquire(browse)
+        monkeypatch.undo()
+        return admitted
+
+    assert asyncio.run(scenario()) is None
+    assert shedder.stats()["browse"]["running"] == 1 and browse.shed["deadline"] == 0
+    shedder.release(browse)
+    assert shedder.running == browse.running == 0
+
+def test_load_shedding_middleware_answers_503(monkeypatch):
+    """ Load shedding: Over budget requests get a fast 503 with Retry-After; other routes pass through"""
+    browse = load_shedding.RouteClass("browse", concurrency=1, queue_size=0, max_wait_ms=1000)
+    monkeypatch.setattr(load_shedding, "shedder", load_shedding.LoadShedder(10, [browse]))
+    release = asyncio.Event()
+
+    async def endpoint(scope, receive, send):
+        if scope["path"] == "/courses/":
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=load_shedding.LoadSheddingMiddleware(endpoint))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            first = asyncio.create_task(http.get("/courses/"))
+            await asyncio.sleep(0.05)
+            shed = await http.get("/courses/")
+            unclassified = await http.get("/admin/enrollments")
+            release.set()
+            return (await first).status_code, shed, unclassified.status_code
+
+    first, shed, unclassified = asyncio.run(scenario())
+    assert (first, shed.status_code, unclassified) == (200, 503, 200)
+    assert shed.headers["Retry-After"] == "1"
+
+def test_load_shedding_metrics(client, metrics_token):
+    """ Metrics: Queue depth and shed counts per route class"""
+    body = client.get("/metrics", headers=SCRAPER).text
+    assert 'load_shedding_queue_depth{route_class="enrollments"} 0.0' in body
+    assert 'load_shedding_shed_total{reason="deadline",route_class="browse"}' in body
@@ -0,0 +1,68 @@
+import re
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+import crud
+from database import Base
+from core.pagination import encode_cursor
+from schemas import course
+
+# A bare "SCAN <table>" is SQLite's full table scan; index and FTS scans carry
+# "USING ... INDEX" or "VIRTUAL TABLE INDEX" after the table name
+TABLE_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+@pytest.fixture
+def captured_sql(db_session):
+    """Records every statement crud sends so its plan can be inspected."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split()[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            statements.append((statement, parameters))
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+def table_scans(db_session, statements):
+    scans = []
+    for statement, parameters in statements:
+        plan = db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        for row in plan:
+            scan = TABLE_SCAN.match(row[3])
+            # (Subqueries show up as "SCAN anon_1"; only real tables count)
+            if scan and scan.group(1) in Base.metadata.tables:
+                scans.append((row[3], " ".join(statement.split())))
+    return scans
+
+
+def test_crud_hot_queries_use_indexes(db_session, captured_sql):
+    """ Query plans: No hot query in crud.py falls back to a full table scan"""
+    c = crud.create_course(db_session, course.CourseCreate(title="Plans", code="PL1", capacity=1))
+    crud.update_course(db_session, c.id, course.CourseUpdate(title="Query Plans"))
+    crud.get_user_by_email(db_session, "nobody@example.com")
+    crud.get_courses(db_session)
+    crud.get_courses(db_session, search="Query")
+    crud.get_courses_page(db_session, limit=1, cursor=encode_cursor("id", [c.id]))
+    crud.get_courses_page(db_session, limit=1, sort="title")
+    crud.get_courses_page(db_session, limit=1, sort="title", cursor=encode_cursor("title", ["Query Plans", c.id]))
+
+    crud.enroll_student(db_session, c.id, 1)
+    for course_id, user_id in ((c.id, 1), (c.id, 2), (9999, 2)):
+        with pytest.raises(HTTPException):
+            crud.enroll_student(db_session, course_id, user_id)
+    crud.get_enrollments(db_session, course_id=c.id)
+    crud.get_enrollments_page(db_session, limit=1, course_id=c.id, cursor=encode_cursor("id", [0]))
+    # (An unfiltered first page just walks the primary key and stops at LIMIT)
+    crud.get_enrollments_page(db_session, limit=1, cursor=encode_cursor("id", [0]))
+    crud.bulk_enroll_chunk(db_session, [(1, 1, c.id), (2, 3, c.id), (3, 4, 9999)])
+    crud.delete_own_enrollment(db_session, c.id, 1)
+    crud.admin_delete_enrollment(db_session, 9999)
+    crud.toggle_course(db_session, c.id)
+    crud.soft_delete_course(db_session, c.id)
+
+    assert captured_sql
+    assert table_scans(db_session, captured_sql) == []
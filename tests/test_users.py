@@ -1,3 +1,13 @@
+from sqlalchemy import update
+from core import security
+from core.security import principal_cache
+from models.models import User
+
+def login(client, email, password="password123", role="student"):
+    client.post("/auth/register", json={"name": "Cached User", "email": email, "password": password, "role": role})
+    token = client.post("/auth/login", data={"username": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
 def test_get_me_success(client):
     """ Success case: Valid JWT -> returns user profile"""
     # 1. Create a user
@@ -53,4 +63,59 @@ def test_get_me_correct_user(client):
     # 3. Verify /me returns User B, not User A
     response = client.get("/users/me", headers={"Authorization": f"Bearer {token_b}"})
     assert response.json()["email"] == "b@ex.com"
-    assert response.json()["name"] == "User B"
\ No newline at end of file
+    assert response.json()["name"] == "User B"
+
+def test_get_me_served_from_principal_cache(client):
+    """ Caching: Repeat requests with the same token skip verification"""
+    headers = login(client, "cache@example.com")
+    client.get("/users/me", headers=headers)
+    hits = principal_cache.hits
+
+    response = client.get("/users/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == "cache@example.com"
+    assert principal_cache.hits == hits + 1
+
+def test_get_me_deactivated_user_invalidates_cache(client, db_session):
+    """ Caching: Deactivating a user revokes their cached principal"""
+    headers = login(client, "deactivate@example.com")
+    assert client.get("/users/me", headers=headers).status_code == 200
+
+    user = db_session.query(User).filter(User.email == "deactivate@example.com").first()
+    user.is_active = False
+    db_session.commit()
+
+    response = client.get("/users/me", headers=headers)
+    assert response.status_code == 401
+
+def test_get_me_role_change_invalidates_cache(client, db_session):
+    """ Caching: A role change is visible on the very next request"""
+    headers = login(client, "promote@example.com")
+    assert client.get("/users/me", headers=headers).json()["role"] == "student"
+
+    user = db_session.query(User).filter(User.email == "promote@example.com").first()
+    user.role = "admin"
+    db_session.commit()
+
+    assert client.get("/users/me", headers=headers).json()["role"] == "admin"
+
+def test_principal_generation_moves_at_commit(client, db_session):
+    """ Caching: A role change revokes cached principals once committed, not at flush or on rollback"""
+    headers = login(client, "flush@example.com")
+    assert client.get("/users/me", headers=headers).status_code == 200
+    user = db_session.query(User).filter(User.email == "flush@example.com").first()
+    generation = security._user_generation(user.id)
+
+    user.role = "admin"
+    db_session.flush()
+    assert security._user_generation(user.id) == generation
+    db_session.rollback()
+    assert security._user_generation(user.id) == generation
+    assert client.get("/users/me", headers=headers).json()["role"] == "student"
+
+    # Another worker's commit reaches this one through the shared generation store
+    db_session.execute(update(User).where(User.id == user.id).values(role="admin"))
+    db_session.commit()
+    assert client.get("/users/me", headers=headers).json()["role"] == "student" # Bypassed the ORM events
+    security.user_generations.incr(f"auth:generation:{user.id}")
+    assert client.get("/users/me", headers=headers).json()["role"] == "admin"